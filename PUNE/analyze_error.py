@@ -1,7 +1,13 @@
-import re
+import os
+import sys
 import logging
 from PIL import Image
-import pytesseract
+
+# Shared OCR/model helpers live next to the classifier scripts
+MODEL_CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model", "error_classifier_model")
+sys.path.append(MODEL_CODE_DIR)
+from ocr_engine import get_ocr_engine
+from rule_engine import RULES, match_rules, render_message
 
 # Configure logging for debugging and tracking
 logging.basicConfig(
@@ -10,67 +16,28 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# Set path to Tesseract OCR executable
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+UNKNOWN_ERROR_STEPS = [
+    "The error is unrecognized. Please review the error message for details.",
+    "You can consult documentation or research online for potential solutions."
+]
 
 
 class ErrorAnalyzer:
     def __init__(self):
-        self.solutions = {
-            "FileNotFoundError": [
-                "Step 1: Verify the file path is correct.",
-                "Step 2: Ensure the file exists at the specified location.",
-                "Step 3: Check read permissions for the file."
-            ],
-            "ValueError": [
-                "Step 1: Confirm the input type matches the expected format.",
-                "Step 2: If converting to int, ensure the string represents a valid integer."
-            ],
-            "ImportError": [
-                "Step 1: Ensure the required library is installed using pip.",
-                "Step 2: Use the command `pip install <library_name>`."
-            ],
-            "KeyError": [
-                "Step 1: Check if the specified key exists in the dictionary.",
-                "Step 2: Handle missing keys using `dict.get('<key>')` or exception handling."
-            ],
-            "AttributeError": [
-                "Step 1: Verify that you're calling the correct attribute or method on the object.",
-                "Step 2: Ensure the object type matches the attribute/method you're trying to access."
-            ],
-            "Unknown Error": [
-                "The error is unrecognized. Please review the error message for details.",
-                "You can consult documentation or research online for potential solutions."
-            ]
-        }
+        # Step-by-step solutions come from the shared rule table, keyed by rule name
+        self.solutions = {rule["name"]: rule["steps"] for rule in RULES}
+        self.solutions["Unknown Error"] = UNKNOWN_ERROR_STEPS
+        self.last_match = None
 
     def parse_error_message(self, error_message):
         """
         Parse the error message to identify specific error types and details.
         """
-        if "FileNotFoundError" in error_message:
-            return "FileNotFoundError"
-        elif "ValueError:" in error_message:
-            match = re.search(r"invalid literal for int\(\) with base 10: '(.*?)'", error_message)
-            if match:
-                detail = match.group(1)
-                return f"ValueError: Invalid input '{detail}'"
-            return "ValueError"
-        elif "ImportError" in error_message:
-            return "ImportError"
-        elif "KeyError" in error_message:
-            match = re.search(r"KeyError: '(.*?)'", error_message)
-            if match:
-                return f"KeyError: Missing key '{match.group(1)}'"
-            return "KeyError"
-        elif "AttributeError" in error_message:
-            match = re.search(r"AttributeError: '(.*?)' object has no attribute '(.*?)'", error_message)
-            if match:
-                obj, attribute = match.groups()
-                return f"AttributeError: '{obj}' object missing attribute '{attribute}'"
-            return "AttributeError"
-        else:
+        self.last_match = match_rules(error_message)
+        if self.last_match is None:
             return "Unknown Error"
+        return render_message(self.last_match)
 
     def log_error(self, error_message, solution):
         """
@@ -91,7 +58,8 @@ class ErrorAnalyzer:
         """
         logging.info("Starting error analysis...")
         parsed_error = self.parse_error_message(error_message)
-        solution_steps = self.get_detailed_solution(parsed_error)
+        error_type = self.last_match.rule["name"] if self.last_match else "Unknown Error"
+        solution_steps = self.get_detailed_solution(error_type)
 
         # Log the error and its solution
         self.log_error(parsed_error, solution_steps)
@@ -101,13 +69,13 @@ class ErrorAnalyzer:
 
 def extract_text_from_image(image_path):
     """
-    Perform OCR on an image to extract text using pytesseract.
+    Perform OCR on an image to extract text using the shared OCR engine.
     """
     try:
         # Load image using PIL
         img = Image.open(image_path)
-        # Extract text using pytesseract
-        extracted_text = pytesseract.image_to_string(img)
+        # Extract text using the long-lived Tesseract workers
+        extracted_text = get_ocr_engine().image_to_string(img)
         return extracted_text
     except Exception as e:
         logging.error(f"Error during OCR: {str(e)}")
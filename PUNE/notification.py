@@ -1,22 +1,30 @@
 import tkinter as tk
+from tkinter import messagebox
 import cv2
 import pyttsx3
 import threading
 import json
 import os
+import sys
 from PIL import Image, ImageTk
-import pytesseract
-import joblib
-import numpy as np
-import torch
-from transformers import BertTokenizer, BertModel
+
+# Shared OCR/model helpers live next to the classifier scripts
+MODEL_CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model", "error_classifier_model")
+sys.path.append(MODEL_CODE_DIR)
+from ocr_engine import get_ocr_engine
+from screen_capture import capture_screen
+from rule_engine import is_confident, match_rules
+from train_xgboost import XGB_MODEL_FILE, predict_tasks
+from ui_jobs import TkJobRunner
 
 # File Paths
 QUEST_TRACKING_FILE = r"C:\Users\deven\Downloads\PUNE\PUNE\tasks.json"
 USER_PROGRESS_FILE = r"C:\Users\deven\Downloads\PUNE\PUNE\PROGRESS.JSON"
 DEFAULT_VIDEO_PATH = r"C:\Users\deven\Downloads\PUNE\PUNE\video\noti.mp4"
-IMAGE_PATH = r"C:\Users\deven\Downloads\PUNE\PUNE\images\screenshot.png"
-MODEL_PATH = r"C:\Users\deven\Downloads\PUNE\PUNE\model\error_categorization.model"
+# The XGBoost model online_update.py keeps current. It and the fine-tuned BERT are loaded through the
+# shared model registry the first time an error is analyzed (and reloaded when the model file is replaced),
+# so quest notifications never pay for them
+MODEL_PATH = os.path.join(MODEL_CODE_DIR, XGB_MODEL_FILE)
 
 # Ensure files exist
 for file in [QUEST_TRACKING_FILE, USER_PROGRESS_FILE]:
@@ -24,24 +32,6 @@ for file in [QUEST_TRACKING_FILE, USER_PROGRESS_FILE]:
         with open(file, 'w') as f:
             json.dump({}, f)  # Initialize empty JSON
 
-# Load trained model
-try:
-    xgb_model = joblib.load(MODEL_PATH)
-except FileNotFoundError:
-    print("Trained model not found! Please run train_xgboost.py first.")
-    exit()
-
-# Load BERT tokenizer & model
-tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
-bert_model = BertModel.from_pretrained("bert-base-uncased")
-
-def get_bert_embeddings(text):
-    """Convert error message text into numerical embeddings using BERT."""
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-    with torch.no_grad():
-        outputs = bert_model(**inputs)
-    return outputs.last_hidden_state[:, 0, :].squeeze().numpy()
-
 class QuestNotification:
     def __init__(self, root, quest_id, title, description, reward, difficulty, next_task_info):
         self.root = root
@@ -225,34 +215,70 @@ class ErrorAnalyzer:
         self.window.geometry("300x200")
 
         btn_analyze = tk.Button(self.window, text="Analyze Error", command=self.analyze_error, bg="blue", fg="white", font=("Arial", 12))
-        btn_analyze.pack(pady=50)
+        btn_analyze.pack(pady=(40, 10))
+
+        self.status_label = tk.Label(self.window, text="", font=("Arial", 10))
+        self.status_label.pack()
+        self.cancel_button = tk.Button(self.window, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_button.pack(pady=5)
+
+        # OCR and inference run in the background so the window stays responsive
+        self.jobs = TkJobRunner(self.window)
 
     def analyze_error(self):
-        """Analyze error using OCR and XGBoost model."""
+        """Analyze error using OCR and XGBoost model (in the background; a new click supersedes the last)."""
+        self.status_label.config(text="Analyzing...")
+        self.cancel_button.config(state="normal")
+        self.jobs.submit("analyze_error", self._analyze_error_job,
+                         on_done=self._show_result,
+                         on_error=self._show_failure,
+                         on_progress=lambda fraction, message: self.status_label.config(
+                             text=f"{message}... {fraction:.0%}"),
+                         on_cancel=lambda: self._finish("Cancelled."))
+
+    def cancel(self):
+        self.jobs.cancel("analyze_error")
+
+    def _analyze_error_job(self, job):
+        """Runs on a worker thread: returns (dialog kind, title, message) for the Tk thread to show."""
+        job.report(0.1, "Reading screen")
         error_text = self.extract_text_from_screenshot()
         if not error_text:
-            messagebox.showwarning("No Error", "No error text found in screenshot.")
-            return
+            return "warning", "No Error", "No error text found in screenshot."
+
+        job.report(0.6, "Classifying")
+        # Common exceptions are recognized by the rule table without running BERT
+        match = match_rules(error_text)
+        if is_confident(match):
+            return "info", "Error Analysis", f"Predicted Learning Module: {match.rule['related_task']}"
+
+        if not os.path.exists(MODEL_PATH):
+            return "error", "Model Missing", "Trained model not found! Please run train_xgboost.py first."
 
-        # Convert text into BERT embeddings
-        error_embedding = get_bert_embeddings(error_text).reshape(1, -1)
+        # Fine-tuned BERT embeddings, classified by the deployed XGBoost model
+        predicted_task, _ = predict_tasks([error_text], MODEL_CODE_DIR)[0]
+        job.check()
+        return "info", "Error Analysis", f"Predicted Learning Module: {predicted_task}"
 
-        # Predict using trained model
-        predicted_label = xgb_model.predict(error_embedding)[0]
+    def _show_result(self, result):
+        kind, title, message = result
+        self._finish("")
+        {"info": messagebox.showinfo, "warning": messagebox.showwarning, "error": messagebox.showerror}[kind](title, message)
 
-        # Display result
-        messagebox.showinfo("Error Analysis", f"Predicted Learning Module: {predicted_label}")
+    def _show_failure(self, error):
+        self._finish("")
+        messagebox.showerror("OCR Error", f"Failed to extract text: {str(error)}")
+
+    def _finish(self, status):
+        self.status_label.config(text=status)
+        self.cancel_button.config(state="disabled")
 
     def extract_text_from_screenshot(self):
-        """Extract text from the screenshot using OCR."""
-        try:
-            image = cv2.imread(IMAGE_PATH)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            text = pytesseract.image_to_string(gray)
-            return text.strip()
-        except Exception as e:
-            messagebox.showerror("OCR Error", f"Failed to extract text: {str(e)}")
-            return None
+        """Extract text from a fresh in-memory screen capture using OCR (safe to call off the Tk thread)."""
+        image = capture_screen()
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        text = get_ocr_engine().image_to_string(gray)
+        return text.strip()
 
 # Example Usage
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pyttsx3
+
+# How often (ms) the Tk loop drains finished work while jobs are running
+POLL_INTERVAL_MS = 50
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it was cancelled or superseded."""
+
+
+class Job:
+    """
+    Handle passed to the work function: lets it report progress and notice
+    cancellation between steps.
+    """
+
+    def __init__(self, name, generation, events):
+        self.name = name
+        self.generation = generation
+        self._events = events
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        """Stop the job here if it has been cancelled."""
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+
+    def report(self, fraction, message=""):
+        """Send progress (0.0-1.0 plus a short message) back to the Tk thread."""
+        self.check()
+        self._events.put((self, "progress", (fraction, message)))
+
+
+class TkJobRunner:
+    """
+    Runs slow work (screen capture, OCR, model inference) on a thread pool and
+    delivers progress, results and errors back on the Tk main thread through a
+    queue drained with `after()`. Tk widgets must only be touched from the
+    callbacks, never from the work function.
+
+    Jobs are named: submitting a job under a name that is already running
+    cancels the older one and its late results are dropped.
+    """
+
+    def __init__(self, root, max_workers=2, poll_interval_ms=POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_interval_ms = poll_interval_ms
+        # Threads rather than processes: OCR and PyTorch release the GIL, and the
+        # shared OCR engine and model registry live in this process
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-job")
+        self._events = queue.Queue()
+        self._current = {}
+        self._callbacks = {}
+        self._generation = 0
+        self._polling = False
+
+    def submit(self, name, work, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """
+        Run `work(job, *args)` in the background. `on_done(result)`,
+        `on_error(exception)`, `on_progress(fraction, message)` and `on_cancel()`
+        are called on the Tk thread.
+        """
+        # Supersede the job in flight quietly: its on_cancel is for explicit cancels
+        superseded = self._current.pop(name, None)
+        if superseded is not None:
+            superseded.cancel()
+        self._generation += 1
+        job = Job(name, self._generation, self._events)
+        self._current[name] = job
+        self._callbacks[job] = (on_done, on_error, on_progress, on_cancel)
+        self._executor.submit(self._run, job, work, args)
+        self._start_polling()
+        return job
+
+    def cancel(self, name):
+        """Cancel the running job with this name, if any, and call its on_cancel."""
+        job = self._current.pop(name, None)
+        if job is not None:
+            job.cancel()
+            on_cancel = self._callbacks[job][3]
+            if on_cancel is not None:
+                on_cancel()
+
+    def is_running(self, name):
+        return name in self._current
+
+    def shutdown(self):
+        for name in list(self._current):
+            self.cancel(name)
+        self._executor.shutdown(wait=False)
+
+    def _run(self, job, work, args):
+        try:
+            self._events.put((job, "done", work(job, *args)))
+        except JobCancelled:
+            self._events.put((job, "cancelled", None))
+        except Exception as e:
+            self._events.put((job, "error", e))
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                job, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            on_done, on_error, on_progress, _ = self._callbacks.get(job, (None, None, None, None))
+            # Results of cancelled or superseded jobs are dropped
+            if self._current.get(job.name) is not job:
+                if kind != "progress":
+                    self._callbacks.pop(job, None)
+                continue
+
+            if kind == "progress":
+                if on_progress is not None:
+                    on_progress(*payload)
+                continue
+
+            del self._current[job.name]
+            self._callbacks.pop(job, None)
+            if kind == "done" and on_done is not None:
+                on_done(payload)
+            elif kind == "error" and on_error is not None:
+                on_error(payload)
+
+        if self._current or not self._events.empty():
+            self.root.after(self.poll_interval_ms, self._poll)
+        else:
+            self._polling = False
+
+
+class Speaker:
+    """
+    Text-to-speech on one dedicated thread: pyttsx3 engines must be created and
+    driven from a single thread, and `runAndWait` blocks for the whole phrase.
+    Only the newest pending phrase is kept, so the voice never lags the UI.
+    """
+
+    def __init__(self):
+        self._pending = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._speak_forever, name="speech", daemon=True)
+        self._thread.start()
+
+    def say(self, text):
+        try:
+            self._pending.get_nowait()  # drop the phrase that has not started yet
+        except queue.Empty:
+            pass
+        try:
+            self._pending.put_nowait(text)
+        except queue.Full:
+            pass
+
+    def _speak_forever(self):
+        engine = pyttsx3.init()
+        while True:
+            engine.say(self._pending.get())
+            engine.runAndWait()
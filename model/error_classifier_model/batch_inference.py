@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+
+from traceback_condense import condense_traceback
+
+# Texts per forward pass and intra-op CPU threads, override with env variables
+INFERENCE_BATCH_SIZE = int(os.environ.get("INFERENCE_BATCH_SIZE", 32))
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 0))  # 0 keeps PyTorch's default
+MAX_LENGTH = 512
+# Long inputs are split into windows of MAX_LENGTH tokens overlapping by WINDOW_STRIDE
+WINDOW_STRIDE = 128
+MAX_WINDOWS = 4
+
+_threads_configured = False
+
+
+def set_inference_threads(threads):
+    """
+    Set the number of CPU threads PyTorch uses for a forward pass.
+    """
+    global _threads_configured
+    if threads and threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+    _threads_configured = True
+
+
+def encode_windows(tokenizer, texts, max_length=MAX_LENGTH, stride=WINDOW_STRIDE, max_windows=MAX_WINDOWS):
+    """
+    Tokenize texts into model-sized chunks instead of truncating them: a text
+    longer than `max_length` tokens is split into overlapping windows (sharing
+    `stride` tokens). Returns (input ids per chunk, index of the text each chunk
+    belongs to). When a text needs more than `max_windows` windows only the last
+    ones are kept, since the traceback sits at the end of screen text.
+    """
+    content_ids = tokenizer(list(texts), add_special_tokens=False, verbose=False)["input_ids"]
+    window = max_length - tokenizer.num_special_tokens_to_add()
+    step = max(window - stride, 1)
+
+    chunks, owners = [], []
+    for index, ids in enumerate(content_ids):
+        starts = [0]
+        while starts[-1] + window < len(ids):
+            starts.append(starts[-1] + step)
+        for start in starts[-max_windows:]:
+            chunks.append(tokenizer.build_inputs_with_special_tokens(ids[start:start + window]))
+            owners.append(index)
+    return chunks, owners
+
+
+def length_buckets(tokenizer, input_ids, batch_size=None):
+    """
+    Sort already tokenized sequences by length and yield (original indices,
+    padded batch) pairs where each batch is padded only to its own longest member.
+    """
+    batch_size = batch_size or INFERENCE_BATCH_SIZE
+    order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        batch = tokenizer.pad({"input_ids": [input_ids[i] for i in indices]}, return_tensors="pt")
+        yield indices, batch
+
+
+def run_batched(model, tokenizer, texts, reduce_outputs, batch_size=None, max_length=MAX_LENGTH, condense=True):
+    """
+    Run the model over texts in length-sorted batches and return the rows of
+    `reduce_outputs(outputs)` stacked back in the original input order.
+
+    Texts are first condensed to their traceback (see traceback_condense.py);
+    whatever is still longer than `max_length` is encoded as sliding windows
+    whose rows are mean-pooled into one row per text.
+    """
+    if not _threads_configured:
+        set_inference_threads(INFERENCE_THREADS)
+
+    texts = list(texts)
+    if condense:
+        texts = [condense_traceback(text) for text in texts]
+    chunks, owners = encode_windows(tokenizer, texts, max_length)
+
+    # Imported here so modules that only import this one (the UIs) never load PyTorch
+    import torch
+    chunk_rows = [None] * len(chunks)
+    with torch.inference_mode():
+        for indices, batch in length_buckets(tokenizer, chunks, batch_size):
+            rows = reduce_outputs(model(**batch))
+            for index, row in zip(indices, rows):
+                chunk_rows[index] = row
+
+    grouped = [[] for _ in texts]
+    for owner, row in zip(owners, chunk_rows):
+        grouped[owner].append(row)
+    results = [rows[0] if len(rows) == 1 else np.mean(rows, axis=0) for rows in grouped]
+    return np.stack(results) if results else np.empty((0,))
+
+
+def classify_logits(texts, model, tokenizer, batch_size=None):
+    """
+    Return the classifier logits for every text, shape (len(texts), num_labels).
+    """
+    return run_batched(model, tokenizer, texts, lambda outputs: outputs.logits.numpy(), batch_size)
+
+
+def classify_texts(texts, model, tokenizer, batch_size=None):
+    """
+    Return the predicted label id for every text, in input order.
+    """
+    logits = classify_logits(texts, model, tokenizer, batch_size)
+    return logits.argmax(axis=1).tolist() if len(logits) else []
+
+
+def embed_texts(texts, model, tokenizer, batch_size=None):
+    """
+    Return the [CLS] embedding of every text, shape (len(texts), hidden_size).
+    """
+    return run_batched(model, tokenizer, texts, lambda outputs: outputs.last_hidden_state[:, 0, :].numpy(), batch_size)
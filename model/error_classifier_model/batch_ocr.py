@@ -0,0 +1,137 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+
+from ocr_engine import get_ocr_engine
+from traceback_roi import TracebackLocator, to_gray_array
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+DEFAULT_OUTPUT = "ocr_results.jsonl"
+
+_use_roi = False
+
+
+def find_images(directory):
+    """
+    Walk a directory and yield every image path in a stable order.
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def read_paths_from_stdin():
+    """
+    Yield one image path per non-empty line of standard input.
+    """
+    for line in sys.stdin:
+        path = line.strip()
+        if path:
+            yield path
+
+
+def load_done_paths(output_path):
+    """
+    Return the paths that already have a successful result in the output file.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interruption
+            if "error" not in record:
+                done.add(record["path"])
+    return done
+
+
+def _init_worker(use_roi):
+    """
+    Start one single-threaded OCR engine per process; the process pool provides the parallelism.
+    """
+    global _use_roi
+    _use_roi = use_roi
+    get_ocr_engine(workers=1)
+
+
+def ocr_one(path):
+    """
+    OCR a single image and return a JSON-serialisable result with timings.
+    """
+    start = time.perf_counter()
+    try:
+        image = cv2.imread(path)
+        if image is None:
+            raise FileNotFoundError(f"Unable to read the file at {path}.")
+        loaded = time.perf_counter()
+
+        if _use_roi:
+            text, _ = TracebackLocator(get_ocr_engine()).extract(image)
+        else:
+            text = get_ocr_engine().image_to_string(to_gray_array(image))
+        finished = time.perf_counter()
+    except Exception as e:
+        return {"path": path, "error": str(e), "total_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    return {
+        "path": path,
+        "text": text.strip(),
+        "load_ms": round((loaded - start) * 1000, 1),
+        "ocr_ms": round((finished - loaded) * 1000, 1),
+        "total_ms": round((finished - start) * 1000, 1),
+    }
+
+
+def run_batch(paths, output_path, processes=None, use_roi=False, resume=True):
+    """
+    OCR the paths across a process pool and append one JSON line per image as results arrive.
+    """
+    done = load_done_paths(output_path) if resume else set()
+    pending = [path for path in dict.fromkeys(paths) if path not in done]
+    print(f"{len(done)} images already done, {len(pending)} to process.", file=sys.stderr)
+    if not pending:
+        return
+
+    # A run killed mid-write can leave a partial last line; start the new results on a fresh line
+    if resume and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb+") as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                file.write(b"\n")
+
+    start = time.perf_counter()
+    mode = "a" if resume else "w"
+    with open(output_path, mode, encoding="utf-8") as output, \
+            multiprocessing.Pool(processes, initializer=_init_worker, initargs=(use_roi,)) as pool:
+        for count, result in enumerate(pool.imap_unordered(ocr_one, pending), start=1):
+            output.write(json.dumps(result) + "\n")
+            output.flush()  # every finished image survives an interruption
+            status = "failed" if "error" in result else f"{result['total_ms']:.0f} ms"
+            print(f"[{count}/{len(pending)}] {result['path']}: {status}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {len(pending)} images in {elapsed:.1f} s ({len(pending) / elapsed:.1f} images/s).",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR a directory of screenshots across a process pool.")
+    parser.add_argument("directory", nargs="?", help="Directory to scan for images (omit to read paths from stdin)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="JSONL file results are appended to")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--roi", action="store_true", help="OCR only the detected traceback region")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess everything and overwrite the output")
+    args = parser.parse_args()
+
+    image_paths = find_images(args.directory) if args.directory else read_paths_from_stdin()
+    run_batch(image_paths, args.output, args.processes, use_roi=args.roi, resume=not args.no_resume)
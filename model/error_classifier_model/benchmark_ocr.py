@@ -0,0 +1,68 @@
+import argparse
+import glob
+import os
+import time
+
+import pytesseract
+from PIL import Image
+
+from ocr_engine import OCR_WORKERS, OCREngine
+
+# Sample screenshots shipped with the UI
+PUNE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "PUNE")
+DEFAULT_IMAGES = glob.glob(os.path.join(PUNE_DIR, "*.png")) + glob.glob(os.path.join(PUNE_DIR, "submitted task", "*.png"))
+
+
+def time_per_call(images):
+    """
+    Baseline: one pytesseract subprocess per image, as the entry points used to do.
+    """
+    start = time.perf_counter()
+    for image in images:
+        pytesseract.image_to_string(image)
+    return time.perf_counter() - start
+
+
+def time_engine_single(engine, images):
+    """
+    One image at a time through the persistent worker pool.
+    """
+    start = time.perf_counter()
+    for image in images:
+        engine.image_to_string(image)
+    return time.perf_counter() - start
+
+
+def time_engine_batch(engine, images):
+    """
+    All images submitted at once to the worker pool.
+    """
+    start = time.perf_counter()
+    engine.image_to_string_batch(images)
+    return time.perf_counter() - start
+
+
+def report(name, seconds, count):
+    print(f"{name:<28} total {seconds:8.2f} s   per image {seconds / count * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-call pytesseract OCR against the shared OCR engine.")
+    parser.add_argument("images", nargs="*", help="Images to OCR (defaults to the screenshots in PUNE/)")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS, help="Number of OCR engine workers")
+    parser.add_argument("--repeat", type=int, default=1, help="Process the image list this many times")
+    args = parser.parse_args()
+
+    paths = args.images or DEFAULT_IMAGES
+    if not paths:
+        parser.error("No images found to benchmark.")
+
+    # Decode once so both paths measure OCR only
+    images = [Image.open(path).convert("RGB") for path in paths] * args.repeat
+    print(f"Benchmarking {len(images)} images with {args.workers} engine workers...")
+
+    report("pytesseract per call", time_per_call(images), len(images))
+    with OCREngine(workers=args.workers) as engine:
+        engine.image_to_string(images[0])  # warm up the workers
+        report("engine, one at a time", time_engine_single(engine, images), len(images))
+        report("engine, batch", time_engine_batch(engine, images), len(images))
@@ -0,0 +1,217 @@
+import argparse
+import logging
+import time
+from collections import Counter
+
+import joblib
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from batch_inference import classify_texts
+from dataset_cache import load_samples
+from inference_client import get_client
+from label_vocabulary import label_vocabulary, task_names
+from model_registry import get_bert_classifier, get_tokenizer, registry
+from traceback_condense import condense_traceback
+
+BERT_MODEL_PATH = "bert_fine_tuned"
+FIRST_STAGE_FILE = "first_stage.joblib"
+TRAIN_FILE = "train_samples.json"
+VAL_FILE = "val_samples.json"
+# First-stage answers below this probability are escalated to BERT
+DEFAULT_THRESHOLD = 0.8
+# Largest accuracy drop against BERT-only accepted when tuning the threshold
+ACCURACY_TOLERANCE = 0.02
+# Calibrate probabilities only when every task has at least this many samples
+MIN_SAMPLES_PER_CLASS_FOR_CALIBRATION = 3
+
+logger = logging.getLogger("cascade")
+
+
+def make_vectorizer():
+    """Stateless hashed character n-grams, robust to OCR typos and unseen identifiers."""
+    return HashingVectorizer(analyzer="char_wb", ngram_range=(2, 4), n_features=2 ** 18,
+                             alternate_sign=False, norm="l2", lowercase=True)
+
+
+def train_first_stage(train_file=TRAIN_FILE, output_file=FIRST_STAGE_FILE, threshold=DEFAULT_THRESHOLD):
+    """
+    Train the hashed n-gram + logistic regression first stage and save it with
+    its label list and escalation threshold.
+    """
+    texts, tasks = load_samples(train_file)
+    # Ids from the label vocabulary, as in fine_tune_bert, so BERT label ids map onto this list
+    vocabulary = label_vocabulary(tasks)
+    labels = task_names(vocabulary)
+    y = np.array([vocabulary[task] for task in tasks])
+
+    vectorizer = make_vectorizer()
+    X = vectorizer.transform(texts)
+    classifier = LogisticRegression(C=10.0, max_iter=1000)
+    smallest_class = min(Counter(tasks).values())
+    if smallest_class >= MIN_SAMPLES_PER_CLASS_FOR_CALIBRATION:
+        classifier = CalibratedClassifierCV(classifier, method="sigmoid",
+                                            cv=min(smallest_class, 5))
+    classifier.fit(X, y)
+
+    bundle = {"vectorizer": vectorizer, "classifier": classifier, "labels": labels, "threshold": threshold}
+    joblib.dump(bundle, output_file)
+    print(f"First stage trained on {len(texts)} samples "
+          f"({'calibrated' if smallest_class >= MIN_SAMPLES_PER_CLASS_FOR_CALIBRATION else 'uncalibrated'}), "
+          f"saved to {output_file}")
+    return bundle
+
+
+class ModelCascade:
+    """
+    Two-tier task classifier: the cheap first stage answers when its confidence
+    clears the threshold, everything else is escalated to the fine-tuned BERT.
+    """
+
+    def __init__(self, first_stage_path=FIRST_STAGE_FILE, bert_path=BERT_MODEL_PATH, threshold=None):
+        self.first_stage_path = first_stage_path
+        self.bert_path = bert_path
+        self._threshold = threshold
+        self.tier_counts = Counter()
+
+    @property
+    def first_stage(self):
+        return registry.get(("first_stage", self.first_stage_path), lambda: joblib.load(self.first_stage_path))
+
+    @property
+    def labels(self):
+        return self.first_stage["labels"]
+
+    @property
+    def threshold(self):
+        return self._threshold if self._threshold is not None else self.first_stage["threshold"]
+
+    def first_stage_probabilities(self, texts):
+        """Return the first-stage class probabilities, shape (len(texts), len(labels))."""
+        stage = self.first_stage
+        condensed = [condense_traceback(text) for text in texts]
+        probabilities = stage["classifier"].predict_proba(stage["vectorizer"].transform(condensed))
+        # Classes absent from the training file still get a (zero) column
+        full = np.zeros((len(texts), len(stage["labels"])))
+        full[:, stage["classifier"].classes_] = probabilities
+        return full
+
+    def bert_predictions(self, texts):
+        """Return the BERT label index for every text."""
+        if not texts:
+            return []
+
+        def local(batch):
+            return classify_texts(batch, get_bert_classifier(self.bert_path), get_tokenizer(self.bert_path))
+        return get_client().classify(texts, self.bert_path, fallback=local)
+
+    def predict_batch(self, texts):
+        """
+        Return (task, tier, confidence) for every text, escalating only the
+        low-confidence ones to BERT in a single batched pass.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        probabilities = self.first_stage_probabilities(texts)
+        confidences = probabilities.max(axis=1)
+        results = [None] * len(texts)
+        escalated = []
+        for index, (row, confidence) in enumerate(zip(probabilities, confidences)):
+            if confidence >= self.threshold:
+                results[index] = (self.labels[int(row.argmax())], "first_stage", float(confidence))
+            else:
+                escalated.append(index)
+
+        for index, label in zip(escalated, self.bert_predictions([texts[i] for i in escalated])):
+            results[index] = (self.labels[label], "bert", float(confidences[index]))
+
+        for text, (task, tier, confidence) in zip(texts, results):
+            self.tier_counts[tier] += 1
+            logger.info("tier=%s task=%s confidence=%.3f text=%r", tier, task, confidence, text[:80])
+        return results
+
+    def predict(self, text):
+        """Return (task, tier, confidence) for a single error message."""
+        return self.predict_batch([text])[0]
+
+    def stats(self):
+        """Return how many requests each tier answered."""
+        total = sum(self.tier_counts.values())
+        return {
+            "first_stage": self.tier_counts["first_stage"],
+            "bert": self.tier_counts["bert"],
+            "first_stage_rate": round(self.tier_counts["first_stage"] / total, 3) if total else 0.0,
+        }
+
+
+def tune_threshold(cascade, val_file=VAL_FILE, tolerance=ACCURACY_TOLERANCE, save=True):
+    """
+    Sweep the escalation threshold on the validation samples and pick the
+    lowest one (most requests answered by the first stage) whose accuracy stays
+    within `tolerance` of BERT-only. The chosen threshold is saved with the first stage.
+    """
+    texts, tasks = load_samples(val_file)
+    truth = np.array([cascade.labels.index(task) if task in cascade.labels else -1 for task in tasks])
+    probabilities = cascade.first_stage_probabilities(texts)
+    first_stage = probabilities.argmax(axis=1)
+    confidences = probabilities.max(axis=1)
+    bert = np.array(cascade.bert_predictions(texts))
+
+    bert_accuracy = float(np.mean(bert == truth))
+    candidates = sorted(set(np.round(confidences, 4)) | set(np.round(np.linspace(0, 1, 21), 4)))
+    sweep = []
+    for threshold in candidates:
+        answered = confidences >= threshold
+        predictions = np.where(answered, first_stage, bert)
+        sweep.append({
+            "threshold": float(threshold),
+            "accuracy": round(float(np.mean(predictions == truth)), 4),
+            "first_stage_rate": round(float(np.mean(answered)), 4),
+        })
+
+    print(f"BERT-only accuracy: {bert_accuracy:.4f} (tolerance {tolerance})")
+    print("threshold  accuracy  first_stage_rate")
+    for row in sweep:
+        print(f"{row['threshold']:9.4f}  {row['accuracy']:8.4f}  {row['first_stage_rate']:16.4f}")
+
+    acceptable = [row for row in sweep if row["accuracy"] >= bert_accuracy - tolerance]
+    chosen = acceptable[0] if acceptable else sweep[-1]
+    print(f"Chosen threshold: {chosen['threshold']:.4f} "
+          f"(accuracy {chosen['accuracy']:.4f}, first stage answers {chosen['first_stage_rate']:.0%})")
+
+    if save:
+        bundle = dict(cascade.first_stage, threshold=chosen["threshold"])
+        joblib.dump(bundle, cascade.first_stage_path)
+        registry.unload(("first_stage", cascade.first_stage_path))
+    return chosen, sweep
+
+
+def time_first_stage(cascade, texts, repeat=100):
+    """Return the mean first-stage latency per single-text request in milliseconds."""
+    cascade.first_stage_probabilities(texts[:1])  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            cascade.first_stage_probabilities([text])
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and tune the first-stage classifier of the model cascade.")
+    parser.add_argument("--train-file", default=TRAIN_FILE, help="Samples used to train the first stage")
+    parser.add_argument("--val-file", default=VAL_FILE, help="Samples used to tune the escalation threshold")
+    parser.add_argument("--tolerance", type=float, default=ACCURACY_TOLERANCE,
+                        help="Accepted accuracy drop against BERT-only")
+    parser.add_argument("--tune-only", action="store_true", help="Keep the trained first stage and only retune")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if not args.tune_only:
+        train_first_stage(args.train_file)
+    model_cascade = ModelCascade()
+    tune_threshold(model_cascade, args.val_file, args.tolerance)
+    val_texts, _ = load_samples(args.val_file)
+    print(f"First stage latency: {time_first_stage(model_cascade, val_texts):.3f} ms per request")
@@ -0,0 +1,185 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+
+from dataset_cache import iter_samples
+from label_vocabulary import VOCAB_FILE, load_vocabulary, save_vocabulary
+
+SAMPLES_FILE = "error_samples.json"
+DATASET_DIR = "dataset"
+MANIFEST_FILE = "manifest.json"
+SHARD_SIZE = 100_000
+VAL_FRACTION = 0.2
+SPLITS = ("train", "val")
+# Dedup hashes inserted per SQLite transaction
+DEDUP_BATCH = 10_000
+
+
+def row_hash(text, label):
+    return hashlib.sha1(f"{label}\0{text}".encode("utf-8")).digest()
+
+
+class ShardWriter:
+    """Gzipped JSONL shards of one split, a new file every `shard_size` rows."""
+
+    def __init__(self, directory, split, shard_size=SHARD_SIZE):
+        self.directory = directory
+        self.split = split
+        self.shard_size = shard_size
+        self.shards = []
+        self.rows = 0
+        self._file = None
+
+    def write(self, record):
+        if self.rows % self.shard_size == 0:
+            self.close()
+            name = f"{self.split}-{len(self.shards):05d}.jsonl.gz"
+            self.shards.append(name)
+            self._file = gzip.open(os.path.join(self.directory, name), "wt", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_dataset(source_files, output_dir=DATASET_DIR, vocab_file=None, val_fraction=VAL_FRACTION,
+                  shard_size=SHARD_SIZE):
+    """
+    Stream samples from JSON/JSONL(.gz) files into deduplicated, stratified,
+    sharded train/val splits under output_dir. Memory use does not depend on
+    the corpus size: rows are streamed, seen-row hashes live in SQLite and the
+    split keeps one counter pair per task.
+
+    Each task's rows are assigned systematically: the n-th row of a task goes
+    to val whenever round(n * val_fraction) (halves rounded up) exceeds the
+    rows already in val. Rounding up means a task with 3 to 7 rows still gets
+    one val row, so small tasks are evaluated at all; their val share is then
+    above val_fraction (9 tasks of 3 rows put 9 of 27 rows in val), and the
+    manifest records the fraction actually reached.
+
+    Task ids come from the persisted label vocabulary shared with the
+    training scripts (labels.json by default): known tasks keep their id, new
+    ones are appended, and a copy is written into output_dir. Returns the manifest.
+    """
+    if isinstance(source_files, str):
+        source_files = [source_files]
+    vocab_file = vocab_file or VOCAB_FILE
+    vocabulary = load_vocabulary(vocab_file)
+    known_labels = len(vocabulary)
+
+    # Build next to the old dataset and swap at the end, so readers never see a half-written one
+    tmp_dir = output_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    seen = sqlite3.connect(os.path.join(tmp_dir, "dedup.sqlite3"))
+    seen.execute("CREATE TABLE seen (hash BLOB PRIMARY KEY) WITHOUT ROWID")
+    writers = {split: ShardWriter(tmp_dir, split, shard_size) for split in SPLITS}
+    counts = {}  # task -> [rows seen, rows sent to val]
+    duplicates = skipped = pending = 0
+
+    try:
+        for source_file in source_files:
+            for text, label, weight in iter_samples(source_file, weights=True):
+                if not text or label is None:
+                    skipped += 1
+                    continue
+                if seen.execute("INSERT OR IGNORE INTO seen VALUES (?)", (row_hash(text, label),)).rowcount == 0:
+                    duplicates += 1
+                    continue
+                pending += 1
+                if pending == DEDUP_BATCH:
+                    seen.commit()
+                    pending = 0
+
+                if label not in vocabulary:
+                    vocabulary[label] = len(vocabulary)
+                task_counts = counts.setdefault(label, [0, 0])
+                task_counts[0] += 1
+                # Val gets a row whenever its share of this task falls behind val_fraction
+                to_val = int(task_counts[0] * val_fraction + 0.5) > task_counts[1]
+                if to_val:
+                    task_counts[1] += 1
+                record = {"error_message": text, "related_task": label, "label": vocabulary[label]}
+                if weight is not None:
+                    # Cluster size from near_dedup.py, used as the sample weight in training
+                    record["weight"] = weight
+                writers["val" if to_val else "train"].write(record)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        seen.close()
+    os.remove(os.path.join(tmp_dir, "dedup.sqlite3"))
+
+    val_total = writers["val"].rows
+    manifest = {
+        "sources": source_files,
+        "val_fraction": val_fraction,
+        "actual_val_fraction": round(val_total / (val_total + writers["train"].rows), 4) if val_total else 0.0,
+        "duplicates": duplicates,
+        "skipped": skipped,
+        "new_labels": len(vocabulary) - known_labels,
+        "splits": {split: {"rows": writer.rows, "shards": writer.shards} for split, writer in writers.items()},
+        "tasks": {task: {"train": seen_rows - val_rows, "val": val_rows}
+                  for task, (seen_rows, val_rows) in sorted(counts.items())},
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    with open(os.path.join(tmp_dir, os.path.basename(VOCAB_FILE)), "w") as f:
+        json.dump(vocabulary, f, indent=2)
+    save_vocabulary(vocabulary, vocab_file)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    print(f"Built {output_dir}: {manifest['splits']['train']['rows']} train, {manifest['splits']['val']['rows']} val, "
+          f"{duplicates} duplicates dropped, {manifest['new_labels']} new labels")
+    return manifest
+
+
+def read_manifest(dataset_dir=DATASET_DIR):
+    with open(os.path.join(dataset_dir, MANIFEST_FILE), "r") as f:
+        return json.load(f)
+
+
+def iter_split(dataset_dir=DATASET_DIR, split="train"):
+    """Lazily yield the records of one split, shard by shard."""
+    for shard in read_manifest(dataset_dir)["splits"][split]["shards"]:
+        with gzip.open(os.path.join(dataset_dir, shard), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def export_json(dataset_dir, split, output_file):
+    """
+    Write one split as the JSON array files the training scripts read
+    (train_samples.json / val_samples.json), one record at a time. Records keep
+    their vocabulary id as "label" next to the task name, and their "weight" if they have one.
+    """
+    rows = 0
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in iter_split(dataset_dir, split):
+            f.write(",\n" if rows else "\n")
+            json.dump({key: record[key] for key in ("error_message", "related_task", "label", "weight")
+                       if key in record}, f, ensure_ascii=False)
+            rows += 1
+        f.write("\n]\n")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the deduplicated, sharded train/val dataset.")
+    parser.add_argument("sources", nargs="*", default=[SAMPLES_FILE], help="JSON, JSONL or JSONL.gz sample files")
+    parser.add_argument("--output", default=DATASET_DIR)
+    parser.add_argument("--vocab", help=f"Label vocabulary file (default: {VOCAB_FILE})")
+    parser.add_argument("--val-fraction", type=float, default=VAL_FRACTION)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    args = parser.parse_args()
+
+    build_dataset(args.sources, args.output, args.vocab, args.val_fraction, args.shard_size)
@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from label_vocabulary import label_vocabulary
+
+DATASET_CACHE_DIR = "dataset_cache"
+# Texts tokenized per chunk while building, so memory stays flat for any corpus size
+BUILD_CHUNK_SIZE = 1024
+ARRAYS = {"input_ids": np.int32, "attention_mask": np.int8}
+
+
+def _iter_json_array(f, chunk_size=2 ** 16):
+    """Yield the items of a JSON array file one at a time, reading it in chunks."""
+    decoder = json.JSONDecoder()
+    buffer, started, eof = "", False, False
+    while True:
+        buffer = buffer.lstrip()
+        if started:
+            while buffer[:1] == ",":
+                buffer = buffer[1:].lstrip()
+            if buffer[:1] == "]":
+                return
+        elif buffer:
+            if buffer[0] != "[":
+                raise ValueError(f"{f.name} is not a JSON array")
+            buffer, started = buffer[1:], True
+            continue
+
+        if buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+                # A value running to the end of the buffer may be cut short (a number), unless the file is done
+                if end < len(buffer) or eof:
+                    yield item
+                    buffer = buffer[end:]
+                    continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        elif eof:
+            raise ValueError(f"{f.name} ends in the middle of a JSON array")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def _read_items(file_path):
+    if file_path.endswith((".jsonl", ".jsonl.gz")):
+        opener = gzip.open if file_path.endswith(".gz") else open
+        with opener(file_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        # Streamed, so a large sample array is never held in memory at once
+        with open(file_path, "r", encoding="utf-8") as f:
+            yield from _iter_json_array(f)
+
+
+def iter_samples(file_path, weights=False):
+    """
+    Yield (text, task) pairs from a JSON array file or a (gzipped) JSONL file,
+    accepting both "error_message"/"related_task" and "text"/"label" keys. The
+    task name wins over "label", which the exported splits hold as a vocabulary id.
+    With weights=True, (text, task, weight) triples are yielded, the weight
+    being None for samples without one (see near_dedup.py).
+    """
+    for item in _read_items(file_path):
+        sample = item.get("error_message", item.get("text")), item.get("related_task", item.get("label"))
+        yield (*sample, item.get("weight")) if weights else sample
+
+
+def load_samples(file_path):
+    """Return (error messages, related tasks) lists from a samples file, in any format iter_samples reads."""
+    texts, tasks = [], []
+    for text, task in iter_samples(file_path):
+        texts.append(text)
+        tasks.append(task)
+    return texts, tasks
+
+
+def file_digest(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(2 ** 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(tokenizer, source_file, label_mapping, max_length):
+    """
+    Key of a token cache: changes when the source file, the tokenizer (class,
+    name and vocabulary size), the label mapping or the max length change.
+    """
+    parts = {
+        "source": file_digest(source_file),
+        "tokenizer": [type(tokenizer).__name__, tokenizer.name_or_path, len(tokenizer)],
+        "labels": sorted(label_mapping.items()),
+        "max_length": max_length,
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def build_token_cache(source_file, tokenizer, label_mapping=None, max_length=512, cache_dir=DATASET_CACHE_DIR):
+    """
+    Tokenize a sample file once into flat on-disk arrays (input ids, attention
+    masks, per-sample offsets and labels) and return the cache directory. An
+    existing cache with the same key is reused without tokenizing anything.
+    Without a label_mapping, ids come from the persisted label vocabulary.
+    """
+    if label_mapping is None:
+        label_mapping = label_vocabulary(label for _, label in iter_samples(source_file))
+    key = cache_key(tokenizer, source_file, label_mapping, max_length)
+    path = os.path.join(cache_dir, f"{os.path.basename(source_file)}-{key}")
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return path
+
+    # Build into a temporary directory and rename, so an interrupted build is never picked up
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    files = {name: open(os.path.join(tmp_path, f"{name}.bin"), "wb") for name in ARRAYS}
+    offsets, labels = [0], []
+
+    def flush(texts, chunk_labels):
+        encodings = tokenizer(texts, max_length=max_length, truncation=True)
+        for name, dtype in ARRAYS.items():
+            for row in encodings[name]:
+                files[name].write(np.asarray(row, dtype=dtype).tobytes())
+        for row in encodings["input_ids"]:
+            offsets.append(offsets[-1] + len(row))
+        labels.extend(label_mapping[label] for label in chunk_labels)
+
+    texts, chunk_labels = [], []
+    for text, label in iter_samples(source_file):
+        texts.append(text)
+        chunk_labels.append(label)
+        if len(texts) == BUILD_CHUNK_SIZE:
+            flush(texts, chunk_labels)
+            texts, chunk_labels = [], []
+    if texts:
+        flush(texts, chunk_labels)
+
+    for f in files.values():
+        f.close()
+    np.save(os.path.join(tmp_path, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "labels.npy"), np.asarray(labels, dtype=np.int64))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"source": source_file, "key": key, "samples": len(labels), "tokens": offsets[-1],
+                   "label_mapping": label_mapping}, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+class MemmapErrorDataset(Dataset):
+    """
+    Training samples read from a token cache built by build_token_cache. Items
+    are zero-copy slices of memory-mapped arrays (copy-on-write, so PyTorch gets
+    writable views); only the collator copies when it pads a batch.
+    """
+
+    def __init__(self, cache_path):
+        with open(os.path.join(cache_path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self.label_mapping = self.meta["label_mapping"]
+        self.offsets = np.load(os.path.join(cache_path, "offsets.npy"), mmap_mode="r")
+        self.labels = np.load(os.path.join(cache_path, "labels.npy"), mmap_mode="r")
+        self.arrays = {}
+        for name, dtype in ARRAYS.items():
+            file_path = os.path.join(cache_path, f"{name}.bin")
+            # np.memmap cannot map an empty file
+            self.arrays[name] = (np.memmap(file_path, dtype=dtype, mode="c")
+                                 if os.path.getsize(file_path) else np.empty(0, dtype=dtype))
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def lengths(self):
+        """Token count of every sample, read by fine_tune_bert.LengthGroupedTrainer."""
+        return np.diff(self.offsets).tolist()
+
+    def __getitem__(self, idx):
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        item = {name: torch.from_numpy(array[start:end]) for name, array in self.arrays.items()}
+        item["labels"] = int(self.labels[idx])
+        return item
+
+
+if __name__ == "__main__":
+    import time
+    from transformers import BertTokenizer
+
+    tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
+    for attempt in ("first build", "cached"):
+        start = time.perf_counter()
+        cache = build_token_cache("train_samples.json", tokenizer)
+        print(f"{attempt}: {cache} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    dataset = MemmapErrorDataset(cache)
+    print(f"{len(dataset)} samples, first item: {dataset[0]}")
@@ -1,11 +1,12 @@
-import re
+from rule_engine import match_all_rules
 
 
 def detect_syntax_error(text):
-    """Detect syntax errors from extracted text."""
-    syntax_error_match = re.search(r"(SyntaxError:.*|IndentationError:.*|unexpected EOF while parsing)", text)
-    if syntax_error_match:
-        return f"Syntax Error detected: {syntax_error_match.group()}"
+    """Detect syntax errors from extracted text, even when another error on screen matches more confidently."""
+    matches = [match for match in match_all_rules(text) if match.rule.get("category") == "syntax" and match.text]
+    if matches:
+        match = min(matches, key=lambda match: match.position)
+        return f"Syntax Error detected: {match.text}"
     else:
         return "No Syntax Error detected."
 
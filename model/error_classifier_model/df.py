@@ -1,18 +1,24 @@
-import json
-from sklearn.model_selection import train_test_split
+from dataset_builder import DATASET_DIR, build_dataset, export_json
 
-# Load the dataset
-with open("error_samples.json", "r") as file:
-    data = json.load(file)
+SAMPLES_FILE = "error_samples.json"
+TRAIN_FILE = "train_samples.json"
+VAL_FILE = "val_samples.json"
 
-# Split into 80% train and 20% validation
-train_data, val_data = train_test_split(data, test_size=0.2, random_state=42)
 
-# Save train and validation data to separate files
-with open("train_samples.json", "w") as train_file:
-    json.dump(train_data, train_file, indent=4)
+def split_samples(samples_file=SAMPLES_FILE, train_file=TRAIN_FILE, val_file=VAL_FILE, test_size=0.2,
+                  dataset_dir=DATASET_DIR):
+    """
+    Split the error samples into train and validation files. The split is done
+    by dataset_builder (streamed, deduplicated, stratified per task); the JSON
+    files are exported from its shards for the training scripts that read them.
+    """
+    build_dataset([samples_file], dataset_dir, val_fraction=test_size)
+    train_rows = export_json(dataset_dir, "train", train_file)
+    val_rows = export_json(dataset_dir, "val", val_file)
 
-with open("val_samples.json", "w") as val_file:
-    json.dump(val_data, val_file, indent=4)
+    print(f"Successfully split data into {train_file} and {val_file}.")
+    return train_rows, val_rows
 
-print("Successfully split data into train_samples.json and val_samples.json.")
+
+if __name__ == "__main__":
+    split_samples()
@@ -0,0 +1,214 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import torch
+from torch import nn
+
+from batch_inference import encode_windows, length_buckets
+from dataset_cache import load_samples
+from label_vocabulary import label_vocabulary, load_vocabulary, task_names
+from model_registry import get_bert_classifier, get_tokenizer, registry
+from traceback_condense import condense_traceback
+
+BERT_MODEL_PATH = "bert_fine_tuned"
+TRAIN_FILE = "train_samples.json"
+VAL_FILE = "val_samples.json"
+# Saved next to the fine-tuned weights written by fine_tune_bert.train_model
+HEADS_FILE = "early_exit_heads.pt"
+# Stop at the first exit whose normalized prediction entropy (0-1) is below this
+EXIT_ENTROPY_THRESHOLD = float(os.environ.get("EXIT_ENTROPY_THRESHOLD", 0.2))
+REPORT_THRESHOLDS = [0.05, 0.1, 0.2, 0.3, 0.5, 0.0]
+
+
+def heads_path(model_dir):
+    return os.path.join(model_dir, HEADS_FILE)
+
+
+def normalized_entropy(logits):
+    """Prediction entropy scaled to 0 (certain) - 1 (uniform), one value per row."""
+    log_probs = torch.log_softmax(logits, dim=-1)
+    entropy = -(log_probs.exp() * log_probs).sum(dim=-1)
+    return entropy / math.log(logits.shape[-1])
+
+
+class EarlyExitClassifier(nn.Module):
+    """
+    Fine-tuned BertForSequenceClassification with a linear classifier head on
+    the [CLS] state of every intermediate layer. Inference runs the encoder one
+    layer at a time and a row leaves the batch at the first head whose
+    prediction entropy is below the threshold; the rest reach the original
+    pooler and classifier.
+    """
+
+    def __init__(self, model, heads=None):
+        super().__init__()
+        self.model = model
+        hidden_size = model.config.hidden_size
+        num_labels = model.config.num_labels
+        self.exit_layers = list(range(model.config.num_hidden_layers - 1))
+        self.heads = heads if heads is not None else nn.ModuleList(
+            nn.Linear(hidden_size, num_labels) for _ in self.exit_layers)
+
+    @staticmethod
+    def _run_layer(layer, hidden, extended_mask):
+        output = layer(hidden, attention_mask=extended_mask)
+        return output[0] if isinstance(output, tuple) else output
+
+    def intermediate_cls(self, input_ids, attention_mask):
+        """[CLS] state after every exit layer, shape (exits, batch, hidden)."""
+        bert = self.model.bert
+        hidden = bert.embeddings(input_ids=input_ids)
+        extended_mask = bert.get_extended_attention_mask(attention_mask, input_ids.shape)
+        states = []
+        for index in self.exit_layers:
+            hidden = self._run_layer(bert.encoder.layer[index], hidden, extended_mask)
+            states.append(hidden[:, 0])
+        return torch.stack(states)
+
+    def forward(self, input_ids, attention_mask, threshold=EXIT_ENTROPY_THRESHOLD):
+        """
+        Return (logits, layers used per row). A threshold of 0 disables early exit.
+        """
+        bert = self.model.bert
+        batch_size = input_ids.shape[0]
+        logits = torch.zeros(batch_size, self.model.config.num_labels)
+        layers_used = torch.full((batch_size,), len(bert.encoder.layer), dtype=torch.long)
+        active = torch.arange(batch_size)
+
+        hidden = bert.embeddings(input_ids=input_ids)
+        extended_mask = bert.get_extended_attention_mask(attention_mask, input_ids.shape)
+        for index, layer in enumerate(bert.encoder.layer):
+            hidden = self._run_layer(layer, hidden, extended_mask)
+            if index >= len(self.heads):
+                break
+
+            head_logits = self.heads[index](hidden[:, 0])
+            done = normalized_entropy(head_logits) < threshold
+            if done.any():
+                logits[active[done]] = head_logits[done]
+                layers_used[active[done]] = index + 1
+                # Only the undecided rows continue through the remaining layers
+                keep = ~done
+                active, hidden, extended_mask = active[keep], hidden[keep], extended_mask[keep]
+                if not len(active):
+                    return logits, layers_used
+
+        logits[active] = self.model.classifier(bert.pooler(hidden))
+        return logits, layers_used
+
+
+def train_exit_heads(model_dir=BERT_MODEL_PATH, train_file=TRAIN_FILE, epochs=50, learning_rate=1e-3):
+    """
+    Train the intermediate heads on the frozen fine-tuned model. The encoder
+    runs once over the training samples; the heads are then fitted on the
+    cached [CLS] states, which takes seconds.
+    """
+    tokenizer = get_tokenizer(model_dir)
+    model = get_bert_classifier(model_dir, prefer_quantized=False)
+    classifier = EarlyExitClassifier(model)
+
+    texts, tasks = load_samples(train_file)
+    labels = label_vocabulary(tasks)  # same ids as fine_tune_bert
+    y = torch.tensor([labels[task] for task in tasks])
+    batch = tokenizer([condense_traceback(text) for text in texts], padding=True, truncation=True,
+                      return_tensors="pt")
+    with torch.inference_mode():
+        features = classifier.intermediate_cls(batch["input_ids"], batch["attention_mask"])
+    features = features.clone()
+
+    optimizer = torch.optim.Adam(classifier.heads.parameters(), lr=learning_rate)
+    loss_fn = nn.CrossEntropyLoss()
+    classifier.heads.train()
+    for _ in range(epochs):
+        optimizer.zero_grad()
+        loss = sum(loss_fn(head(features[i]), y) for i, head in enumerate(classifier.heads))
+        loss.backward()
+        optimizer.step()
+    classifier.heads.eval()
+
+    torch.save({"exit_layers": classifier.exit_layers, "state_dict": classifier.heads.state_dict()},
+               heads_path(model_dir))
+    print(f"Trained {len(classifier.heads)} exit heads (final loss {loss.item() / len(classifier.heads):.4f}), "
+          f"saved to {heads_path(model_dir)}")
+    return classifier
+
+
+def get_early_exit_classifier(model_dir=BERT_MODEL_PATH):
+    """Shared early-exit classifier built from the fine-tuned model and its saved heads."""
+    def load():
+        classifier = EarlyExitClassifier(get_bert_classifier(model_dir, prefer_quantized=False))
+        checkpoint = torch.load(heads_path(model_dir))
+        classifier.heads.load_state_dict(checkpoint["state_dict"])
+        return classifier.eval()
+    return registry.get(("early_exit", model_dir), load)
+
+
+def classify_logits_early_exit(texts, classifier, tokenizer, threshold=EXIT_ENTROPY_THRESHOLD, batch_size=None):
+    """
+    Early-exit counterpart of batch_inference.classify_logits: returns
+    (logits per text, mean layers used per text).
+    """
+    texts = [condense_traceback(text) for text in texts]
+    chunks, owners = encode_windows(tokenizer, texts)
+    chunk_logits = [None] * len(chunks)
+    chunk_layers = [0] * len(chunks)
+    with torch.inference_mode():
+        for indices, batch in length_buckets(tokenizer, chunks, batch_size):
+            logits, layers = classifier(batch["input_ids"], batch["attention_mask"], threshold)
+            for row, index in enumerate(indices):
+                chunk_logits[index] = logits[row].numpy()
+                chunk_layers[index] = int(layers[row])
+
+    grouped_logits = [[] for _ in texts]
+    grouped_layers = [[] for _ in texts]
+    for owner, row, layers in zip(owners, chunk_logits, chunk_layers):
+        grouped_logits[owner].append(row)
+        grouped_layers[owner].append(layers)
+    logits = np.stack([np.mean(rows, axis=0) for rows in grouped_logits]) if texts else np.empty((0,))
+    return logits, np.array([np.mean(layers) for layers in grouped_layers])
+
+
+def exit_report(model_dir=BERT_MODEL_PATH, val_file=VAL_FILE, thresholds=REPORT_THRESHOLDS, repeat=5):
+    """
+    Print average layers used, latency and accuracy on the validation samples
+    for each entropy threshold (0 means no early exit, the full model).
+    """
+    tokenizer = get_tokenizer(model_dir)
+    classifier = get_early_exit_classifier(model_dir)
+    texts, tasks = load_samples(val_file)
+    labels = task_names(load_vocabulary())
+    truth = np.array([labels.index(task) if task in labels else -1 for task in tasks])
+
+    rows = []
+    print(f"{'threshold':>9}  {'avg layers':>10}  {'ms/sample':>9}  {'accuracy':>8}")
+    for threshold in thresholds:
+        classify_logits_early_exit(texts[:1], classifier, tokenizer, threshold)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            logits, layers = classify_logits_early_exit(texts, classifier, tokenizer, threshold, batch_size=1)
+        ms = (time.perf_counter() - start) / (repeat * len(texts)) * 1000
+        row = {
+            "threshold": threshold,
+            "avg_layers": round(float(layers.mean()), 2),
+            "ms_per_sample": round(ms, 2),
+            "accuracy": round(float(np.mean(logits.argmax(axis=1) == truth)), 4),
+        }
+        rows.append(row)
+        print(f"{threshold:>9}  {row['avg_layers']:>10}  {row['ms_per_sample']:>9}  {row['accuracy']:>8}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train early-exit heads for the fine-tuned classifier and report.")
+    parser.add_argument("--model-dir", default=BERT_MODEL_PATH, help="Directory written by fine_tune_bert.train_model")
+    parser.add_argument("--train-file", default=TRAIN_FILE)
+    parser.add_argument("--val-file", default=VAL_FILE)
+    parser.add_argument("--report-only", action="store_true", help="Skip training and only print the report")
+    args = parser.parse_args()
+
+    if not args.report_only:
+        train_exit_heads(args.model_dir, args.train_file)
+    exit_report(args.model_dir, args.val_file)
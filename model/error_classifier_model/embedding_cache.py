@@ -0,0 +1,100 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from model_registry import bert_model_files
+from result_cache import artifact_fingerprint
+
+EMBEDDING_CACHE_DIR = "embedding_cache"
+# Code that turns a text into the encoder's input (condensing, sliding windows, pooling)
+PREPROCESSING_MODULES = ("traceback_condense.py", "batch_inference.py")
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def preprocessing_fingerprint(modules=PREPROCESSING_MODULES):
+    """Hash of the preprocessing code's contents, so a changed module invalidates cached embeddings."""
+    digest = hashlib.sha1()
+    code_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in modules:
+        with open(os.path.join(code_dir, module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk [CLS] embedding matrix for one encoder. Rows are keyed by a hash of
+    the text, and the whole cache by a fingerprint of the encoder's model files
+    (not of everything in its directory, so an int8 export or exit heads do not
+    invalidate it) and of the preprocessing code the embeddings go through. Retraining only embeds samples that are new or changed since
+    the last run; a new encoder starts a fresh cache and, once that is written,
+    the caches of earlier versions of the encoder are deleted.
+    """
+
+    def __init__(self, model_path, cache_dir=EMBEDDING_CACHE_DIR):
+        self.model_path = model_path
+        # One directory per encoder, holding the cache of its current version
+        self.model_dir = os.path.join(cache_dir, os.path.basename(os.path.normpath(model_path)))
+        version = hashlib.sha1(f"{artifact_fingerprint(bert_model_files(model_path))}:"
+                               f"{preprocessing_fingerprint()}".encode()).hexdigest()
+        self.path = os.path.join(self.model_dir, version[:16])
+        self.hits = 0
+        self.misses = 0
+        hashes_file = os.path.join(self.path, "hashes.npy")
+        if os.path.exists(hashes_file):
+            self.hashes = np.load(hashes_file)
+            self.matrix = np.load(os.path.join(self.path, "embeddings.npy"))
+        else:
+            self.hashes = np.empty(0, dtype="S40")
+            self.matrix = None
+        self._rows = {key: row for row, key in enumerate(self.hashes.tolist())}
+
+    def get(self, texts, embed_fn):
+        """
+        Return the embedding matrix for texts (in order); `embed_fn(texts)` is
+        only called, once and batched, for the texts not cached yet.
+        """
+        keys = [text_hash(text).encode() for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._rows and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        if missing:
+            new_rows = np.asarray(embed_fn(list(missing.values())), dtype=np.float32)
+            start = len(self.hashes)
+            self.hashes = np.concatenate([self.hashes, np.array(list(missing), dtype="S40")])
+            self.matrix = new_rows if self.matrix is None else np.concatenate([self.matrix, new_rows])
+            for offset, key in enumerate(missing):
+                self._rows[key] = start + offset
+            self._save()
+
+        if not texts:
+            return np.empty((0, 0 if self.matrix is None else self.matrix.shape[1]), dtype=np.float32)
+        return self.matrix[[self._rows[key] for key in keys]]
+
+    def _save(self):
+        if not os.path.exists(self.path):
+            self._prune()
+        os.makedirs(self.path, exist_ok=True)
+        # Write both files under temporary names first so a crash never pairs old hashes with new rows
+        for name, array in (("embeddings", self.matrix), ("hashes", self.hashes)):
+            tmp_file = os.path.join(self.path, f"{name}.tmp.npy")
+            np.save(tmp_file, array)
+            os.replace(tmp_file, os.path.join(self.path, f"{name}.npy"))
+
+    def _prune(self):
+        """Delete the caches of superseded versions of this encoder."""
+        if os.path.isdir(self.model_dir):
+            for name in os.listdir(self.model_dir):
+                shutil.rmtree(os.path.join(self.model_dir, name), ignore_errors=True)
+
+    def stats(self):
+        return {"cached_rows": len(self.hashes), "hits": self.hits, "embedded": self.misses}
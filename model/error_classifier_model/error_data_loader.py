@@ -1,21 +1,22 @@
-import json
 from transformers import BertTokenizer
 
+from dataset_cache import load_samples
+from label_vocabulary import label_vocabulary
 
-def load_data(file_path):
+
+def load_data(file_path, label_mapping=None):
     """
     Load error messages and their corresponding labels from a JSON file.
+    Without a label_mapping, ids come from the persisted label vocabulary (as
+    in fine_tune_bert), so they are the same on every run.
     """
     try:
-        with open(file_path, "r") as f:
-            error_data = json.load(f)
-
-        # Extract error messages and related tasks
-        texts = [entry["error_message"] for entry in error_data]
-        labels = [entry["related_task"] for entry in error_data]
+        # Streamed, so the sample file is never parsed as a whole
+        texts, labels = load_samples(file_path)
 
-        # Create a mapping of task names to unique integer labels
-        label_mapping = {task: idx for idx, task in enumerate(set(labels))}
+        # Map task names to the ids the models were trained with
+        if label_mapping is None:
+            label_mapping = label_vocabulary(labels)
         numeric_labels = [label_mapping[label] for label in labels]
 
         return texts, numeric_labels, label_mapping
@@ -1,19 +1,37 @@
-import numpy as np
-import torch
-from transformers import BertTokenizer, BertForSequenceClassification
-from xgboost import XGBClassifier
-import joblib
 import json
+import os
 from ocr_extraction import extract_text_from_image
+from cascade import FIRST_STAGE_FILE, ModelCascade
+from label_vocabulary import VOCAB_FILE
+from result_cache import ResultCache
+from rule_engine import is_confident, match_rules
+from train_xgboost import XGB_MODEL_FILE, predict_tasks
 
-# Load models and data
-bert_model = BertForSequenceClassification.from_pretrained("bert_fine_tuned")
-tokenizer = BertTokenizer.from_pretrained("bert_fine_tuned")
-xgb_model = joblib.load("xgboost_model.pkl")
+# Model artifacts, loaded on first use through the shared model registry
+BERT_MODEL_PATH = "bert_fine_tuned"
+XGB_MODEL_PATH = XGB_MODEL_FILE
+TASKS_FILE = "tasks.json"
+UNKNOWN_TASK = {"module_name": "Unknown", "xp": 0, "video_path": "", "steps": []}
 
-with open("tasks.json", "r") as f:
+with open(TASKS_FILE, "r") as f:
     tasks = json.load(f)
 
+# Repeat errors skip BERT and XGBoost; entries are dropped when any of these artifacts change
+result_cache = ResultCache([BERT_MODEL_PATH, XGB_MODEL_PATH, VOCAB_FILE, TASKS_FILE, FIRST_STAGE_FILE])
+# Cheap first stage in front of BERT, used once it has been trained (see cascade.py)
+model_cascade = ModelCascade(FIRST_STAGE_FILE, BERT_MODEL_PATH)
+
+
+def task_prediction(error_type, task):
+    """Build the prediction returned to the caller for an error type and its task."""
+    return {
+        "error_type": error_type,
+        "suggested_task": task["module_name"],
+        "xp_reward": task["xp"],
+        "video_path": task["video_path"],
+        "steps": " -> ".join(task["steps"]),
+    }
+
 
 def predict_error(image_path):
     """Predicts the error type and suggests tasks related to errors."""
@@ -22,22 +40,27 @@ def predict_error(image_path):
     if not extracted_text:
         return {"error": "No text extracted from image!"}
 
-    inputs = tokenizer(extracted_text, return_tensors="pt", padding=True, truncation=True)
-    with torch.no_grad():
-        logits = bert_model(**inputs).logits
+    # Common exceptions are recognized by the rule table without running BERT
+    match = match_rules(extracted_text)
+    if is_confident(match):
+        task = tasks.get(match.rule["related_task"].replace("_", " "), UNKNOWN_TASK)
+        return task_prediction(match.rule["name"], task)
 
-    predicted_label = torch.argmax(logits, dim=1).item()
-    related_task_id = xgb_model.predict(np.array([[predicted_label]]))[0]
+    cached = result_cache.get(extracted_text)
+    if cached is not None:
+        return cached
 
-    task = tasks.get(str(related_task_id), {"module_name": "Unknown", "xp": 0, "video_path": "", "steps": []})
+    if os.path.exists(FIRST_STAGE_FILE):
+        task_name, _, _ = model_cascade.predict(extracted_text)
+        prediction = task_prediction(task_name, tasks.get(task_name.replace("_", " "), UNKNOWN_TASK))
+        result_cache.put(extracted_text, prediction)
+        return prediction
 
-    return {
-        "error_type": predicted_label,
-        "suggested_task": task["module_name"],
-        "xp_reward": task["xp"],
-        "video_path": task["video_path"],
-        "steps": " -> ".join(task["steps"]),
-    }
+    # Fine-tuned BERT embeddings (from the inference daemon when it runs) classified by XGBoost
+    task_name, _ = predict_tasks([extracted_text])[0]
+    prediction = task_prediction(task_name, tasks.get(task_name.replace("_", " "), UNKNOWN_TASK))
+    result_cache.put(extracted_text, prediction)
+    return prediction
 
 
 if __name__ == "__main__":
@@ -46,3 +69,5 @@ if __name__ == "__main__":
     prediction = predict_error(image_path)
     print("Prediction Results:")
     print(prediction)
+    print(f"Result cache: {result_cache.stats()}")
+    print(f"Cascade tiers: {model_cascade.stats()}")
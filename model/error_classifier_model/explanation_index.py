@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from batch_inference import embed_texts
+from inference_client import get_client
+from model_registry import get_bert_encoder, get_tokenizer
+
+BERT_MODEL_PATH = "bert_fine_tuned"
+SAMPLES_FILE = "error_samples.json"
+# Saved inside the model directory, so the index always matches the encoder
+EMBEDDINGS_FILE = "explanation_embeddings.npy"
+META_FILE = "explanation_meta.json"
+IVF_FILE = "explanation_ivf.npz"
+# Corpora at least this large get the approximate (IVF) index by default
+APPROX_MIN_ROWS = 100_000
+DEFAULT_PROBES = 8
+
+
+def normalize_rows(matrix):
+    """Scale every row to unit length so a dot product is the cosine similarity."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first, without sorting the whole array."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def kmeans(vectors, n_lists, iterations=10, seed=0):
+    """Spherical k-means on unit vectors; returns (centroids, list id per vector)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for list_id in range(n_lists):
+            members = vectors[assignment == list_id]
+            if len(members):
+                centroids[list_id] = members.mean(axis=0)
+        centroids = normalize_rows(centroids)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+def build_index(samples_file=SAMPLES_FILE, model_dir=BERT_MODEL_PATH, approximate=None, n_lists=None):
+    """
+    Embed every sample error message once with the fine-tuned encoder and save
+    the normalized matrix plus the explanations next to the model. With
+    `approximate` (default: for APPROX_MIN_ROWS samples or more) an inverted-file
+    index of k-means clusters is saved as well.
+    """
+    with open(samples_file, "r") as f:
+        samples = json.load(f)
+    entries = [{"error_message": entry["error_message"],
+                "related_task": entry["related_task"],
+                "explanation": entry.get("explanation", "")} for entry in samples]
+
+    start = time.perf_counter()
+    embeddings = embed_texts([entry["error_message"] for entry in entries],
+                             get_bert_encoder(model_dir), get_tokenizer(model_dir))
+    matrix = normalize_rows(embeddings)
+    np.save(os.path.join(model_dir, EMBEDDINGS_FILE), matrix)
+    with open(os.path.join(model_dir, META_FILE), "w") as f:
+        json.dump(entries, f, indent=2)
+    print(f"Indexed {len(entries)} samples ({matrix.shape[1]} dims) in {time.perf_counter() - start:.1f} s")
+
+    if approximate is None:
+        approximate = len(entries) >= APPROX_MIN_ROWS
+    if approximate:
+        n_lists = n_lists or max(1, int(np.sqrt(len(entries))))
+        centroids, assignment = kmeans(matrix, n_lists)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        np.savez(os.path.join(model_dir, IVF_FILE), centroids=centroids, order=order, offsets=offsets)
+        print(f"Built approximate index with {n_lists} lists")
+    elif os.path.exists(os.path.join(model_dir, IVF_FILE)):
+        # Left over from an earlier approximate build: its lists index the old matrix
+        os.remove(os.path.join(model_dir, IVF_FILE))
+
+
+class ExplanationIndex:
+    """
+    Nearest-neighbour lookup of curated explanations: one matrix product of the
+    query embedding against the precomputed, normalized sample matrix (or, with
+    the approximate index, against only the closest k-means lists).
+    """
+
+    def __init__(self, model_dir=BERT_MODEL_PATH, probes=DEFAULT_PROBES):
+        self.model_dir = model_dir
+        self.probes = probes
+        self.matrix = np.load(os.path.join(model_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(model_dir, META_FILE), "r") as f:
+            self.entries = json.load(f)
+        self.ivf = None
+        ivf_path = os.path.join(model_dir, IVF_FILE)
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                self.ivf = {name: ivf[name] for name in ivf.files}
+
+    @staticmethod
+    def exists(model_dir=BERT_MODEL_PATH):
+        return os.path.exists(os.path.join(model_dir, EMBEDDINGS_FILE))
+
+    def embed(self, texts):
+        """Embed queries with the same encoder the index was built with."""
+        model_dir = self.model_dir
+        return normalize_rows(get_client().embed(
+            texts, model_dir, fallback=lambda batch: embed_texts(batch, get_bert_encoder(model_dir),
+                                                                 get_tokenizer(model_dir))))
+
+    def search_vector(self, vector, k=3):
+        """Return [(row index, cosine similarity)] of the k nearest samples."""
+        if self.ivf is None:
+            scores = self.matrix @ vector
+            return [(int(i), float(scores[i])) for i in top_k(scores, k)]
+
+        # Approximate: score only the rows of the `probes` closest clusters
+        lists = top_k(self.ivf["centroids"] @ vector, self.probes)
+        offsets, order = self.ivf["offsets"], self.ivf["order"]
+        # Sorted rows keep the reads from the memory-mapped matrix sequential
+        rows = np.sort(np.concatenate([order[offsets[i]:offsets[i + 1]] for i in lists]))
+        scores = np.asarray(self.matrix[rows]) @ vector
+        return [(int(rows[i]), float(scores[i])) for i in top_k(scores, k)]
+
+    def search(self, text, k=3):
+        """
+        Return the k sample errors closest to the text, best first, each with
+        its explanation, related_task and similarity score.
+        """
+        vector = self.embed([text])[0]
+        return [dict(self.entries[row], score=round(score, 4)) for row, score in self.search_vector(vector, k)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the explanation nearest-neighbour index.")
+    parser.add_argument("--model-dir", default=BERT_MODEL_PATH, help="Fine-tuned encoder directory")
+    parser.add_argument("--samples", default=SAMPLES_FILE, help="Samples with explanations to index")
+    parser.add_argument("--approximate", action="store_true", help="Also build the IVF approximate index")
+    parser.add_argument("--query", help="Look up an error message instead of building the index")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.query:
+        index = ExplanationIndex(args.model_dir)
+        query_vector = index.embed([args.query])[0]
+        started = time.perf_counter()
+        results = index.search_vector(query_vector, args.k)
+        print(f"Search took {(time.perf_counter() - started) * 1000:.3f} ms")
+        for row, similarity in results:
+            entry = index.entries[row]
+            print(f"{similarity:.3f}  [{entry['related_task']}] {entry['error_message']}\n       {entry['explanation']}")
+    else:
+        build_index(args.samples, args.model_dir, approximate=args.approximate or None)
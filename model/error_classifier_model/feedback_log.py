@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+FEEDBACK_LOG_FILE = "feedback_log.jsonl"
+
+
+class FeedbackLog:
+    """
+    Append-only JSONL log of analyzed errors and the task labels users confirm.
+
+    Every analysis is one "analysis" record (text, predicted task, where the
+    prediction came from); a user confirming or correcting it appends a
+    "confirmation" record with the same id. Nothing is ever rewritten, so the
+    log is safe to append to from several threads and to read while it grows.
+    """
+
+    def __init__(self, path=FEEDBACK_LOG_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def record_analysis(self, text, predicted_task=None, source=None, confidence=None):
+        """Log one analyzed error and return its id, used to confirm it later."""
+        analysis_id = uuid.uuid4().hex
+        self._append({"type": "analysis", "id": analysis_id, "time": time.time(), "text": text,
+                      "predicted_task": predicted_task, "source": source, "confidence": confidence})
+        return analysis_id
+
+    def confirm(self, analysis_id, task):
+        """Record the correct task for an analysis (the predicted one or a correction)."""
+        self._append({"type": "confirmation", "id": analysis_id, "time": time.time(), "task": task})
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash mid-write
+                    continue
+
+    def confirmed_samples(self):
+        """
+        Return [{"error_message", "related_task", "predicted_task", "time"}] for
+        every confirmation, in the order they were logged.
+        """
+        analyses = {}
+        samples = []
+        for record in self.records():
+            if record.get("type") == "analysis":
+                analyses[record["id"]] = record
+            elif record.get("type") == "confirmation" and record.get("id") in analyses:
+                analysis = analyses[record["id"]]
+                samples.append({"error_message": analysis["text"], "related_task": record["task"],
+                                "predicted_task": analysis.get("predicted_task"), "time": record["time"]})
+        return samples
+
+    def stats(self):
+        counts = {"analysis": 0, "confirmation": 0}
+        for record in self.records():
+            if record.get("type") in counts:
+                counts[record["type"]] += 1
+        return {"analyses": counts["analysis"], "confirmations": counts["confirmation"]}
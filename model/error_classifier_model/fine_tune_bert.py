@@ -1,23 +1,33 @@
 from transformers import (
     BertTokenizer,
     BertForSequenceClassification,
+    DataCollatorWithPadding,
     Trainer,
+    TrainerCallback,
     TrainingArguments,
 )
+from transformers.trainer_pt_utils import LengthGroupedSampler
+import argparse
+import time
 import torch
 from torch.utils.data import Dataset
-import json
+from dataset_cache import MemmapErrorDataset, build_token_cache, iter_samples, load_samples
+from label_vocabulary import label_vocabulary
+from model_registry import resident_memory_bytes
+
+BERT_MODEL_PATH = "bert_fine_tuned"
 
 
 # Function to load dataset
-def load_data(file_path):
-    with open(file_path, "r") as file:
-        data = json.load(file)
-
-    texts = [item["text"] for item in data]
-    labels = [item["label"] for item in data]
-    unique_labels = sorted(set(labels))
-    label_mapping = {label: i for i, label in enumerate(unique_labels)}
+def load_data(file_path, label_mapping=None):
+    """
+    Load texts and label ids. The sample files use "error_message"/"related_task";
+    "text"/"label" are accepted too. Without a label_mapping, ids come from the
+    persisted label vocabulary, so every model and retrain uses the same ids.
+    """
+    texts, labels = load_samples(file_path)
+    if label_mapping is None:
+        label_mapping = label_vocabulary(labels)
     labels = [label_mapping[label] for label in labels]
 
     return texts, labels, label_mapping
@@ -35,6 +45,51 @@ def tokenize_texts(texts, tokenizer, max_length=512):
     return encodings
 
 
+# Dynamic padding: tokenize without padding, the data collator pads each batch to its longest sample
+def tokenize_unpadded(texts, tokenizer, max_length=512):
+    return tokenizer(texts, max_length=max_length, truncation=True)
+
+
+def cpu_supports_bf16():
+    """True when this CPU has native bf16 instructions (AVX512-BF16 or AMX)."""
+    try:
+        return torch.cpu._is_avx512_bf16_supported() or torch.cpu._is_amx_tile_supported()
+    except AttributeError:
+        return False
+
+
+class ThroughputCallback(TrainerCallback):
+    """Print training samples/sec and peak resident memory for every epoch."""
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self.epoch_start = time.perf_counter()
+        self.start_step = state.global_step
+        self.peak_memory = resident_memory_bytes() or 0
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self.peak_memory = max(self.peak_memory, resident_memory_bytes() or 0)
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        elapsed = time.perf_counter() - self.epoch_start
+        samples = (state.global_step - self.start_step) * args.train_batch_size * args.gradient_accumulation_steps
+        print(f"Epoch {state.epoch:.0f}: {samples / elapsed:.1f} samples/sec, "
+              f"peak memory {self.peak_memory / 2 ** 20:.0f} MB, {elapsed:.1f} s")
+
+
+class LengthGroupedTrainer(Trainer):
+    """
+    Trainer that builds the length-grouped sampler from the dataset's `lengths`
+    (the token cache stores them), instead of reading every item to measure it.
+    """
+
+    def _get_train_sampler(self, *args, **kwargs):
+        lengths = getattr(self.train_dataset, "lengths", None)
+        if self.args.group_by_length and lengths is not None:
+            return LengthGroupedSampler(self.args.train_batch_size * self.args.gradient_accumulation_steps,
+                                        lengths=lengths)
+        return super()._get_train_sampler(*args, **kwargs)
+
+
 # Custom dataset class
 class ErrorDataset(Dataset):
     def __init__(self, encodings, labels):
@@ -45,38 +100,61 @@ class ErrorDataset(Dataset):
         return len(self.labels)
 
     def __getitem__(self, idx):
-        item = {key: torch.tensor(val[idx]) for key, val in self.encodings.items()}
-        item["labels"] = torch.tensor(self.labels[idx])
+        # as_tensor returns a view of already-tensor encodings instead of copying them
+        item = {key: torch.as_tensor(val[idx]) for key, val in self.encodings.items()}
+        item["labels"] = torch.as_tensor(self.labels[idx])
         return item
 
 
 # Main training function
-def train_model():
-    # Load training and validation data
+def train_model(fast=False, epochs=3, batch_size=8, gradient_accumulation_steps=1, bf16=False,
+                output_dir=BERT_MODEL_PATH, use_cache=True):
+    """
+    Fine-tune bert-base-uncased on the error samples.
+
+    fast=True is the throughput mode: unpadded tokenization with a padding data
+    collator, length-grouped batches, gradient accumulation and, when the CPU
+    supports it and bf16=True, bf16 autocast. Samples/sec and peak memory are
+    printed for every epoch. With use_cache (fast mode only) the samples come
+    from the memory-mapped token cache of dataset_cache.py.
+    """
     train_file_path = "train_samples.json"
     val_file_path = "val_samples.json"
-    print(f"Debug: Loading training data from {train_file_path}...")
-    train_texts, train_labels, label_mapping = load_data(train_file_path)
-    print(f"Debug: Loading validation data from {val_file_path}...")
-    val_texts, val_labels, _ = load_data(val_file_path)
-
-    print(f"Loaded {len(train_texts)} training samples and {len(val_texts)} validation samples.")
-    print(f"Label mapping: {label_mapping}")
-
-    # Initialize tokenizer and tokenize data
     print("Debug: Initializing tokenizer...")
     tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
-    print("Debug: Tokenizing texts...")
-    train_encodings = tokenize_texts(train_texts, tokenizer)
-    val_encodings = tokenize_texts(val_texts, tokenizer)
-
-    print(f"Sample tokenized text (train): {train_encodings['input_ids'][0]}")
-    print(f"Sample tokenized text (val): {val_encodings['input_ids'][0]}")
-
-    # Wrap data into datasets
-    print("Debug: Wrapping datasets...")
-    train_dataset = ErrorDataset(train_encodings, train_labels)
-    eval_dataset = ErrorDataset(val_encodings, val_labels)
+    # Ids from the persisted vocabulary, extended by any task new in either file
+    label_mapping = label_vocabulary(label for path in (train_file_path, val_file_path)
+                                     for _, label in iter_samples(path))
+
+    if fast and use_cache:
+        # Tokenized once into memory-mapped arrays; later runs reuse them untouched
+        print("Debug: Loading token caches...")
+        train_dataset = MemmapErrorDataset(build_token_cache(train_file_path, tokenizer, label_mapping))
+        eval_dataset = MemmapErrorDataset(build_token_cache(val_file_path, tokenizer, label_mapping))
+        print(f"Loaded {len(train_dataset)} training samples and {len(eval_dataset)} validation samples.")
+        print(f"Label mapping: {label_mapping}")
+    else:
+        # Load training and validation data
+        print(f"Debug: Loading training data from {train_file_path}...")
+        train_texts, train_labels, _ = load_data(train_file_path, label_mapping)
+        print(f"Debug: Loading validation data from {val_file_path}...")
+        val_texts, val_labels, _ = load_data(val_file_path, label_mapping)
+
+        print(f"Loaded {len(train_texts)} training samples and {len(val_texts)} validation samples.")
+        print(f"Label mapping: {label_mapping}")
+
+        print("Debug: Tokenizing texts...")
+        tokenize = tokenize_unpadded if fast else tokenize_texts
+        train_encodings = tokenize(train_texts, tokenizer)
+        val_encodings = tokenize(val_texts, tokenizer)
+
+        print(f"Sample tokenized text (train): {train_encodings['input_ids'][0]}")
+        print(f"Sample tokenized text (val): {val_encodings['input_ids'][0]}")
+
+        # Wrap data into datasets
+        print("Debug: Wrapping datasets...")
+        train_dataset = ErrorDataset(train_encodings, train_labels)
+        eval_dataset = ErrorDataset(val_encodings, val_labels)
 
     print(f"First sample in train dataset: {train_dataset[0]}")
 
@@ -90,15 +168,21 @@ def train_model():
 
     # Define training arguments
     print("Debug: Setting up training arguments...")
+    use_bf16 = fast and bf16 and cpu_supports_bf16()
+    if fast and bf16 and not use_bf16:
+        print("Debug: bf16 requested but this CPU has no native bf16 support, training in fp32.")
     training_args = TrainingArguments(
-        output_dir="bert_fine_tuned",
-        num_train_epochs=3,
-        per_device_train_batch_size=8,
+        output_dir=output_dir,
+        num_train_epochs=epochs,
+        per_device_train_batch_size=batch_size,
         save_steps=200,
         save_total_limit=2,
         evaluation_strategy="epoch",
         logging_dir="./logs",
         learning_rate=5e-5,
+        group_by_length=fast,
+        gradient_accumulation_steps=gradient_accumulation_steps if fast else 1,
+        bf16=use_bf16,
     )
 
     print(f"Training output directory: {training_args.output_dir}")
@@ -106,11 +190,13 @@ def train_model():
 
     # Initialize the Trainer
     print("Debug: Initializing Trainer...")
-    trainer = Trainer(
+    trainer = LengthGroupedTrainer(
         model=model,
         args=training_args,
         train_dataset=train_dataset,
         eval_dataset=eval_dataset,
+        data_collator=DataCollatorWithPadding(tokenizer) if fast else None,
+        callbacks=[ThroughputCallback()] if fast else None,
     )
 
     print("Debug: Trainer initialized.")
@@ -121,3 +207,24 @@ def train_model():
     trainer.train()
 
     print("Debug: Training completed.")
+
+    # Save the final weights where the inference code loads them from
+    trainer.save_model(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    print(f"Debug: Model saved to {output_dir}.")
+    return trainer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune BERT on the error samples.")
+    parser.add_argument("--fast", action="store_true",
+                        help="Dynamic padding, length-grouped batches and throughput reporting")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--grad-accum", type=int, default=1, help="Gradient accumulation steps (--fast only)")
+    parser.add_argument("--bf16", action="store_true", help="bf16 autocast on CPUs that support it (--fast only)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-tokenize instead of using the token cache")
+    args = parser.parse_args()
+
+    train_model(fast=args.fast, epochs=args.epochs, batch_size=args.batch_size,
+                gradient_accumulation_steps=args.grad_accum, bf16=args.bf16, use_cache=not args.no_cache)
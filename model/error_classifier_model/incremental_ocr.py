@@ -0,0 +1,106 @@
+import hashlib
+
+import numpy as np
+
+from ocr_engine import get_ocr_engine
+from traceback_roi import to_gray_array
+
+# Nominal tile size; tiles span the full width by default so text lines are never cut sideways
+TILE_HEIGHT = 64
+TILE_COLUMNS = 1
+# How far (in pixels) a tile boundary may move to land on a blank row between text lines
+SNAP_WINDOW = 16
+
+
+def _tile_digest(tile):
+    return hashlib.blake2b(np.ascontiguousarray(tile).tobytes(), digest_size=16).digest()
+
+
+class IncrementalOCR:
+    """
+    OCR repeated screen captures by re-reading only the tiles that changed.
+
+    Each capture is cut into horizontal bands (optionally split into columns).
+    Band boundaries are snapped to the blankest row near a fixed grid line, so a
+    boundary only moves when the text right next to it changes. Tiles are hashed
+    and their text is cached by hash; unchanged tiles reuse the cached text and
+    only new tiles go to the OCR engine.
+    """
+
+    def __init__(self, engine=None, tile_height=TILE_HEIGHT, columns=TILE_COLUMNS, snap_window=SNAP_WINDOW):
+        self.engine = engine
+        self.tile_height = tile_height
+        self.columns = columns
+        self.snap_window = snap_window
+        self._cache = {}
+        self.last_stats = {"tiles": 0, "changed": 0}
+
+    def _row_cuts(self, gray):
+        """
+        Pick band boundaries close to every `tile_height` rows, snapped to blank rows.
+        """
+        height = gray.shape[0]
+        # Horizontal gradient energy per row is ~0 on the gaps between text lines
+        activity = np.abs(np.diff(gray.astype(np.int16), axis=1)).sum(axis=1)
+
+        cuts = [0]
+        for nominal in range(self.tile_height, height, self.tile_height):
+            low = max(cuts[-1] + 1, nominal - self.snap_window)
+            high = min(height - 1, nominal + self.snap_window)
+            if low >= high:
+                continue
+            cuts.append(low + int(np.argmin(activity[low:high])))
+        cuts.append(height)
+        return cuts
+
+    def tile_boxes(self, gray):
+        """
+        Return the (x, y, w, h) tiles of a grayscale capture in reading order.
+        """
+        width = gray.shape[1]
+        column_edges = np.linspace(0, width, self.columns + 1).astype(int)
+        cuts = self._row_cuts(gray)
+
+        boxes = []
+        for top, bottom in zip(cuts, cuts[1:]):
+            for left, right in zip(column_edges, column_edges[1:]):
+                boxes.append((int(left), top, int(right - left), bottom - top))
+        return boxes
+
+    def extract(self, image):
+        """
+        OCR a capture, reusing the cached text of tiles seen in the previous capture.
+        """
+        engine = self.engine or get_ocr_engine()
+        gray = to_gray_array(image)
+        boxes = self.tile_boxes(gray)
+        tiles = [gray[y:y + h, x:x + w] for x, y, w, h in boxes]
+        digests = [_tile_digest(tile) for tile in tiles]
+
+        # Identical tiles (blank bands, repeated lines) are OCR'd once
+        changed = {}
+        for i, digest in enumerate(digests):
+            if digest not in self._cache and digest not in changed:
+                changed[digest] = i
+        new_texts = engine.image_to_string_batch([tiles[i] for i in changed.values()]) if changed else []
+
+        # Keep only the current capture's tiles so the cache stays bounded
+        cache = {digest: self._cache[digest] for digest in digests if digest in self._cache}
+        for digest, text in zip(changed, new_texts):
+            cache[digest] = text.strip()
+        self._cache = cache
+        self.last_stats = {"tiles": len(tiles), "changed": len(changed)}
+
+        # Stitch the tiles back together, one output line per band
+        rows = []
+        for start in range(0, len(digests), self.columns):
+            row = " ".join(cache[digest] for digest in digests[start:start + self.columns] if cache[digest])
+            if row:
+                rows.append(row)
+        return "\n".join(rows)
+
+    def reset(self):
+        """
+        Forget cached tiles so the next capture is OCR'd in full.
+        """
+        self._cache = {}
@@ -0,0 +1,172 @@
+import base64
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Address of the shared daemon; a lab server can bind 0.0.0.0 and serve many seats
+INFERENCE_HOST = os.environ.get("INFERENCE_HOST", "127.0.0.1")
+INFERENCE_PORT = int(os.environ.get("INFERENCE_PORT", 8765))
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", 30))
+# After a failed connection the daemon is not retried for this many seconds
+RETRY_AFTER = 30.0
+
+
+def encode_image(image):
+    """Encode a numpy image as base64 PNG for the wire (lossless, keeps channel order)."""
+    ok, png = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError("Could not encode image")
+    return base64.b64encode(png.tobytes()).decode("ascii")
+
+
+class InferenceUnavailable(ConnectionError):
+    """Raised when the inference daemon cannot be reached."""
+
+
+class ModelNotServed(InferenceUnavailable):
+    """Raised when the daemon does not serve the requested model; callers fall back to running it themselves."""
+
+
+class InferenceClient:
+    """
+    Thin blocking client for the inference daemon. Each call takes an optional
+    `fallback` that computes the result in-process when the daemon is not running.
+    """
+
+    def __init__(self, host=INFERENCE_HOST, port=INFERENCE_PORT, timeout=INFERENCE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._socket = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._down_until = 0.0
+
+    def _connect(self):
+        if time.monotonic() < self._down_until:
+            raise InferenceUnavailable(f"Inference server at {self.host}:{self.port} is down")
+        try:
+            self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            self._down_until = time.monotonic() + RETRY_AFTER
+            raise InferenceUnavailable(f"Inference server at {self.host}:{self.port} is unreachable: {e}") from e
+        self._reader = self._socket.makefile("rb")
+
+    def connect(self):
+        """Open the connection if needed; raises InferenceUnavailable if the daemon cannot be reached."""
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+
+    def close(self):
+        with self._lock:
+            if self._socket is not None:
+                self._reader.close()
+                self._socket.close()
+                self._socket = self._reader = None
+
+    def request(self, op, **payload):
+        """
+        Send one request and return its result; raises InferenceUnavailable if
+        the daemon cannot be reached, ModelNotServed if it refuses the model and
+        RuntimeError if it reports any other error.
+        """
+        request_id = next(self._ids)
+        line = (json.dumps(dict(payload, id=request_id, op=op)) + "\n").encode()
+        with self._lock:
+            for attempt in range(2):
+                if self._socket is None:
+                    self._connect()
+                try:
+                    self._socket.sendall(line)
+                    reply = self._reader.readline()
+                    if not reply:
+                        raise ConnectionResetError("Inference server closed the connection")
+                    break
+                except OSError as e:
+                    # A daemon restart drops the kept-alive connection; reconnect once
+                    self._socket.close()
+                    self._socket = self._reader = None
+                    if attempt:
+                        raise InferenceUnavailable(str(e)) from e
+
+        response = json.loads(reply)
+        if not response["ok"]:
+            if response["error"].startswith(f"{ModelNotServed.__name__}:"):
+                raise ModelNotServed(response["error"])
+            raise RuntimeError(f"Inference server error: {response['error']}")
+        return response["result"]
+
+    def _call(self, fallback, op, **payload):
+        try:
+            return self.request(op, **payload)
+        except InferenceUnavailable:
+            if fallback is None:
+                raise
+            return fallback()
+
+    def classify(self, texts, model=None, fallback=None):
+        """
+        Return the predicted label id for every text. `fallback(texts)` is used
+        when the daemon is down and must return the label ids itself.
+        """
+        payload = {"texts": list(texts)} if model is None else {"texts": list(texts), "model": model}
+        result = self._call(fallback and (lambda: {"labels": list(fallback(texts))}), "classify", **payload)
+        return result["labels"]
+
+    def embed(self, texts, model=None, fallback=None):
+        """
+        Return the [CLS] embeddings of the texts, shape (len(texts), hidden_size).
+        """
+        payload = {"texts": list(texts)} if model is None else {"texts": list(texts), "model": model}
+        result = self._call(fallback and (lambda: {"embeddings": fallback(texts)}), "embed", **payload)
+        return np.asarray(result["embeddings"], dtype=np.float32)
+
+    def ocr(self, image, roi=False, fallback=None):
+        """
+        OCR a numpy image on the daemon; returns (text, regions). `fallback(image)`
+        must return the same pair.
+        """
+        def local():
+            text, regions = fallback(image)
+            return {"text": text, "regions": regions}
+
+        # Only PNG-encode the frame once the daemon is known to be up; the fallback reads raw pixels
+        try:
+            self.connect()
+        except InferenceUnavailable:
+            if fallback is None:
+                raise
+            result = local()
+        else:
+            result = self._call(fallback and local, "ocr", image=encode_image(image), roi=roi)
+        return result["text"], [tuple(box) for box in result["regions"]]
+
+    def stats(self):
+        return self.request("stats")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide inference client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient()
+        return _client
+
+
+if __name__ == "__main__":
+    client = get_client()
+    print(client.classify(["NameError: name 'x' is not defined"]))
+    print(json.dumps(client.stats(), indent=2))
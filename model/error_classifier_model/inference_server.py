@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from batch_inference import INFERENCE_BATCH_SIZE, classify_logits, embed_texts
+from inference_client import INFERENCE_HOST, INFERENCE_PORT, ModelNotServed
+from model_registry import get_bert_classifier, get_bert_encoder, get_tokenizer, registry
+from ocr_engine import get_ocr_engine
+from traceback_roi import TracebackLocator
+
+# How long the first request of a batch waits for others to join it
+BATCH_WINDOW_MS = float(os.environ.get("INFERENCE_BATCH_WINDOW_MS", 10))
+BERT_MODEL_PATH = "bert_fine_tuned"
+
+
+def decode_image(data):
+    """Decode a base64 PNG produced by encode_image back into a numpy array."""
+    return cv2.imdecode(np.frombuffer(base64.b64decode(data), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+def model_key(path):
+    """Local model directories compare by their real path, hub names (bert-base-uncased) as given."""
+    return os.path.realpath(path) if os.path.exists(path) else path
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for the same model for up to `window_ms` (or
+    until `max_batch` texts are waiting) and runs them as one batched forward
+    pass in a worker thread.
+    """
+
+    def __init__(self, run_batch, executor, window_ms=BATCH_WINDOW_MS, max_batch=INFERENCE_BATCH_SIZE):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = asyncio.Queue()
+        self._task = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, texts):
+        """Queue texts and wait for their rows of the batched result."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run_forever())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((list(texts), future))
+        return await future
+
+    async def _run_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                rows = await loop.run_in_executor(self.executor, self.run_batch, texts)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(texts)
+            start = 0
+            for item_texts, future in pending:
+                if not future.done():
+                    future.set_result(rows[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+class InferenceServer:
+    """
+    Asyncio daemon that owns the OCR engine and the models and serves
+    newline-delimited JSON requests:
+
+        {"id": 1, "op": "classify", "texts": [...], "model": "bert_fine_tuned"}
+        {"id": 2, "op": "embed", "texts": [...], "model": "bert-base-uncased"}
+        {"id": 3, "op": "ocr", "image": "<base64 png>", "roi": true}
+        {"id": 4, "op": "stats"}
+
+    Every response echoes the id: {"id": 1, "ok": true, "result": ...} or
+    {"id": 1, "ok": false, "error": "..."}.
+
+    Only the models the server was started with (model_path and
+    extra_models) are loaded; a request naming any other path gets a
+    ModelNotServed error, so clients cannot make it load arbitrary files.
+    """
+
+    def __init__(self, host=INFERENCE_HOST, port=INFERENCE_PORT, model_path=BERT_MODEL_PATH,
+                 window_ms=BATCH_WINDOW_MS, extra_models=()):
+        self.host = host
+        self.port = port
+        self.model_path = model_path
+        self.models = {model_key(path): path for path in (model_path, *extra_models)}
+        self.window_ms = window_ms
+        # One thread runs the models (PyTorch already uses every core), a few handle OCR
+        self._model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference-model")
+        self._ocr_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="inference-ocr")
+        self._batchers = {}
+        self._locator = None
+        self.requests = 0
+        self.started = time.time()
+
+    def resolve_model(self, requested):
+        """The server's own path for a requested model, or ModelNotServed."""
+        if requested is None:
+            return self.model_path
+        try:
+            return self.models[model_key(requested)]
+        except (KeyError, TypeError, ValueError):
+            served = ", ".join(self.models.values())
+            raise ModelNotServed(f"{requested!r} is not served here (serving {served})") from None
+
+    def _batcher(self, op, model_path):
+        key = (op, model_path)
+        if key not in self._batchers:
+            if op == "classify":
+                def run(texts):
+                    logits = classify_logits(texts, get_bert_classifier(model_path), get_tokenizer(model_path))
+                    return logits.tolist()
+            else:
+                def run(texts):
+                    return embed_texts(texts, get_bert_encoder(model_path), get_tokenizer(model_path)).tolist()
+            self._batchers[key] = MicroBatcher(run, self._model_executor, self.window_ms)
+        return self._batchers[key]
+
+    def _ocr(self, image, roi):
+        if roi:
+            if self._locator is None:
+                self._locator = TracebackLocator(get_ocr_engine())
+            text, regions = self._locator.extract(image)
+            return {"text": text, "regions": [list(map(int, box)) for box in regions]}
+        return {"text": get_ocr_engine().image_to_string(image).strip(), "regions": []}
+
+    async def handle_request(self, request):
+        op = request.get("op")
+        if op in ("classify", "embed"):
+            rows = await self._batcher(op, self.resolve_model(request.get("model"))).submit(request["texts"])
+            if op == "classify":
+                return {"labels": [int(np.argmax(row)) for row in rows], "logits": rows}
+            return {"embeddings": rows}
+        if op == "ocr":
+            image = decode_image(request["image"])
+            return await asyncio.get_running_loop().run_in_executor(
+                self._ocr_executor, self._ocr, image, request.get("roi", False))
+        if op == "stats":
+            return self.stats()
+        raise ValueError(f"Unknown op: {op!r}")
+
+    async def _serve_client(self, reader, writer):
+        async def respond(line):
+            request = {}
+            try:
+                request = json.loads(line)
+                response = {"id": request.get("id"), "ok": True, "result": await self.handle_request(request)}
+            except Exception as e:
+                response = {"id": request.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}"}
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+
+        # Requests on one connection are answered as they finish, matched by id
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def stats(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "batches": {f"{op}:{model}": {"batches": b.batches, "items": b.items,
+                                          "mean_batch": round(b.items / b.batches, 2) if b.batches else 0.0}
+                        for (op, model), b in self._batchers.items()},
+            "models": registry.stats(),
+        }
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._serve_client, self.host, self.port, limit=64 * 2 ** 20)
+        print(f"Inference server listening on {self.host}:{self.port} (batch window {self.window_ms} ms)")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared local inference daemon for OCR and the error classifier.")
+    parser.add_argument("--host", default=INFERENCE_HOST)
+    parser.add_argument("--port", type=int, default=INFERENCE_PORT)
+    parser.add_argument("--model", default=BERT_MODEL_PATH, help="Default classifier/encoder directory")
+    parser.add_argument("--extra-model", action="append", default=[],
+                        help="Another model clients may request (repeatable); no other paths are loaded")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS, help="Micro-batching window")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(InferenceServer(args.host, args.port, args.model, args.window_ms, args.extra_model).serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,47 @@
+import json
+import os
+
+# Persisted task -> id mapping shared by every model; ids are only ever appended, never renumbered
+VOCAB_FILE = "labels.json"
+
+
+def load_vocabulary(path=VOCAB_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_vocabulary(vocabulary, path=VOCAB_FILE):
+    """Write the vocabulary next to the old one and swap it in atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(vocabulary, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def label_vocabulary(tasks=(), path=VOCAB_FILE):
+    """
+    Return the persisted task -> id mapping with any of `tasks` it does not
+    know yet appended (in first-seen order) and saved. Every trainer and loader
+    takes its ids from here, so a task has the same id in BERT, the exit
+    heads, the cascade and XGBoost, across retrains.
+    """
+    vocabulary = load_vocabulary(path)
+    new_tasks = [task for task in dict.fromkeys(tasks) if task not in vocabulary]
+    for task in new_tasks:
+        vocabulary[task] = len(vocabulary)
+    if new_tasks:
+        save_vocabulary(vocabulary, path)
+    return vocabulary
+
+
+def task_names(vocabulary):
+    """Task names indexed by id."""
+    return sorted(vocabulary, key=vocabulary.get)
+
+
+if __name__ == "__main__":
+    vocabulary = load_vocabulary()
+    for task in task_names(vocabulary):
+        print(f"{vocabulary[task]:>3}  {task}")
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from inference_client import INFERENCE_HOST, INFERENCE_PORT
+
+SAMPLES_FILE = "error_samples.json"
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+
+
+async def _client_loop(host, port, op, texts, requests_per_client, latencies):
+    """One simulated seat: a connection sending requests back to back."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(requests_per_client):
+            text = texts[i % len(texts)]
+            start = time.perf_counter()
+            writer.write((json.dumps({"id": i, "op": op, "texts": [text]}) + "\n").encode())
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            if not response["ok"]:
+                raise RuntimeError(response["error"])
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, op, texts, concurrency, requests_per_client):
+    """Run `concurrency` seats at once and return throughput and latency percentiles."""
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client_loop(host, port, op, texts, requests_per_client, latencies)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+    }
+
+
+async def load_test(host, port, op, texts, levels, requests_per_client):
+    # Warm the daemon so model loading is not counted
+    await run_level(host, port, op, texts, 1, 1)
+    print(f"{'concurrency':>11}  {'requests':>8}  {'req/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}")
+    results = []
+    for concurrency in levels:
+        row = await run_level(host, port, op, texts, concurrency, requests_per_client)
+        results.append(row)
+        print(f"{row['concurrency']:>11}  {row['requests']:>8}  {row['throughput_rps']:>8}  "
+              f"{row['p50_ms']:>8}  {row['p99_ms']:>8}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the inference daemon at several concurrency levels.")
+    parser.add_argument("--host", default=INFERENCE_HOST)
+    parser.add_argument("--port", type=int, default=INFERENCE_PORT)
+    parser.add_argument("--op", choices=["classify", "embed"], default="classify")
+    parser.add_argument("--levels", type=int, nargs="+", default=CONCURRENCY_LEVELS, help="Concurrent seats to test")
+    parser.add_argument("--requests", type=int, default=20, help="Requests sent by each seat")
+    parser.add_argument("--samples", default=SAMPLES_FILE, help="Error messages used as request payloads")
+    args = parser.parse_args()
+
+    with open(args.samples, "r") as f:
+        sample_texts = [entry["error_message"] for entry in json.load(f)]
+    asyncio.run(load_test(args.host, args.port, args.op, sample_texts, args.levels, args.requests))
@@ -0,0 +1,237 @@
+import gc
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Models unused for this many seconds are unloaded, override with the MODEL_IDLE_TTL env variable
+MODEL_IDLE_TTL = float(os.environ.get("MODEL_IDLE_TTL", 600))
+
+DEFAULT_TOKENIZER_PATH = "bert-base-uncased"
+# Files that make up a fine-tuned BERT model. Checkpoints and artifacts other tools
+# add to the directory (int8 export, exit heads, explanation index) are left out.
+BERT_MODEL_FILES = ["config.json", "model.safetensors", "pytorch_model.bin", "vocab.txt", "tokenizer_config.json",
+                    "special_tokens_map.json"]
+
+
+def bert_model_files(path):
+    """Paths of the BERT model files in a model directory (whether or not they exist)."""
+    return [os.path.join(path, name) for name in BERT_MODEL_FILES]
+
+
+def resident_memory_bytes():
+    """
+    Return the resident memory of this process in bytes, or None if it can't be measured.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _parameter_bytes(model):
+    """
+    Size of a PyTorch model's parameters and buffers; None for anything else.
+    """
+    if not hasattr(model, "parameters") or not hasattr(model, "buffers"):
+        return None
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models.
+
+    Models are loaded on first use, shared by every caller asking for the same
+    key, and unloaded after `idle_ttl` seconds without a `get`. Callers should
+    ask the registry each time rather than keep their own reference, otherwise
+    an evicted model stays in memory.
+    """
+
+    def __init__(self, idle_ttl=MODEL_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._reaper = None
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key, loader):
+        """
+        Return the model stored under `key`, calling `loader()` to load it if needed.
+        """
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key, loader)
+            entry["last_used"] = time.monotonic()
+        self._start_reaper()
+        return entry["model"]
+
+    def _load(self, key, loader):
+        memory_before = resident_memory_bytes()
+        start = time.perf_counter()
+        model = loader()
+        load_seconds = time.perf_counter() - start
+        memory_after = resident_memory_bytes()
+
+        # Growth of resident memory while loading; parameter size when RSS can't be read
+        if memory_before is not None and memory_after is not None:
+            memory_bytes = max(0, memory_after - memory_before)
+        else:
+            memory_bytes = _parameter_bytes(model)
+
+        entry = {"model": model, "load_seconds": load_seconds, "memory_bytes": memory_bytes,
+                 "last_used": time.monotonic()}
+        with self._lock:
+            self._entries[key] = entry
+        print(f"Loaded model {key} in {load_seconds:.2f} s")
+        return entry
+
+    def unload(self, key):
+        """
+        Drop a model from the registry so its memory can be reclaimed.
+        """
+        with self._lock:
+            removed = self._entries.pop(key, None)
+        if removed is not None:
+            del removed
+            gc.collect()
+
+    def evict_idle(self):
+        """
+        Unload every model that has not been used within the idle TTL.
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if now - entry["last_used"] > self.idle_ttl]
+        for key in idle:
+            # Re-check under the key lock in case the model was used in the meantime
+            with self._key_lock(key):
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() - entry["last_used"] > self.idle_ttl:
+                    self.unload(key)
+                    print(f"Unloaded idle model {key}")
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None or self.idle_ttl <= 0:
+                return
+            self._reaper = threading.Thread(target=self._reap_forever, daemon=True)
+            self._reaper.start()
+
+    def _reap_forever(self):
+        interval = max(1.0, min(self.idle_ttl / 2, 60.0))
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+
+    def stats(self):
+        """
+        Return load time, memory and idle time for every loaded model.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "model": str(key),
+                    "load_seconds": round(entry["load_seconds"], 3),
+                    "memory_mb": None if entry["memory_bytes"] is None else round(entry["memory_bytes"] / 2 ** 20, 1),
+                    "idle_seconds": round(now - entry["last_used"], 1),
+                }
+                for key, entry in self._entries.items()
+            ]
+
+    def report(self):
+        """
+        Print the per-model load time and memory table.
+        """
+        for row in self.stats():
+            memory = "unknown" if row["memory_mb"] is None else f"{row['memory_mb']} MB"
+            print(f"{row['model']}: loaded in {row['load_seconds']} s, {memory}, idle {row['idle_seconds']} s")
+
+
+registry = ModelRegistry()
+
+
+def get_tokenizer(path=DEFAULT_TOKENIZER_PATH):
+    """Shared BERT tokenizer."""
+    def load():
+        from transformers import BertTokenizer
+        return BertTokenizer.from_pretrained(path)
+    return registry.get(("tokenizer", path), load)
+
+
+def get_bert_classifier(path, prefer_quantized=True):
+    """
+    Shared fine-tuned BertForSequenceClassification in eval mode. The int8 export
+    from quantize_model.py is used instead of the fp32 weights when it exists.
+    """
+    from quantize_model import QUANTIZED_FILE
+    quantized = prefer_quantized and os.path.exists(os.path.join(path, QUANTIZED_FILE))
+
+    def load():
+        if quantized:
+            from quantize_model import load_quantized_classifier
+            return load_quantized_classifier(path)
+        from transformers import BertForSequenceClassification
+        return BertForSequenceClassification.from_pretrained(path).eval()
+    return registry.get(("bert_classifier_int8" if quantized else "bert_classifier", path), load)
+
+
+def get_bert_encoder(path):
+    """Shared BertModel (no classification head) in eval mode, used for embeddings."""
+    def load():
+        from transformers import BertModel
+        return BertModel.from_pretrained(path).eval()
+    return registry.get(("bert_encoder", path), load)
+
+
+# Modification time of every XGBoost file when it was loaded, see get_xgboost
+_xgboost_mtimes = {}
+
+
+def get_xgboost(path):
+    """
+    Shared XGBoost classifier, from a joblib pickle or a native XGBoost model file.
+    A file replaced on disk (e.g. by online_update.py) is reloaded on the next call.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _xgboost_mtimes.get(path, mtime) != mtime:
+        registry.unload(("xgboost", path))
+    _xgboost_mtimes[path] = mtime
+
+    def load():
+        import joblib
+        if path.endswith((".pkl", ".joblib")):
+            return joblib.load(path)
+        from xgboost import XGBClassifier
+        model = XGBClassifier()
+        try:
+            model.load_model(path)
+        except Exception:
+            # Older artifacts were saved with joblib under a .model name
+            model = joblib.load(path)
+        return model
+    return registry.get(("xgboost", path), load)
+
+
+if __name__ == "__main__":
+    # Load the shared models once and print what they cost
+    get_tokenizer()
+    get_bert_encoder("bert_fine_tuned")
+    registry.report()
@@ -0,0 +1,320 @@
+import argparse
+import csv
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+# numpy, torch, xgboost and transformers are imported inside the functions: pool
+# workers must set their thread budget before those libraries start thread pools.
+
+SAMPLES_FILE = "error_samples.json"
+BERT_MODEL_PATH = "bert_fine_tuned"
+SEARCH_DIR = "model_search"
+# Results of one version of the samples and fold count: results-<key>.jsonl
+RESULTS_PATTERN = "results-{}.jsonl"
+REPORT_FILE = "report.csv"
+DEFAULT_FOLDS = 5
+
+# Parameter grids per model family. "xgboost" and "bert_head" (a linear head on
+# frozen [CLS] embeddings) are cheap; "bert_fine_tune" retrains the whole
+# encoder per fold and has to be asked for explicitly.
+SEARCH_SPACES = {
+    "xgboost": {"n_estimators": [50, 100, 200], "max_depth": [3, 5, 7], "learning_rate": [0.05, 0.1, 0.3]},
+    "bert_head": {"learning_rate": [1e-3, 1e-2], "epochs": [50, 200], "weight_decay": [0.0, 1e-4]},
+    "bert_fine_tune": {"learning_rate": [2e-5, 5e-5], "epochs": [2, 3], "batch_size": [8, 16]},
+}
+DEFAULT_FAMILIES = ["xgboost", "bert_head"]
+SORT_KEYS = {"accuracy": ("accuracy", True), "train": ("train_seconds", False), "inference": ("infer_ms", False)}
+
+
+def parameter_grid(space):
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def job_key(family, params, fold):
+    return f"{family}:{json.dumps(params, sort_keys=True)}:{fold}"
+
+
+def prepare_artifacts(samples_file=SAMPLES_FILE, encoder_path=BERT_MODEL_PATH, folds=DEFAULT_FOLDS,
+                      families=DEFAULT_FAMILIES, search_dir=SEARCH_DIR):
+    """
+    Compute everything the folds share once, in the parent: labels, the
+    stratified fold indices, the [CLS] embeddings (through the embedding cache)
+    and, for fine-tuning, the memory-mapped token cache. Workers only read them.
+
+    The default features come from the deployed encoder, which has seen most
+    samples during fine-tuning: feature-based scores rank parameter settings but
+    overstate held-out accuracy (pass bert-base-uncased as encoder to avoid that).
+    """
+    import numpy as np
+    from sklearn.model_selection import StratifiedKFold
+    from dataset_cache import file_digest
+    from label_vocabulary import label_vocabulary
+
+    with open(samples_file, "r") as f:
+        data = json.load(f)
+    texts = [entry["error_message"] for entry in data]
+    tasks = [entry["related_task"] for entry in data]
+    mapping = label_vocabulary(tasks)  # same ids as train_xgboost and fine_tune_bert
+    labels = np.array([mapping[task] for task in tasks])
+
+    os.makedirs(search_dir, exist_ok=True)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    fold_indices = [{"train": train.tolist(), "test": test.tolist()}
+                    for train, test in splitter.split(np.zeros(len(labels)), labels)]
+    # The encoder is part of the key, so results resumed from disk were scored on the same features
+    data_key = f"{file_digest(samples_file)[:12]}-{folds}-{os.path.basename(os.path.normpath(encoder_path))}"
+    artifacts = {"data_key": data_key, "labels": os.path.join(search_dir, f"labels-{data_key}.npy"),
+                 "folds": fold_indices, "num_labels": len(mapping), "embeddings": None, "token_cache": None}
+    np.save(artifacts["labels"], labels)
+
+    if {"xgboost", "bert_head"} & set(families):
+        from batch_inference import embed_texts
+        from embedding_cache import EmbeddingCache
+        from model_registry import get_bert_encoder, get_tokenizer
+        embeddings = EmbeddingCache(encoder_path).get(
+            texts, lambda batch: embed_texts(batch, get_bert_encoder(encoder_path), get_tokenizer(encoder_path)))
+        artifacts["embeddings"] = os.path.join(search_dir, f"embeddings-{data_key}.npy")
+        np.save(artifacts["embeddings"], embeddings)
+    if "bert_fine_tune" in families:
+        from dataset_cache import build_token_cache
+        from model_registry import get_tokenizer
+        artifacts["token_cache"] = build_token_cache(samples_file, get_tokenizer(), mapping)
+    return artifacts
+
+
+def cpu_slices(workers, cpus=None):
+    """Split the usable CPUs into one disjoint, equally sized set per worker."""
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    if cpus:
+        available = available[:cpus]
+    per_worker = max(1, len(available) // workers)
+    return [available[i * per_worker:(i + 1) * per_worker] or available[:1] for i in range(workers)]
+
+
+_worker = {}
+
+
+def init_worker(slice_queue):
+    """Pin this worker to its CPUs and cap every thread pool to that many threads."""
+    cores = slice_queue.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    threads = str(len(cores))
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = threads
+    _worker["threads"] = len(cores)
+    _worker["cores"] = cores
+
+
+def _load(artifacts, name):
+    import numpy as np
+    if name not in _worker:
+        _worker[name] = np.load(artifacts[name], mmap_mode="r")
+    return _worker[name]
+
+
+def run_xgboost(artifacts, params, train, test, threads):
+    import numpy as np
+    from xgboost import XGBClassifier
+
+    X, y = _load(artifacts, "embeddings"), _load(artifacts, "labels")
+    started = time.perf_counter()
+    model = XGBClassifier(tree_method="hist", n_jobs=threads, **params)
+    # XGBClassifier wants ids 0..n-1 and a fold can miss a rare task, so re-index the ones present
+    classes, y_train = np.unique(y[train], return_inverse=True)
+    model.fit(X[train], y_train)
+    train_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    predicted = classes[model.predict(X[test])]
+    return float(np.mean(predicted == y[test])), train_seconds, time.perf_counter() - started
+
+
+def run_bert_head(artifacts, params, train, test, threads):
+    import numpy as np
+    import torch
+    from torch import nn
+
+    torch.set_num_threads(threads)
+    X = torch.from_numpy(np.asarray(_load(artifacts, "embeddings"), dtype=np.float32))
+    y = torch.from_numpy(np.asarray(_load(artifacts, "labels")))
+    head = nn.Linear(X.shape[1], artifacts["num_labels"])
+    optimizer = torch.optim.Adam(head.parameters(), lr=params["learning_rate"], weight_decay=params["weight_decay"])
+    loss_fn = nn.CrossEntropyLoss()
+    started = time.perf_counter()
+    for _ in range(params["epochs"]):
+        optimizer.zero_grad()
+        loss_fn(head(X[train]), y[train]).backward()
+        optimizer.step()
+    train_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    with torch.inference_mode():
+        predicted = head(X[test]).argmax(dim=1)
+    return float((predicted == y[test]).float().mean()), train_seconds, time.perf_counter() - started
+
+
+def run_bert_fine_tune(artifacts, params, train, test, threads):
+    import numpy as np
+    import torch
+    from torch.utils.data import Subset
+    from transformers import BertForSequenceClassification, DataCollatorWithPadding, Trainer, TrainingArguments
+    from dataset_cache import MemmapErrorDataset
+    from model_registry import get_tokenizer
+
+    torch.set_num_threads(threads)
+    dataset = MemmapErrorDataset(artifacts["token_cache"])
+    model = BertForSequenceClassification.from_pretrained("bert-base-uncased", num_labels=artifacts["num_labels"])
+    with tempfile.TemporaryDirectory() as output_dir:
+        training_args = TrainingArguments(
+            output_dir=output_dir,
+            num_train_epochs=params["epochs"],
+            per_device_train_batch_size=params["batch_size"],
+            learning_rate=params["learning_rate"],
+            group_by_length=True,
+            save_strategy="no",
+            report_to=[],
+        )
+        trainer = Trainer(model=model, args=training_args, train_dataset=Subset(dataset, train),
+                          data_collator=DataCollatorWithPadding(get_tokenizer()))
+        started = time.perf_counter()
+        trainer.train()
+        train_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        output = trainer.predict(Subset(dataset, test))
+    infer_seconds = time.perf_counter() - started
+    return float(np.mean(output.predictions.argmax(axis=1) == output.label_ids)), train_seconds, infer_seconds
+
+
+RUNNERS = {"xgboost": run_xgboost, "bert_head": run_bert_head, "bert_fine_tune": run_bert_fine_tune}
+
+
+def run_job(job):
+    """Train and score one (family, params, fold) in a pool worker."""
+    family, params, fold, artifacts = job
+    split = artifacts["folds"][fold]
+    threads = _worker.get("threads", 1)
+    try:
+        accuracy, train_seconds, infer_seconds = RUNNERS[family](artifacts, params, split["train"], split["test"],
+                                                                 threads)
+        error = None
+    except Exception as e:
+        accuracy, train_seconds, infer_seconds, error = None, None, None, f"{type(e).__name__}: {e}"
+    return {
+        "key": job_key(family, params, fold), "family": family, "params": params, "fold": fold,
+        "accuracy": accuracy, "train_seconds": train_seconds,
+        "infer_ms": infer_seconds and infer_seconds / len(split["test"]) * 1000,
+        "threads": threads, "cores": _worker.get("cores"), "pid": os.getpid(), "error": error,
+    }
+
+
+def read_results(path):
+    results = []
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            results = [json.loads(line) for line in f if line.strip()]
+    return results
+
+
+def summarize(results):
+    """
+    One row per (family, params): mean and spread of accuracy over the folds,
+    mean training seconds and inference ms per sample. Rows no other row beats
+    on both accuracy and inference cost are marked as the Pareto front.
+    """
+    groups = {}
+    for result in results:
+        if result["error"] is None:
+            groups.setdefault((result["family"], json.dumps(result["params"], sort_keys=True)), []).append(result)
+    rows = []
+    for (family, params), group in groups.items():
+        accuracies = [result["accuracy"] for result in group]
+        rows.append({
+            "family": family, "params": params, "folds": len(group),
+            "accuracy": round(statistics.mean(accuracies), 4),
+            "accuracy_std": round(statistics.pstdev(accuracies), 4),
+            "train_seconds": round(statistics.mean(result["train_seconds"] for result in group), 3),
+            "infer_ms": round(statistics.mean(result["infer_ms"] for result in group), 4),
+        })
+    for row in rows:
+        row["pareto"] = not any(other["accuracy"] >= row["accuracy"] and other["infer_ms"] <= row["infer_ms"]
+                                and (other["accuracy"], other["infer_ms"]) != (row["accuracy"], row["infer_ms"])
+                                for other in rows)
+    return rows
+
+
+def write_report(rows, sort="accuracy", path=None):
+    key, descending = SORT_KEYS[sort]
+    rows = sorted(rows, key=lambda row: row[key], reverse=descending)
+    if path:
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["family", "params", "folds", "accuracy", "accuracy_std",
+                                                   "train_seconds", "infer_ms", "pareto"])
+            writer.writeheader()
+            writer.writerows(rows)
+    print(f"{'family':<15}  {'accuracy':>8}  {'+/-':>6}  {'train s':>8}  {'infer ms':>8}  {'pareto':>6}  params")
+    for row in rows:
+        print(f"{row['family']:<15}  {row['accuracy']:>8}  {row['accuracy_std']:>6}  {row['train_seconds']:>8}  "
+              f"{row['infer_ms']:>8}  {'*' if row['pareto'] else '':>6}  {row['params']}")
+    return rows
+
+
+def search(families=DEFAULT_FAMILIES, folds=DEFAULT_FOLDS, workers=None, cpus=None, samples_file=SAMPLES_FILE,
+           encoder_path=BERT_MODEL_PATH, search_dir=SEARCH_DIR, sort="accuracy"):
+    """
+    Run every (family, params, fold) job on a pool of CPU-pinned workers,
+    appending each result to the results file of this data version as it
+    arrives. Jobs already in that file are skipped, so an interrupted search
+    resumes where it stopped.
+    """
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    cpus = min(cpus or available, available)
+    workers = max(1, min(workers or max(1, cpus // 2), cpus))
+    artifacts = prepare_artifacts(samples_file, encoder_path, folds, families, search_dir)
+
+    results_file = os.path.join(search_dir, RESULTS_PATTERN.format(artifacts["data_key"]))
+    done = {result["key"] for result in read_results(results_file) if result["error"] is None}
+    jobs = [(family, params, fold, artifacts)
+            for family in families for params in parameter_grid(SEARCH_SPACES[family]) for fold in range(folds)
+            if job_key(family, params, fold) not in done]
+    print(f"{len(jobs)} jobs ({len(done)} already done) on {workers} workers x {cpus // workers} threads")
+
+    # spawn: workers start without the parent's thread pools, so the budgets set in init_worker hold
+    context = multiprocessing.get_context("spawn")
+    slice_queue = context.Queue()
+    for cores in cpu_slices(workers, cpus):
+        slice_queue.put(cores)
+    started = time.perf_counter()
+    with context.Pool(workers, initializer=init_worker, initargs=(slice_queue,)) as pool, \
+            open(results_file, "a") as out:
+        for count, result in enumerate(pool.imap_unordered(run_job, jobs), 1):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            status = result["error"] or f"accuracy {result['accuracy']:.3f}"
+            print(f"[{count}/{len(jobs)}] {result['family']} {result['params']} fold {result['fold']}: {status}")
+    print(f"Search finished in {time.perf_counter() - started:.1f} s")
+    return write_report(summarize(read_results(results_file)), sort, os.path.join(search_dir, REPORT_FILE))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated parameter search for the task classifiers.")
+    parser.add_argument("--families", nargs="+", choices=sorted(SEARCH_SPACES), default=DEFAULT_FAMILIES)
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: half the CPUs)")
+    parser.add_argument("--cpus", type=int, help="Use at most this many CPUs in total")
+    parser.add_argument("--encoder", default=BERT_MODEL_PATH, help="Encoder used for the embedding features")
+    parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="accuracy")
+    parser.add_argument("--report-only", action="store_true", help="Print the report of the results so far")
+    args = parser.parse_args()
+
+    if args.report_only:
+        # The most recently written results file
+        latest = max(glob.glob(os.path.join(SEARCH_DIR, RESULTS_PATTERN.format("*"))), key=os.path.getmtime)
+        write_report(summarize(read_results(latest)), args.sort)
+    else:
+        search(args.families, args.folds, args.workers, args.cpus, encoder_path=args.encoder, sort=args.sort)
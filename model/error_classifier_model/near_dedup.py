@@ -0,0 +1,189 @@
+import argparse
+import json
+import re
+import time
+import zlib
+
+import numpy as np
+
+from dataset_cache import iter_samples
+from result_cache import normalize_text
+from traceback_condense import condense_traceback
+
+SAMPLES_FILE = "error_samples.json"
+DEDUP_FILE = "error_samples.dedup.json"
+REPORT_FILE = "dedup_report.json"
+NUM_PERM = 128
+SHINGLE_SIZE = 3
+# Estimated Jaccard similarity of the shingle sets at which two samples are near duplicates
+SIMILARITY_THRESHOLD = 0.8
+# Largest clusters listed in the report
+REPORT_CLUSTERS = 50
+REPORT_EXAMPLES = 3
+# Shingle hashes and permutations are kept below 2^31 so (a * x + b) fits in uint64
+PRIME = (1 << 31) - 1
+TOKEN_PATTERN = re.compile(r"<\w+>|\w+|[^\w\s]")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Token n-grams of the condensed, normalized traceback. Paths, line numbers
+    and numbers become placeholders; names are kept, since in a short message
+    they are what tells tasks apart ('Car' object vs 'NoneType' object), while
+    in a long traceback a different variable name changes only a few shingles.
+    """
+    tokens = TOKEN_PATTERN.findall(normalize_text(condense_traceback(text), names=False))
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def choose_bands(num_perm=NUM_PERM, threshold=SIMILARITY_THRESHOLD):
+    """
+    (bands, rows per band) for LSH: the most rows per band whose candidate
+    threshold (1/bands)^(1/rows) is still at or below `threshold`, so pairs
+    above it are found and the exact check drops the extra candidates.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows == 0 and (rows / num_perm) ** (1 / rows) <= threshold:
+            best = (num_perm // rows, rows)
+    return best
+
+
+class MinHasher:
+    """MinHash signatures from `num_perm` universal hash permutations of the CRC32 shingle hashes."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) & PRIME for shingle in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        return ((np.outer(hashes, self.a) + self.b) % PRIME).min(axis=0).astype(np.uint32)
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = []
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merge the sets of a and b; the older (smaller) root stays the root. Returns (root, merged root)."""
+        a, b = self.find(a), self.find(b)
+        if a > b:
+            a, b = b, a
+        self.parent[b] = a
+        return a, b
+
+
+def near_dedup(source_files, output_file=DEDUP_FILE, report_file=REPORT_FILE, threshold=SIMILARITY_THRESHOLD,
+               num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE):
+    """
+    Cluster near-duplicate samples of the same task and write one
+    representative (the first seen) per cluster with the cluster size as its
+    "weight", in first-seen order, plus a cluster report.
+
+    Candidates come from LSH banding of the MinHash signatures and are kept
+    when the signatures agree on at least `threshold` of their positions.
+    A row that joins a cluster already in a bucket is not added to it, so
+    buckets and stored signatures grow with the number of distinct errors,
+    not with the number of rows. Near duplicates labelled with different
+    tasks are never merged; they are listed as conflicts.
+    """
+    if isinstance(source_files, str):
+        source_files = [source_files]
+    bands, rows_per_band = choose_bands(num_perm, threshold)
+    hasher = MinHasher(num_perm)
+    union_find = UnionFind()
+    buckets = [{} for _ in range(bands)]
+    signatures = {}
+    clusters = {}
+    conflicts = []
+    conflict_count = total = 0
+    started = time.perf_counter()
+
+    for source_file in source_files:
+        for text, label in iter_samples(source_file):
+            row = union_find.add()
+            total += 1
+            clusters[row] = {"error_message": text, "related_task": label, "weight": 1, "examples": []}
+            signature = hasher.signature(shingles(text, shingle_size))
+
+            keys = [signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes() for band in range(bands)]
+            candidates = set()
+            for bucket, key in zip(buckets, keys):
+                candidates.update(bucket.get(key, ()))
+
+            joined = False
+            for other in sorted(candidates):
+                if float(np.mean(signatures[other] == signature)) < threshold:
+                    continue
+                other_root = union_find.find(other)
+                if clusters[other_root]["related_task"] != label:
+                    conflict_count += 1
+                    if len(conflicts) < REPORT_CLUSTERS:
+                        conflicts.append({"error_message": text, "related_task": label,
+                                          "similar_to": clusters[other_root]["error_message"],
+                                          "similar_task": clusters[other_root]["related_task"]})
+                    continue
+                joined = True
+                if union_find.find(row) != other_root:
+                    root, merged = union_find.union(row, other)
+                    absorbed = clusters.pop(merged)
+                    cluster = clusters[root]
+                    cluster["weight"] += absorbed["weight"]
+                    cluster["examples"] = (cluster["examples"] + [absorbed["error_message"]]
+                                           + absorbed["examples"])[:REPORT_EXAMPLES]
+            if not joined:
+                for bucket, key in zip(buckets, keys):
+                    bucket.setdefault(key, []).append(row)
+                signatures[row] = signature
+
+    representatives = [clusters[root] for root in sorted(clusters)]
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump([{key: cluster[key] for key in ("error_message", "related_task", "weight")}
+                   for cluster in representatives], f, indent=4, ensure_ascii=False)
+
+    report = {
+        "sources": source_files,
+        "rows": total,
+        "clusters": len(representatives),
+        "reduction": round(1 - len(representatives) / total, 4) if total else 0.0,
+        "threshold": threshold,
+        "bands": bands,
+        "rows_per_band": rows_per_band,
+        "seconds": round(time.perf_counter() - started, 3),
+        "label_conflicts": conflict_count,
+        "conflict_examples": conflicts,
+        "largest_clusters": sorted((cluster for cluster in representatives if cluster["weight"] > 1),
+                                   key=lambda cluster: -cluster["weight"])[:REPORT_CLUSTERS],
+    }
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"{total} samples -> {len(representatives)} clusters ({report['reduction']:.0%} fewer), "
+          f"{conflict_count} cross-task near duplicates, {report['seconds']} s")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collapse near-duplicate error samples into weighted representatives.")
+    parser.add_argument("sources", nargs="*", default=[SAMPLES_FILE], help="JSON, JSONL or JSONL.gz sample files")
+    parser.add_argument("--output", default=DEDUP_FILE)
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM)
+    args = parser.parse_args()
+
+    near_dedup(args.sources, args.output, args.report, args.threshold, args.num_perm)
@@ -0,0 +1,198 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from ocr_profile import USER_WORDS_PATH, load_ocr_profile, preprocess_image, tesseract_config
+
+try:
+    # tesserocr talks to libtesseract directly, so a worker can keep the
+    # language model loaded between calls instead of forking tesseract.exe
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Configure the Tesseract install (update if needed)
+TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+TESSDATA_PATH = r"C:\Program Files\Tesseract-OCR\tessdata"
+OCR_LANG = "eng"
+
+# Number of long-lived OCR workers, override with the OCR_WORKERS env variable
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", max(1, min(4, (os.cpu_count() or 2) // 2))))
+
+if os.path.exists(TESSERACT_CMD):
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+_STOP = object()
+
+
+def to_pixel_array(image):
+    """
+    Convert a file path, NumPy array or PIL image into a contiguous uint8 pixel array
+    with 1, 3 or 4 channels, without encoding it to any file format.
+    """
+    if isinstance(image, (str, os.PathLike)):
+        image = Image.open(image)
+    if isinstance(image, Image.Image):
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        image = np.asarray(image)
+    if not isinstance(image, np.ndarray):
+        raise TypeError(f"Unsupported image type for OCR: {type(image).__name__}")
+    if image.dtype != np.uint8:
+        image = image.astype(np.uint8)
+    return np.ascontiguousarray(image)
+
+
+class _TesseractWorker(threading.Thread):
+    """
+    Worker thread that owns one Tesseract instance and serves jobs from the shared queue.
+    """
+
+    def __init__(self, jobs, lang, tessdata_path, profile):
+        super().__init__(daemon=True)
+        self.jobs = jobs
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self.profile = profile
+
+    def _open_api(self):
+        if tesserocr is None:
+            return None
+        try:
+            path = self.tessdata_path if os.path.isdir(self.tessdata_path) else tesserocr.get_languages()[0]
+            variables = {}
+            if self.profile["user_words"] and os.path.exists(USER_WORDS_PATH):
+                variables["user_words_file"] = USER_WORDS_PATH
+            api = tesserocr.PyTessBaseAPI(init=False)
+            api.InitFull(path=path, lang=self.lang, oem=self.profile["oem"], variables=variables)
+            api.SetPageSegMode(self.profile["psm"])
+            return api
+        except Exception as e:
+            logging.error(f"Could not start tesserocr worker, using pytesseract instead: {e}")
+            return None
+
+    def _recognize(self, api, image):
+        pixels = preprocess_image(to_pixel_array(image), self.profile)
+        if api is None:
+            # pytesseract can only hand images to tesseract.exe through a temp file
+            return pytesseract.image_to_string(pixels, lang=self.lang, config=tesseract_config(self.profile))
+
+        # Hand the raw pixel buffer straight to libtesseract; tesserocr's SetImage
+        # would encode a PIL image to BMP first
+        height, width = pixels.shape[:2]
+        bytes_per_pixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+        api.SetImageBytes(pixels.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+        return api.GetUTF8Text()
+
+    def run(self):
+        api = self._open_api()
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is _STOP:
+                    break
+                image, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._recognize(api, image))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            if api is not None:
+                api.End()
+
+
+class OCREngine:
+    """
+    Pool of long-lived Tesseract workers fed through a job queue.
+
+    Each worker loads the language data once and keeps it for the lifetime of
+    the engine, so a call only pays for recognition instead of a process spawn,
+    a temp PNG and a model reload. Preprocessing and Tesseract parameters come
+    from the tuned OCR profile (see ocr_tuner.py) unless one is passed in.
+    """
+
+    def __init__(self, workers=None, lang=OCR_LANG, tessdata_path=TESSDATA_PATH, profile=None):
+        self.workers = workers or OCR_WORKERS
+        self.lang = lang
+        self.profile = profile or load_ocr_profile()
+        self._jobs = queue.Queue()
+        self._threads = [_TesseractWorker(self._jobs, lang, tessdata_path, self.profile) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        self._closed = False
+
+        if tesserocr is None:
+            logging.warning("tesserocr not installed; OCR workers fall back to one pytesseract call per image.")
+
+    def submit(self, image):
+        """
+        Queue an image (path, NumPy array or PIL image) and return a Future for its text.
+        """
+        if self._closed:
+            raise RuntimeError("OCR engine has been closed.")
+        future = Future()
+        self._jobs.put((image, future))
+        return future
+
+    def image_to_string(self, image, timeout=None):
+        """
+        OCR a single image and return the extracted text.
+        """
+        return self.submit(image).result(timeout)
+
+    def image_to_string_batch(self, images, timeout=None):
+        """
+        OCR several images across the worker pool and return their texts in input order.
+        """
+        futures = [self.submit(image) for image in images]
+        return [future.result(timeout) for future in futures]
+
+    def close(self):
+        """
+        Stop the workers and release their Tesseract instances.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_ocr_engine(workers=None):
+    """
+    Return the process-wide OCR engine, starting it on first use.
+    """
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = OCREngine(workers=workers)
+            atexit.register(_shared_engine.close)
+        return _shared_engine
+
+
+if __name__ == "__main__":
+    image_path = "screenshot.png"  # Replace with your image path
+    with OCREngine() as engine:
+        print(f"Started {engine.workers} OCR workers (tesserocr: {tesserocr is not None})")
+        print(engine.image_to_string(image_path))
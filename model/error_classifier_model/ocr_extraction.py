@@ -1,18 +1,21 @@
 import cv2
-import pytesseract
 import os
-import re
 
-# Configure the Tesseract executable path (update if needed)
-# Ensure this path matches where Tesseract is installed on your system
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# The Tesseract install path is configured in ocr_engine.py
+from ocr_engine import get_ocr_engine
+from rule_engine import match_rules, render_message
+from traceback_roi import crop_regions, exception_lines, find_traceback_regions
 
 
-def extract_text_from_image(image_path):
+def extract_text_from_image(image_path, use_roi=True):
     """
     Extract text from an image using Tesseract OCR with preprocessing.
 
+    Thresholding, scaling and Tesseract modes come from the tuned OCR profile
+    applied by the shared OCR engine (see ocr_tuner.py).
+
     :param image_path: Path to the image file
+    :param use_roi: OCR only the detected traceback region when it holds an exception line
     :return: Extracted text as a string
     """
     # Load the image
@@ -24,14 +27,19 @@ def extract_text_from_image(image_path):
 
     # Convert the image to grayscale for preprocessing
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    engine = get_ocr_engine()
 
-    # Apply adaptive thresholding to make the text stand out
-    processed_image = cv2.adaptiveThreshold(
-        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-    )
+    # OCR only the likely traceback crops first
+    if use_roi:
+        regions = sorted(find_traceback_regions(gray), key=lambda box: (box[1], box[0]))
+        if regions:
+            crops = crop_regions(gray, regions)
+            extracted_text = "\n".join(text.strip() for text in engine.image_to_string_batch(crops)).strip()
+            if exception_lines(extracted_text):
+                return extracted_text
 
-    # Use Tesseract OCR to extract text
-    extracted_text = pytesseract.image_to_string(processed_image).strip()
+    # Use the shared Tesseract worker pool to extract text from the whole image
+    extracted_text = engine.image_to_string(gray).strip()
 
     return extracted_text
 
@@ -43,28 +51,9 @@ def analyze_error(error_text):
     :param error_text: Text extracted from the image
     :return: Suggested fix based on the error
     """
-    # Check for SyntaxError
-    if "SyntaxError" in error_text:
-        match = re.search(r"SyntaxError: (.+)", error_text)
-        if match:
-            return (f"🔴 **Fix:** {match.group(1)}\n👉 **Solution:** Verify the syntax in the given line 1. use the double quota"
-                    f"")
-
-    # Check for NameError
-    if "NameError" in error_text:
-        match = re.search(r"NameError: name '(.+)' is not defined", error_text)
-        if match:
-            return f"🔴 **Fix:** Name `{match.group(1)}` is not defined.\n👉 **Solution:** Ensure the variable or function `{match.group(1)}` is defined before you reference it."
-
-    # Check for IndentationError
-    if "IndentationError" in error_text:
-        match = re.search(r"IndentationError: (.+)", error_text)
-        if match:
-            return f"🔴 **Fix:** {match.group(1)}\n👉 **Solution:** Verify your indentation level. Ensure consistent use of spaces/tabs."
-
-    # Check for EOF Error (unexpected EOF while parsing)
-    if "unexpected EOF while parsing" in error_text:
-        return "🔴 **Fix:** Unexpected end of file detected.\n👉 **Solution:** Check for missing closing brackets, quotation marks, or other incomplete code constructs."
+    match = match_rules(error_text)
+    if match is not None:
+        return f"🔴 **Fix:** {render_message(match)}\n👉 **Solution:** {match.rule['solution']}"
 
     # General case: unrecognized errors
     return "⚠️ Unable to determine the exact issue. Please double-check the error message manually."
@@ -0,0 +1,73 @@
+import json
+import os
+
+import cv2
+
+MODEL_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Written by ocr_tuner.py and loaded by the OCR engine on start-up
+OCR_PROFILE_PATH = os.environ.get("OCR_PROFILE_PATH", os.path.join(MODEL_CODE_DIR, "ocr_profile.json"))
+USER_WORDS_PATH = os.path.join(MODEL_CODE_DIR, "python_exceptions.user-words")
+
+DEFAULT_PROFILE = {
+    "scale": 1.0,           # resize factor applied before OCR
+    "binarize": "none",     # "none", "otsu" or "adaptive"
+    "psm": 3,               # Tesseract page segmentation mode
+    "oem": 3,               # Tesseract OCR engine mode
+    "user_words": False,    # bias recognition towards Python exception vocabulary
+}
+
+BINARIZE_METHODS = ("none", "otsu", "adaptive")
+
+
+def load_ocr_profile(path=OCR_PROFILE_PATH):
+    """
+    Load the tuned OCR profile, falling back to the defaults for anything missing.
+    """
+    profile = dict(DEFAULT_PROFILE)
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as file:
+                profile.update(json.load(file))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading OCR profile from {path}: {e}")
+    return profile
+
+
+def save_ocr_profile(profile, path=OCR_PROFILE_PATH):
+    """
+    Write an OCR profile so every OCR entry point picks it up.
+    """
+    with open(path, "w") as file:
+        json.dump({key: profile[key] for key in DEFAULT_PROFILE}, file, indent=4)
+
+
+def preprocess_image(pixels, profile):
+    """
+    Apply a profile's grayscale, downscale and binarization steps to a uint8 pixel array.
+    """
+    if pixels.ndim == 3:
+        code = cv2.COLOR_RGBA2GRAY if pixels.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+        pixels = cv2.cvtColor(pixels, code)
+
+    scale = profile.get("scale", 1.0)
+    if scale != 1.0:
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+        pixels = cv2.resize(pixels, None, fx=scale, fy=scale, interpolation=interpolation)
+
+    binarize = profile.get("binarize", "none")
+    if binarize == "otsu":
+        _, pixels = cv2.threshold(pixels, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    elif binarize == "adaptive":
+        pixels = cv2.adaptiveThreshold(pixels, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    return pixels
+
+
+def tesseract_config(profile):
+    """
+    Build the pytesseract command-line config string for a profile.
+    """
+    config = f"--psm {profile['psm']} --oem {profile['oem']}"
+    if profile.get("user_words") and os.path.exists(USER_WORDS_PATH):
+        config += f' --user-words "{USER_WORDS_PATH}"'
+    return config
@@ -0,0 +1,159 @@
+"""
+Sweep OCR preprocessing and Tesseract parameters over a labeled screenshot set.
+
+The labels file is a JSON list of entries like
+
+    {"image": "screenshots/name_error.png", "expected": ["NameError: name 'x' is not defined"]}
+
+where image paths are relative to the labels file and `expected` lists the
+lines the OCR must recover. Every combination is scored on line accuracy and
+per-image latency; the fastest profile within `--tolerance` of the best
+accuracy is written to ocr_profile.json, which the shared OCR engine loads.
+"""
+import argparse
+import csv
+import difflib
+import itertools
+import json
+import os
+import statistics
+import time
+
+import cv2
+
+from ocr_engine import OCREngine
+from ocr_profile import BINARIZE_METHODS, OCR_PROFILE_PATH, save_ocr_profile
+
+LABELS_PATH = "ocr_labels.json"
+# An expected line counts as recovered when some OCR line is at least this similar
+MATCH_RATIO = 0.85
+
+SCALES = [1.0, 0.75, 0.5]
+PSM_MODES = [3, 4, 6, 11]
+OEM_MODES = [1, 3]
+
+
+def load_labeled_set(path):
+    """
+    Load the labeled screenshots as (name, RGB pixel array, expected lines) tuples.
+    """
+    with open(path, "r") as file:
+        entries = json.load(file)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    samples = []
+    for entry in entries:
+        image_path = os.path.join(base_dir, entry["image"])
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"Skipping unreadable image: {image_path}")
+            continue
+        samples.append((entry["image"], cv2.cvtColor(image, cv2.COLOR_BGR2RGB), entry["expected"]))
+    return samples
+
+
+def line_accuracy(text, expected_lines):
+    """
+    Return the fraction of expected lines that appear (fuzzily) in the OCR text.
+    """
+    if not expected_lines:
+        return 1.0
+    ocr_lines = [line.strip() for line in text.splitlines() if line.strip()]
+    found = 0
+    for expected in expected_lines:
+        best = max((difflib.SequenceMatcher(None, expected, line).ratio() for line in ocr_lines), default=0.0)
+        if best >= MATCH_RATIO:
+            found += 1
+    return found / len(expected_lines)
+
+
+def evaluate_profile(profile, samples):
+    """
+    OCR every sample with one profile and return its accuracy and latency figures.
+    """
+    with OCREngine(workers=1, profile=profile) as engine:
+        engine.image_to_string(samples[0][1])  # load the model before timing
+
+        accuracies, latencies = [], []
+        for _, pixels, expected in samples:
+            start = time.perf_counter()
+            text = engine.image_to_string(pixels)
+            latencies.append((time.perf_counter() - start) * 1000)
+            accuracies.append(line_accuracy(text, expected))
+
+    return {
+        **profile,
+        "accuracy": round(statistics.mean(accuracies), 4),
+        "mean_ms": round(statistics.mean(latencies), 1),
+        "max_ms": round(max(latencies), 1),
+    }
+
+
+def sweep(samples, scales, binarize_methods, psm_modes, oem_modes, user_words_options):
+    """
+    Evaluate every combination of the given parameter values.
+    """
+    results = []
+    grid = list(itertools.product(scales, binarize_methods, psm_modes, oem_modes, user_words_options))
+    for index, (scale, binarize, psm, oem, user_words) in enumerate(grid, start=1):
+        profile = {"scale": scale, "binarize": binarize, "psm": psm, "oem": oem, "user_words": user_words}
+        try:
+            result = evaluate_profile(profile, samples)
+        except Exception as e:
+            print(f"[{index}/{len(grid)}] {profile} failed: {e}")
+            continue
+        print(f"[{index}/{len(grid)}] {profile} -> accuracy {result['accuracy']:.3f}, {result['mean_ms']:.0f} ms")
+        results.append(result)
+    return results
+
+
+def choose_profile(results, tolerance):
+    """
+    Pick the fastest profile whose accuracy is within `tolerance` of the best one.
+    """
+    best_accuracy = max(result["accuracy"] for result in results)
+    acceptable = [result for result in results if result["accuracy"] >= best_accuracy - tolerance]
+    return min(acceptable, key=lambda result: result["mean_ms"])
+
+
+def write_report(results, path):
+    """
+    Save the accuracy/latency table as CSV, fastest first.
+    """
+    fields = ["scale", "binarize", "psm", "oem", "user_words", "accuracy", "mean_ms", "max_ms"]
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for result in sorted(results, key=lambda result: result["mean_ms"]):
+            writer.writerow({field: result[field] for field in fields})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune OCR preprocessing and Tesseract parameters.")
+    parser.add_argument("--labels", default=LABELS_PATH, help="Labeled screenshot set (JSON)")
+    parser.add_argument("--scales", type=float, nargs="+", default=SCALES)
+    parser.add_argument("--binarize", nargs="+", choices=BINARIZE_METHODS, default=list(BINARIZE_METHODS))
+    parser.add_argument("--psm", type=int, nargs="+", default=PSM_MODES)
+    parser.add_argument("--oem", type=int, nargs="+", default=OEM_MODES)
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="Accuracy the chosen profile may give up against the most accurate one")
+    parser.add_argument("--report", default="ocr_tuning_report.csv", help="CSV accuracy/latency report")
+    parser.add_argument("--output", default=OCR_PROFILE_PATH, help="Where to write the chosen profile")
+    args = parser.parse_args()
+
+    labeled = load_labeled_set(args.labels)
+    if not labeled:
+        parser.error(f"No usable labeled images in {args.labels}.")
+
+    print(f"Tuning on {len(labeled)} labeled screenshots...")
+    all_results = sweep(labeled, args.scales, args.binarize, args.psm, args.oem, [False, True])
+    if not all_results:
+        parser.error("Every profile failed; check the Tesseract installation.")
+
+    write_report(all_results, args.report)
+    chosen = choose_profile(all_results, args.tolerance)
+    save_ocr_profile(chosen, args.output)
+
+    print(f"\nReport written to {args.report}")
+    print(f"Chosen profile (accuracy {chosen['accuracy']:.3f}, {chosen['mean_ms']:.0f} ms/image) saved to {args.output}:")
+    print({key: chosen[key] for key in ["scale", "binarize", "psm", "oem", "user_words"]})
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import xgboost
+
+from embedding_cache import EmbeddingCache
+from feedback_log import FEEDBACK_LOG_FILE, FeedbackLog
+from label_vocabulary import label_vocabulary
+from model_registry import get_xgboost, registry
+from train_xgboost import BERT_MODEL_PATH, SAMPLES_FILE, XGB_MODEL_FILE, get_bert_embeddings_batch
+
+STATE_FILE = "online_update_state.json"
+# Boosting rounds added per update, fitted on the new confirmed rows only
+ROUNDS_PER_UPDATE = 10
+# Retrain policy: a full retrain is due once any of these is reached
+MAX_ONLINE_ROUNDS = 200
+MAX_NEW_FRACTION = 0.2
+MIN_FEEDBACK_ACCURACY = 0.7
+
+
+def task_mapping(samples_file=SAMPLES_FILE):
+    """Task -> class id from the persisted label vocabulary, like train_xgboost."""
+    with open(samples_file, "r") as f:
+        return label_vocabulary(entry["related_task"] for entry in json.load(f))
+
+
+def load_state(path=STATE_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"consumed": 0, "online_rounds": 0, "online_rows": 0, "unknown_task_rows": 0, "updates": [],
+            "last_full_retrain": None}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def save_model(model, model_file):
+    """Write the model next to the old one and swap it in atomically, then drop the loaded copy."""
+    tmp_file = model_file + ".tmp"
+    joblib.dump(model, tmp_file)
+    os.replace(tmp_file, model_file)
+    # get_xgboost also reloads on a newer file, so other processes pick it up on their next prediction
+    registry.unload(("xgboost", model_file))
+
+
+def warm_start(model, X, y, rounds=ROUNDS_PER_UPDATE):
+    """
+    Add `rounds` boosting rounds to the model's booster, fitted on X, y only.
+    Uses the native API, since XGBClassifier.fit insists that y covers every class.
+    """
+    params = {
+        "objective": "multi:softprob",
+        "num_class": len(model.classes_),
+        "learning_rate": model.learning_rate,
+        "max_depth": model.max_depth,
+        "tree_method": "hist",
+        "nthread": -1,
+    }
+    booster = xgboost.train(params, xgboost.DMatrix(X, label=y), num_boost_round=rounds,
+                            xgb_model=model.get_booster())
+    model._Booster = booster
+    return model
+
+
+def retrain_reasons(state, training_rows):
+    """Why a full retrain is warranted now (empty when the online updates are still good enough)."""
+    reasons = []
+    if state["unknown_task_rows"]:
+        reasons.append(f"{state['unknown_task_rows']} confirmed rows have a task the model has no class for")
+    if state["online_rounds"] >= MAX_ONLINE_ROUNDS:
+        reasons.append(f"{state['online_rounds']} boosting rounds added since the last full retrain")
+    if training_rows and state["online_rows"] / training_rows >= MAX_NEW_FRACTION:
+        reasons.append(f"{state['online_rows']} new rows, {state['online_rows'] / training_rows:.0%} of the training set")
+    recent = [update["accuracy_before"] for update in state["updates"][-5:] if update["accuracy_before"] is not None]
+    if recent and np.mean(recent) < MIN_FEEDBACK_ACCURACY:
+        reasons.append(f"accuracy on recent feedback is {np.mean(recent):.0%}")
+    return reasons
+
+
+def online_update(log_file=FEEDBACK_LOG_FILE, model_file=XGB_MODEL_FILE, samples_file=SAMPLES_FILE,
+                  state_file=STATE_FILE, rounds=ROUNDS_PER_UPDATE):
+    """
+    Warm-start the XGBoost model on the feedback confirmed since the last update
+    and hot-swap it. Returns the updated state.
+    """
+    state = load_state(state_file)
+    samples = FeedbackLog(log_file).confirmed_samples()
+    new = samples[state["consumed"]:]
+    if not new:
+        print("No new confirmed feedback.")
+        return state
+
+    mapping = task_mapping(samples_file)
+    known = [sample for sample in new if sample["related_task"] in mapping]
+    state["unknown_task_rows"] += len(new) - len(known)
+    update = {"time": time.time(), "rows": len(known), "skipped_unknown_task": len(new) - len(known),
+              "accuracy_before": None, "seconds": None}
+
+    if known:
+        started = time.perf_counter()
+        X = EmbeddingCache(BERT_MODEL_PATH).get([sample["error_message"] for sample in known],
+                                                get_bert_embeddings_batch)
+        y = np.array([mapping[sample["related_task"]] for sample in known])
+        model = get_xgboost(model_file)
+        # Scored before the update: how well the deployed model did on what users actually saw
+        update["accuracy_before"] = round(float(np.mean(model.predict(X) == y)), 4)
+        save_model(warm_start(model, X, y, rounds), model_file)
+        update["seconds"] = round(time.perf_counter() - started, 3)
+        state["online_rounds"] += rounds
+        state["online_rows"] += len(known)
+        print(f"Added {rounds} rounds from {len(known)} rows in {update['seconds']} s "
+              f"(accuracy before update {update['accuracy_before']:.0%})")
+
+    state["consumed"] = len(samples)
+    state["updates"].append(update)
+    save_state(state, state_file)
+    return state
+
+
+def full_retrain(log_file=FEEDBACK_LOG_FILE, samples_file=SAMPLES_FILE, state_file=STATE_FILE):
+    """
+    Fold the confirmed feedback into the sample file and rerun the retraining
+    pipeline (only the stages affected by the new data run).
+    """
+    from real_time_pipeline import run_pipeline
+
+    with open(samples_file, "r") as f:
+        data = json.load(f)
+    seen = {entry["error_message"] for entry in data}
+    added = 0
+    for sample in FeedbackLog(log_file).confirmed_samples():
+        if sample["error_message"] not in seen:
+            seen.add(sample["error_message"])
+            data.append({"error_message": sample["error_message"], "related_task": sample["related_task"]})
+            added += 1
+    tmp_file = samples_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_file, samples_file)
+    print(f"Added {added} confirmed samples to {samples_file}")
+
+    run_pipeline()
+    state = load_state(state_file)
+    state.update(online_rounds=0, online_rows=0, unknown_task_rows=0, updates=[], last_full_retrain=time.time())
+    save_state(state, state_file)
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the XGBoost model from confirmed feedback.")
+    parser.add_argument("--log", default=FEEDBACK_LOG_FILE)
+    parser.add_argument("--rounds", type=int, default=ROUNDS_PER_UPDATE)
+    parser.add_argument("--retrain", choices=["auto", "never", "always"], default="auto",
+                        help="Run a full retrain when the policy asks for one (auto), never, or now")
+    args = parser.parse_args()
+
+    current = online_update(args.log, rounds=args.rounds)
+    with open(SAMPLES_FILE, "r") as f:
+        reasons = retrain_reasons(current, len(json.load(f)))
+    for reason in reasons:
+        print(f"Full retrain warranted: {reason}")
+    if args.retrain == "always" or (args.retrain == "auto" and reasons):
+        full_retrain(args.log)
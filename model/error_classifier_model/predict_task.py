@@ -1,6 +1,7 @@
 import torch
 from transformers import BertTokenizer, BertForSequenceClassification
 from error_data_loader import load_data
+from batch_inference import classify_texts
 
 
 def predict_error_task(error_message, model, tokenizer, label_mapping):
@@ -19,6 +20,15 @@ def predict_error_task(error_message, model, tokenizer, label_mapping):
     return task
 
 
+def predict_error_tasks(error_messages, model, tokenizer, label_mapping, batch_size=None):
+    """
+    Predict the related task for many error messages with batched BERT passes.
+    """
+    id_to_task = {idx: task for task, idx in label_mapping.items()}
+    predicted_labels = classify_texts(error_messages, model, tokenizer, batch_size)
+    return [id_to_task[label] for label in predicted_labels]
+
+
 if __name__ == "__main__":
     # Load the fine-tuned model and tokenizer
     model = BertForSequenceClassification.from_pretrained("bert_fine_tuned")
@@ -32,3 +42,7 @@ if __name__ == "__main__":
     test_error = "SyntaxError: invalid syntax"
     predicted_task = predict_error_task(test_error, model, tokenizer, label_mapping)
     print(f"Predicted Task: {predicted_task}")
+
+    # Batched prediction
+    test_errors = ["NameError: name 'x' is not defined", "IndentationError: expected an indented block"]
+    print(f"Predicted Tasks: {predict_error_tasks(test_errors, model, tokenizer, label_mapping)}")
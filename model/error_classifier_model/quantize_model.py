@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+from batch_inference import classify_logits
+
+BERT_MODEL_PATH = "bert_fine_tuned"
+# Written next to the fp32 weights; model_registry prefers it when present
+QUANTIZED_FILE = "quantized_int8.pt"
+VAL_FILE = "val_samples.json"
+
+
+def quantized_path(model_dir):
+    return os.path.join(model_dir, QUANTIZED_FILE)
+
+
+def _quantize(model):
+    """Replace every Linear layer with an int8 dynamically quantized one."""
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_quantized(model_dir=BERT_MODEL_PATH):
+    """
+    Quantize the fine-tuned classifier to int8 and save its state dict next to the fp32 model.
+    """
+    model = BertForSequenceClassification.from_pretrained(model_dir).eval()
+    quantized = _quantize(model)
+    output_path = quantized_path(model_dir)
+    torch.save(quantized.state_dict(), output_path)
+    print(f"Saved int8 model to {output_path}")
+    return output_path
+
+
+def load_quantized_classifier(model_dir=BERT_MODEL_PATH):
+    """
+    Rebuild the int8 classifier: an untrained skeleton from config.json is quantized
+    the same way as at export time, then the saved int8 weights are loaded into it.
+    """
+    config = BertConfig.from_pretrained(model_dir)
+    skeleton = _quantize(BertForSequenceClassification(config).eval())
+    skeleton.load_state_dict(torch.load(quantized_path(model_dir)))
+    return skeleton.eval()
+
+
+def _time_logits(model, tokenizer, texts, repeat=5):
+    classify_logits(texts, model, tokenizer)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        logits = classify_logits(texts, model, tokenizer)
+    return logits, (time.perf_counter() - start) / repeat
+
+
+def check_parity(model_dir=BERT_MODEL_PATH, val_file=VAL_FILE):
+    """
+    Compare fp32 and int8 predictions on the validation samples and report
+    label agreement, logit drift, latency and on-disk size.
+    """
+    with open(val_file, "r") as file:
+        texts = [entry["error_message"] for entry in json.load(file)]
+
+    tokenizer = BertTokenizer.from_pretrained(model_dir)
+    fp32_model = BertForSequenceClassification.from_pretrained(model_dir).eval()
+    int8_model = load_quantized_classifier(model_dir)
+
+    fp32_logits, fp32_seconds = _time_logits(fp32_model, tokenizer, texts)
+    int8_logits, int8_seconds = _time_logits(int8_model, tokenizer, texts)
+
+    agreement = float(np.mean(fp32_logits.argmax(axis=1) == int8_logits.argmax(axis=1)))
+    drift = np.abs(fp32_logits - int8_logits)
+    fp32_files = [os.path.join(model_dir, name) for name in ("pytorch_model.bin", "model.safetensors")]
+    fp32_size = sum(os.path.getsize(path) for path in fp32_files if os.path.exists(path))
+    int8_size = os.path.getsize(quantized_path(model_dir))
+
+    report = {
+        "samples": len(texts),
+        "label_agreement": round(agreement, 4),
+        "max_logit_drift": round(float(drift.max()), 4),
+        "mean_logit_drift": round(float(drift.mean()), 4),
+        "fp32_ms_per_sample": round(fp32_seconds / len(texts) * 1000, 2),
+        "int8_ms_per_sample": round(int8_seconds / len(texts) * 1000, 2),
+        "fp32_size_mb": round(fp32_size / 2 ** 20, 1),
+        "int8_size_mb": round(int8_size / 2 ** 20, 1),
+    }
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export an int8 quantized error classifier and check its parity.")
+    parser.add_argument("--model-dir", default=BERT_MODEL_PATH, help="Fine-tuned BERT classifier directory")
+    parser.add_argument("--val-file", default=VAL_FILE, help="Validation samples for the parity check")
+    parser.add_argument("--check-only", action="store_true", help="Skip the export and only run the parity check")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export_quantized(args.model_dir)
+    check_parity(args.model_dir, args.val_file)
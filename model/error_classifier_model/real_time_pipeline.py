@@ -1,20 +1,336 @@
-import subprocess
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
 
+from dataset_cache import file_digest
+from label_vocabulary import VOCAB_FILE
+from model_registry import bert_model_files, registry, resident_memory_bytes
 
-def fine_tune_bert():
-    subprocess.run(["python", "fine_tune_bert.py"])
+SAMPLES_FILE = "error_samples.json"
+# Near-duplicate clusters collapsed into weighted representatives, see near_dedup.py
+DEDUP_FILE = "error_samples.dedup.json"
+DEDUP_REPORT_FILE = "dedup_report.json"
+TRAIN_FILE = "train_samples.json"
+VAL_FILE = "val_samples.json"
+BERT_MODEL_PATH = "bert_fine_tuned"
+XGB_MODEL_FILE = "xgboost_model.pkl"
+# Written by quantize_model.export_quantized (QUANTIZED_FILE), served by get_bert_classifier
+QUANTIZED_MODEL_FILE = os.path.join(BERT_MODEL_PATH, "quantized_int8.pt")
+METRICS_FILE = "pipeline_metrics.json"
+# Fingerprints, outputs and timings of the last run of every stage
+MANIFEST_FILE = "pipeline_manifest.json"
+MEMORY_SAMPLE_INTERVAL = 0.05
 
+FINE_TUNE_PARAMS = {"fast": True, "epochs": 3, "batch_size": 8, "gradient_accumulation_steps": 1, "bf16": False}
 
-def train_xgboost():
-    subprocess.run(["python", "train_xgboost.py"])
 
+def bert_artifacts(model_dir=BERT_MODEL_PATH):
+    """Files of the fine-tuned model that downstream stages depend on."""
+    return bert_model_files(model_dir)
 
-def run_pipeline():
+
+class ContentHasher:
+    """
+    SHA-1 of file contents, remembered by (path, size, mtime) so unchanged files
+    are not read again on the next run.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = memo or {}
+
+    def digest(self, path):
+        if not os.path.exists(path):
+            return None
+        if os.path.isdir(path):
+            digest = hashlib.sha1()
+            for root, _, names in sorted(os.walk(path)):
+                for name in sorted(names):
+                    file_path = os.path.join(root, name)
+                    digest.update(f"{os.path.relpath(file_path, path)}:{self.digest(file_path)}".encode())
+            return digest.hexdigest()
+        stat = os.stat(path)
+        stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+        cached = self.memo.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = self.memo[path] = [stamp, file_digest(path)]
+        return cached[1]
+
+
+class PeakMemory:
+    """Context manager sampling the resident memory on a thread and keeping the peak."""
+
+    def __init__(self, interval=MEMORY_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while True:
+            rss = resident_memory_bytes()
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class Stage:
+    """
+    One pipeline step: `run()` reads the `inputs` files and returns the paths it
+    wrote. The step is skipped when the contents of its inputs, its params and
+    its own code hash to the fingerprint of its last successful run and those
+    outputs still exist.
+    """
+
+    def __init__(self, name, run, inputs, params=None, code=()):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.params = params or {}
+        self.code = list(code)
+
+    def fingerprint(self, hasher):
+        parts = {
+            "inputs": {path: hasher.digest(path) for path in self.inputs},
+            "code": {path: hasher.digest(path) for path in self.code},
+            "params": self.params,
+        }
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+# Stage implementations. Heavy libraries are imported inside them, so a rerun
+# where every stage is skipped does not pay for loading torch or transformers.
+
+def dedup_stage():
+    from near_dedup import near_dedup
+    near_dedup([SAMPLES_FILE], DEDUP_FILE, DEDUP_REPORT_FILE)
+    return [DEDUP_FILE, DEDUP_REPORT_FILE]
+
+
+def split_stage():
+    from df import split_samples
+    # Split after dedup, so near duplicates of a validation sample are not in the training set
+    split_samples(DEDUP_FILE, TRAIN_FILE, VAL_FILE)
+    return [TRAIN_FILE, VAL_FILE]
+
+
+def tokenize_stage():
+    from dataset_cache import build_token_cache, iter_samples
+    from label_vocabulary import label_vocabulary
+    from model_registry import get_tokenizer
+    tokenizer = get_tokenizer()
+    # Same mapping as fine_tune_bert builds, so its run finds these caches
+    label_mapping = label_vocabulary(label for path in (TRAIN_FILE, VAL_FILE) for _, label in iter_samples(path))
+    return [build_token_cache(path, tokenizer, label_mapping) for path in (TRAIN_FILE, VAL_FILE)]
+
+
+def derived_artifacts(model_dir=BERT_MODEL_PATH):
+    """Files other tools derive from the fine-tuned weights and save next to them."""
+    from early_exit import HEADS_FILE
+    from explanation_index import EMBEDDINGS_FILE, IVF_FILE, META_FILE
+    from quantize_model import QUANTIZED_FILE
+    return [os.path.join(model_dir, name) for name in (QUANTIZED_FILE, HEADS_FILE, EMBEDDINGS_FILE, META_FILE, IVF_FILE)]
+
+
+def fine_tune_stage():
+    from fine_tune_bert import train_model
+    train_model(output_dir=BERT_MODEL_PATH, **FINE_TUNE_PARAMS)
+    # Derived from the old weights: the int8 export and exit heads would otherwise be
+    # served in preference to the new model. The stages below rebuild them.
+    for path in derived_artifacts():
+        if os.path.exists(path):
+            os.remove(path)
+    # Models loaded from the previous weights must not outlive this run
+    for kind in ("tokenizer", "bert_classifier", "bert_classifier_int8", "bert_encoder", "early_exit"):
+        registry.unload((kind, BERT_MODEL_PATH))
+    return [path for path in bert_artifacts() if os.path.exists(path)]
+
+
+def quantize_stage():
+    from quantize_model import QUANTIZED_FILE, export_quantized
+    export_quantized(BERT_MODEL_PATH)
+    registry.unload(("bert_classifier_int8", BERT_MODEL_PATH))
+    return [os.path.join(BERT_MODEL_PATH, QUANTIZED_FILE)]
+
+
+def exit_heads_stage():
+    from early_exit import heads_path, train_exit_heads
+    train_exit_heads(BERT_MODEL_PATH, TRAIN_FILE)
+    registry.unload(("early_exit", BERT_MODEL_PATH))
+    return [heads_path(BERT_MODEL_PATH)]
+
+
+def explanation_index_stage():
+    from explanation_index import EMBEDDINGS_FILE, META_FILE, build_index
+    # The full sample file: the deduplicated one drops the explanations
+    build_index(SAMPLES_FILE, BERT_MODEL_PATH)
+    return [os.path.join(BERT_MODEL_PATH, name) for name in (EMBEDDINGS_FILE, META_FILE)]
+
+
+def load_texts(file_path):
+    with open(file_path, "r") as f:
+        return [entry["error_message"] for entry in json.load(f)]
+
+
+def embed_stage():
+    from embedding_cache import EmbeddingCache
+    from train_xgboost import get_bert_embeddings_batch
+    cache = EmbeddingCache(BERT_MODEL_PATH)
+    cache.get(load_texts(DEDUP_FILE), get_bert_embeddings_batch)
+    print(f"Embedding cache: {cache.stats()}")
+    return [cache.path]
+
+
+def fit_xgboost_stage():
+    from train_xgboost import train_xgboost
+    train_xgboost(DEDUP_FILE, XGB_MODEL_FILE)
+    registry.unload(("xgboost", XGB_MODEL_FILE))
+    return [XGB_MODEL_FILE]
+
+
+def evaluate_stage():
+    import numpy as np
+    from batch_inference import classify_texts
+    from embedding_cache import EmbeddingCache
+    from label_vocabulary import load_vocabulary, task_names
+    from model_registry import get_bert_classifier, get_tokenizer, get_xgboost
+    from train_xgboost import get_bert_embeddings_batch
+
+    with open(VAL_FILE, "r") as f:
+        val_data = json.load(f)
+    # BERT and XGBoost both take their class ids from the label vocabulary
+    labels = task_names(load_vocabulary())
+    texts = [entry["error_message"] for entry in val_data]
+    tasks = [entry["related_task"] for entry in val_data]
+
+    bert_ids = classify_texts(texts, get_bert_classifier(BERT_MODEL_PATH, prefer_quantized=False),
+                              get_tokenizer(BERT_MODEL_PATH))
+    # The int8 export is what get_bert_classifier serves by default
+    int8_ids = classify_texts(texts, get_bert_classifier(BERT_MODEL_PATH), get_tokenizer(BERT_MODEL_PATH))
+    xgb_ids = get_xgboost(XGB_MODEL_FILE).predict(EmbeddingCache(BERT_MODEL_PATH).get(texts, get_bert_embeddings_batch))
+    metrics = {
+        "val_samples": len(texts),
+        "bert_accuracy": round(float(np.mean([labels[i] == task for i, task in zip(bert_ids, tasks)])), 4),
+        "bert_int8_accuracy": round(float(np.mean([labels[i] == task for i, task in zip(int8_ids, tasks)])), 4),
+        # XGBoost is fitted on every sample, so this is not a held-out score
+        "xgboost_accuracy": round(float(np.mean([labels[int(i)] == task for i, task in zip(xgb_ids, tasks)])), 4),
+    }
+    print(f"Evaluation: {metrics}")
+    with open(METRICS_FILE, "w") as f:
+        json.dump(metrics, f, indent=2)
+    return [METRICS_FILE]
+
+
+def build_stages():
+    """The retraining DAG, in dependency order; every stage reads files earlier stages write."""
+    return [
+        Stage("dedup", dedup_stage, [SAMPLES_FILE], {"threshold": 0.8, "num_perm": 128},
+              code=["near_dedup.py", "result_cache.py", "traceback_condense.py"]),
+        Stage("split", split_stage, [DEDUP_FILE], {"test_size": 0.2},
+              code=["df.py", "dataset_builder.py", "dataset_cache.py", "label_vocabulary.py"]),
+        Stage("tokenize", tokenize_stage, [TRAIN_FILE, VAL_FILE, VOCAB_FILE], {"tokenizer": "bert-base-uncased"},
+              code=["dataset_cache.py", "label_vocabulary.py"]),
+        Stage("fine_tune", fine_tune_stage, [TRAIN_FILE, VAL_FILE, VOCAB_FILE], FINE_TUNE_PARAMS,
+              code=["fine_tune_bert.py", "dataset_cache.py", "label_vocabulary.py"]),
+        Stage("quantize", quantize_stage, bert_artifacts(), code=["quantize_model.py"]),
+        Stage("exit_heads", exit_heads_stage, [TRAIN_FILE] + bert_artifacts(), code=["early_exit.py"]),
+        Stage("explanation_index", explanation_index_stage, [SAMPLES_FILE] + bert_artifacts(),
+              code=["explanation_index.py", "batch_inference.py"]),
+        Stage("embed", embed_stage, [DEDUP_FILE] + bert_artifacts(),
+              code=["embedding_cache.py", "batch_inference.py", "traceback_condense.py"]),
+        Stage("fit_xgboost", fit_xgboost_stage, [DEDUP_FILE] + bert_artifacts(), code=["train_xgboost.py"]),
+        Stage("evaluate", evaluate_stage, [VAL_FILE, VOCAB_FILE, XGB_MODEL_FILE] + bert_artifacts()
+              + [QUANTIZED_MODEL_FILE]),
+    ]
+
+
+def load_manifest(path=MANIFEST_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"stages": {}, "hashes": {}}
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_pipeline(force=(), manifest_file=MANIFEST_FILE):
+    """
+    Run every stage whose inputs, params or code changed since its last
+    successful run (or that is named in `force`), skip the rest, and print wall
+    time and peak resident memory per stage. A failing stage stops the pipeline
+    and is retried on the next run. Returns the per-stage report.
+    """
     print("Updating models...")
-    fine_tune_bert()
-    train_xgboost()
+    manifest = load_manifest(manifest_file)
+    hasher = ContentHasher(manifest.get("hashes"))
+    report = []
+    try:
+        for stage in build_stages():
+            started = time.perf_counter()
+            fingerprint = stage.fingerprint(hasher)
+            previous = manifest["stages"].get(stage.name, {})
+            if (stage.name not in force and previous.get("fingerprint") == fingerprint
+                    and all(os.path.exists(path) for path in previous.get("outputs", []))):
+                report.append({"stage": stage.name, "status": "skipped",
+                               "seconds": round(time.perf_counter() - started, 3), "peak_rss_mb": None})
+                continue
+
+            print(f"Running stage {stage.name}...")
+            with PeakMemory() as memory:
+                try:
+                    outputs = stage.run()
+                except Exception:
+                    manifest["stages"].pop(stage.name, None)
+                    report.append({"stage": stage.name, "status": "failed",
+                                   "seconds": round(time.perf_counter() - started, 3),
+                                   "peak_rss_mb": memory.peak and round(memory.peak / 2 ** 20, 1)})
+                    raise
+            missing = [path for path in outputs if not os.path.exists(path)]
+            if missing:
+                raise RuntimeError(f"Stage {stage.name} did not write {missing}")
+
+            seconds = round(time.perf_counter() - started, 3)
+            peak = memory.peak and round(memory.peak / 2 ** 20, 1)
+            manifest["stages"][stage.name] = {"fingerprint": fingerprint, "outputs": outputs,
+                                              "seconds": seconds, "peak_rss_mb": peak, "finished": time.time()}
+            report.append({"stage": stage.name, "status": "ran", "seconds": seconds, "peak_rss_mb": peak})
+            save_manifest(manifest, manifest_file)
+    finally:
+        manifest["hashes"] = hasher.memo
+        save_manifest(manifest, manifest_file)
+        print(f"{'stage':<17}  {'status':<7}  {'seconds':>9}  {'peak RSS MB':>11}")
+        for row in report:
+            peak = "-" if row["peak_rss_mb"] is None else row["peak_rss_mb"]
+            print(f"{row['stage']:<17}  {row['status']:<7}  {row['seconds']:>9}  {peak:>11}")
     print("Models updated successfully!")
+    return report
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    stage_names = [stage.name for stage in build_stages()]
+    parser = argparse.ArgumentParser(description="Incrementally retrain the error classifiers.")
+    parser.add_argument("--force", nargs="*", choices=stage_names,
+                        help="Rerun these stages even if their inputs are unchanged (no names: all)")
+    args = parser.parse_args()
+    if args.force is None:
+        force = ()
+    else:
+        force = args.force or stage_names
+    run_pipeline(force=force)
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_PATH = "result_cache.sqlite3"
+MEMORY_CAPACITY = 256
+DISK_CAPACITY = 5000
+# How often (seconds) the model artifacts are re-checked for changes
+FINGERPRINT_CHECK_INTERVAL = 30
+# Bumped whenever error_signature changes, so entries stored under old signatures are dropped
+SIGNATURE_VERSION = 2
+
+_EXCEPTION_LINE = re.compile(r"\b([A-Z][A-Za-z]*(?:Error|Exception|Warning))\b:?(.*)")
+_NORMALIZERS = [
+    (re.compile(r'File\s+"[^"]*"'), "File <path>"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\- ]+)+\.\w+"), "<path>"),
+    (re.compile(r"\bline\s+\d+", re.IGNORECASE), "line <n>"),
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"\b[A-Za-z_]\w*(?=\(\))"), "<fn>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "<id>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "<n>"),
+    (re.compile(r"[^\w<>:()\[\]+\-*/.,=' ]+"), " "),  # OCR noise: stray symbols, ligatures, box glyphs
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize_text(text, names=True):
+    """
+    Replace paths, line numbers, quoted identifiers, numbers and OCR noise by
+    placeholders. With names=False, function names and quoted identifiers are kept.
+    """
+    for pattern, replacement in _NORMALIZERS:
+        if names or replacement not in ("<fn>", "<id>"):
+            text = pattern.sub(replacement, text)
+    return text.strip().lower()
+
+
+def error_signature(text):
+    """
+    Reduce error text to a signature that is the same for every occurrence of the
+    same error: file paths, line numbers, numbers and OCR noise are replaced by
+    placeholders. Function names and quoted identifiers are kept, since they tell
+    errors of different tasks apart ('Car' object vs 'NoneType' object). When the
+    text holds an exception line only the last one is kept, since that is the
+    error being reported.
+    """
+    text = text or ""
+    matches = list(_EXCEPTION_LINE.finditer(text))
+    if matches:
+        last = matches[-1]
+        text = f"{last.group(1)}: {last.group(2).splitlines()[0] if last.group(2) else ''}"
+    return normalize_text(text, names=False)
+
+
+def artifact_fingerprint(paths):
+    """
+    Hash the size and modification time of the model artifacts (files or directories).
+    """
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        for file_path in files:
+            if os.path.exists(file_path):
+                stat = os.stat(file_path)
+                digest.update(f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-level cache of final predictions keyed by the error signature: a bounded
+    in-memory LRU in front of a small SQLite store that survives restarts.
+
+    Entries are tagged with a fingerprint of the model artifacts; when any
+    artifact changes, older entries are dropped.
+    """
+
+    def __init__(self, model_paths, path=RESULT_CACHE_PATH, capacity=MEMORY_CAPACITY, disk_capacity=DISK_CAPACITY):
+        self.model_paths = list(model_paths)
+        self.capacity = capacity
+        self.disk_capacity = disk_capacity
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(signature TEXT PRIMARY KEY, result TEXT, model_version TEXT, created REAL)"
+        )
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._version = None
+        self._version_checked = 0.0
+        self._check_version()
+
+    def _check_version(self):
+        """Invalidate everything if the model artifacts changed since the last check."""
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked < FINGERPRINT_CHECK_INTERVAL:
+            return
+        self._version_checked = now
+        version = f"{SIGNATURE_VERSION}:{artifact_fingerprint(self.model_paths)}"
+        if version != self._version:
+            self._memory.clear()
+            self._db.execute("DELETE FROM results WHERE model_version != ?", (version,))
+            self._db.commit()
+            self._version = version
+
+    def get(self, text):
+        """
+        Return the cached result for this error text, or None.
+        """
+        signature = error_signature(text)
+        with self._lock:
+            self._check_version()
+            if signature in self._memory:
+                self._memory.move_to_end(signature)
+                self.hits_memory += 1
+                return self._memory[signature]
+
+            row = self._db.execute("SELECT result FROM results WHERE signature = ?", (signature,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            result = json.loads(row[0])
+            self._remember(signature, result)
+            self.hits_disk += 1
+            return result
+
+    def put(self, text, result):
+        """
+        Store the final prediction for this error text in memory and on disk.
+        """
+        signature = error_signature(text)
+        with self._lock:
+            self._check_version()
+            self._remember(signature, result)
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (signature, json.dumps(result), self._version, time.time()),
+            )
+            # Keep the on-disk store small by dropping the oldest rows
+            self._db.execute(
+                "DELETE FROM results WHERE signature NOT IN "
+                "(SELECT signature FROM results ORDER BY created DESC LIMIT ?)",
+                (self.disk_capacity,),
+            )
+            self._db.commit()
+
+    def _remember(self, signature, result):
+        self._memory[signature] = result
+        self._memory.move_to_end(signature)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """
+        Return hit/miss counters and the overall hit rate.
+        """
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+if __name__ == "__main__":
+    samples = [
+        'File "C:\\Users\\deven\\app.py", line 10, in <module>\n    print(x)\nNameError: name \'x\' is not defined',
+        'File "/home/lab/test.py", line 3, in <module>\nNameError: name \'total\' is not defined',
+        "TypeError: unsupported operand type(s) for +: 'int' and 'str'",
+    ]
+    for sample in samples:
+        print(error_signature(sample))
@@ -0,0 +1,539 @@
+import re
+from collections import deque, namedtuple
+
+# Rules that match through their regex (with captures) at or above this confidence
+# are trusted without running BERT
+RULE_CONFIDENCE_THRESHOLD = 0.9
+# A rule found only through one of its keywords (e.g. OCR mangled the quotes the
+# regex needs) gets its confidence scaled by this factor
+KEYWORD_ONLY_FACTOR = 0.7
+
+RuleMatch = namedtuple("RuleMatch", ["rule", "captures", "confidence", "text", "position"])
+
+
+def _extend(base, **overrides):
+    """Copy a rule and override some of its fields (for more specific variants)."""
+    rule = dict(base)
+    rule.update(overrides)
+    return rule
+
+
+_SYNTAX_ERROR = {
+    "name": "SyntaxError",
+    "category": "syntax",
+    "keywords": ["syntaxerror", "invalid syntax"],
+    "pattern": r"SyntaxError: (?P<detail>[^\n]+)|invalid syntax",
+    "confidence": 0.9,
+    "related_task": "write_first_python_program",
+    "title": "🔴 Invalid Syntax Detected",
+    "message": ["SyntaxError: {detail}", "SyntaxError: invalid syntax"],
+    "solution": "Verify the syntax in the given line. Check commas, colons, brackets and quote mismatches.",
+    "example": 'print("Hello, World!")  # Correct syntax with matching quotes and parentheses',
+    "steps": [
+        "Step 1: Go to the line number shown in the error.",
+        "Step 2: Check for missing colons, brackets, commas or quotes.",
+    ],
+}
+
+_TYPE_ERROR = {
+    "name": "TypeError",
+    "keywords": ["typeerror"],
+    "pattern": r"TypeError: (?P<detail>[^\n]+)",
+    "confidence": 0.6,
+    "related_task": None,
+    "title": "🔴 TypeError",
+    "message": ["TypeError: {detail}", "TypeError"],
+    "solution": "You're using a data type incorrectly. Check function inputs or operations.",
+    "example": 'print("The number is " + str(5))  # Convert int to string before concatenation',
+    "steps": [
+        "Step 1: Check the types of the values used on the failing line.",
+        "Step 2: Convert values explicitly (str(), int(), list()) before combining them.",
+    ],
+}
+
+_ATTRIBUTE_ERROR = {
+    "name": "AttributeError",
+    "keywords": ["attributeerror"],
+    "pattern": r"AttributeError: '(?P<object>[^']+)' object has no attribute '(?P<attribute>[^']+)'",
+    "confidence": 0.85,
+    "related_task": "python_oop",
+    "title": "🔴 AttributeError",
+    "message": ["AttributeError: '{object}' object missing attribute '{attribute}'", "AttributeError"],
+    "solution": "Check that the attribute or method exists on this type of object.",
+    "example": "names = []\nnames.append('Ada')  # append exists on lists, not on strings",
+    "steps": [
+        "Step 1: Verify that you're calling the correct attribute or method on the object.",
+        "Step 2: Ensure the object type matches the attribute/method you're trying to access.",
+    ],
+}
+
+_VALUE_ERROR = {
+    "name": "ValueError",
+    "keywords": ["valueerror"],
+    "pattern": r"ValueError: (?P<detail>[^\n]+)",
+    "confidence": 0.6,
+    "related_task": None,
+    "title": "🔴 Value Error",
+    "message": ["ValueError: {detail}", "ValueError"],
+    "solution": "Check for correct input types and valid data values.",
+    "example": 'num = input("Enter a number: ")\nif num.isdigit():\n    print(int(num))\nelse:\n    print("Please enter a valid number.")',
+    "steps": [
+        "Step 1: Confirm the input type matches the expected format.",
+        "Step 2: If converting to int, ensure the string represents a valid integer.",
+    ],
+}
+
+# Ordered from most to least specific: when several rules match at the same
+# position, the earlier one wins
+RULES = [
+    {
+        "name": "CommandNotFound",
+        "keywords": ["is not recognized as an internal or external command"],
+        "pattern": r"(?P<command>\w+) is not recognized as an internal or external command",
+        "confidence": 0.95,
+        "related_task": "install_python",
+        "title": "🔴 Command Not Found",
+        "message": ["'{command}' is not recognized as a command", "Command not recognized"],
+        "solution": "Python is not installed or not on PATH. Reinstall it with 'Add Python to PATH' ticked.",
+        "example": "python --version  # should print the installed version",
+        "steps": [
+            "Step 1: Reinstall Python and tick 'Add Python to PATH'.",
+            "Step 2: Open a new terminal and run `python --version`.",
+        ],
+    },
+    {
+        "name": "PackageVersionNotFound",
+        "keywords": ["could not find a version that satisfies the requirement"],
+        "pattern": r"Could not find a version that satisfies the requirement (?P<package>\S+)",
+        "confidence": 0.95,
+        "related_task": "install_python",
+        "title": "🔴 Package Not Found",
+        "message": ["No installable version of {package}", "No installable version of the package"],
+        "solution": "Check the package name and that it supports your Python version.",
+        "example": "pip install requests  # use the exact name from pypi.org",
+        "steps": [
+            "Step 1: Check the spelling of the package name on pypi.org.",
+            "Step 2: Make sure the package supports your Python version.",
+        ],
+    },
+    _extend(_SYNTAX_ERROR, name="BreakOutsideLoop", keywords=["outside loop"],
+            pattern=r"SyntaxError: '(?P<statement>break|continue)' (?:not properly in|outside) loop",
+            confidence=0.95, related_task="python_loops",
+            message=["SyntaxError: '{statement}' outside loop"],
+            solution="'break' and 'continue' can only be used inside a for or while loop."),
+    _extend(_SYNTAX_ERROR, name="NonDefaultArgument", keywords=["non-default argument follows default argument"],
+            pattern=r"SyntaxError: non-default argument follows default argument",
+            confidence=0.95, related_task="python_functions",
+            message=["SyntaxError: non-default argument follows default argument"],
+            solution="Put parameters without default values before parameters with defaults.",
+            example="def greet(name, greeting='Hello'):  # required parameters come first"),
+    _SYNTAX_ERROR,
+    {
+        "name": "IndentationError",
+        "category": "syntax",
+        "keywords": ["indentationerror"],
+        "pattern": r"IndentationError: (?P<detail>[^\n]+)",
+        "confidence": 0.9,
+        "related_task": "write_first_python_program",
+        "title": "🔴 Indentation Error",
+        "message": ["IndentationError: {detail}", "IndentationError"],
+        "solution": "Verify your indentation level. Ensure consistent use of spaces/tabs.",
+        "example": "for i in range(5):\n    print(i)  # Proper indentation inside the loop",
+        "steps": [
+            "Step 1: Indent every block after a colon by 4 spaces.",
+            "Step 2: Don't mix tabs and spaces in the same file.",
+        ],
+    },
+    {
+        "name": "UnexpectedEOF",
+        "category": "syntax",
+        "keywords": ["unexpected eof while parsing"],
+        "pattern": r"unexpected EOF while parsing",
+        "confidence": 0.9,
+        "related_task": "write_first_python_program",
+        "title": "🔴 Unexpected End of File",
+        "message": ["Unexpected end of file detected."],
+        "solution": "Check for missing closing brackets, quotation marks, or other incomplete code constructs.",
+        "example": 'print("Hello")  # every bracket and quote is closed',
+        "steps": [
+            "Step 1: Look for a bracket, quote or block that is opened but never closed.",
+            "Step 2: Check the last few lines of the file first.",
+        ],
+    },
+    {
+        "name": "ModuleNotFoundError",
+        "keywords": ["modulenotfounderror", "module not found", "no module named"],
+        "pattern": r"No module named '(?P<module>[^']+)'",
+        "confidence": 0.9,
+        "related_task": "python_web_scraping",
+        "title": "🔴 Module Not Found",
+        "message": ["ModuleNotFoundError: No module named '{module}'", "ModuleNotFoundError"],
+        "solution": "Ensure the module is installed.",
+        "example": "pip install beautifulsoup4 requests  # Install missing modules",
+        "steps": [
+            "Step 1: Ensure the required library is installed using pip.",
+            "Step 2: Use the command `pip install <library_name>`.",
+        ],
+    },
+    {
+        "name": "ImportError",
+        "keywords": ["importerror"],
+        "pattern": r"ImportError: (?P<detail>[^\n]+)",
+        "confidence": 0.6,
+        "related_task": None,
+        "title": "🔴 Import Error",
+        "message": ["ImportError: {detail}", "ImportError"],
+        "solution": "Ensure the required library is installed and the imported name exists.",
+        "example": "pip install <library_name>",
+        "steps": [
+            "Step 1: Ensure the required library is installed using pip.",
+            "Step 2: Use the command `pip install <library_name>`.",
+        ],
+    },
+    {
+        "name": "NameError",
+        "keywords": ["nameerror"],
+        "pattern": r"NameError: name '(?P<name>[^']+)' is not defined",
+        "confidence": 0.95,
+        "related_task": "python_variables",
+        "title": "🔴 NameError",
+        "message": ["Name `{name}` is not defined.", "A name is not defined."],
+        "solution": "You're using a variable or function that hasn't been defined yet. "
+                    "Ensure it is defined before you reference it.",
+        "example": 'name = "Python"\nprint(name)  # Make sure \'name\' is defined before use',
+        "steps": [
+            "Step 1: Check the spelling of the name on the failing line.",
+            "Step 2: Define the variable or function before the line that uses it.",
+        ],
+    },
+    {
+        "name": "UnboundLocalError",
+        "keywords": ["unboundlocalerror"],
+        "pattern": r"UnboundLocalError: (?P<detail>[^\n]+)",
+        "confidence": 0.95,
+        "related_task": "python_variables",
+        "title": "🔴 UnboundLocalError",
+        "message": ["UnboundLocalError: {detail}", "UnboundLocalError"],
+        "solution": "Assign the local variable before reading it, or declare it global.",
+        "example": "count = 0\ndef add():\n    global count\n    count += 1",
+        "steps": [
+            "Step 1: Give the variable a value before it is read inside the function.",
+            "Step 2: Use `global` if you meant the module-level variable.",
+        ],
+    },
+    _extend(_TYPE_ERROR, name="UnsupportedOperand", keywords=["unsupported operand type"],
+            pattern=r"TypeError: (?P<detail>unsupported operand type\(s\)[^\n]*)",
+            confidence=0.9, related_task="python_variables"),
+    _extend(_TYPE_ERROR, name="NotIterable", keywords=["is not iterable"],
+            pattern=r"TypeError: '(?P<type>\w+)' object is not iterable",
+            confidence=0.9, related_task="python_loops",
+            message=["TypeError: '{type}' object is not iterable"],
+            solution="Loop over a list, string, range or other iterable, not a single value.",
+            example="for i in range(5):  # range() makes an int iterable"),
+    _extend(_TYPE_ERROR, name="ConstructorArguments", keywords=["__init__() missing"],
+            pattern=r"TypeError: __init__\(\) missing (?P<detail>[^\n]+)",
+            confidence=0.9, related_task="python_oop",
+            message=["TypeError: __init__() missing {detail}"],
+            solution="Pass every argument the class constructor requires when creating the object."),
+    _extend(_TYPE_ERROR, name="MissingArguments", keywords=["required positional argument"],
+            pattern=r"TypeError: (?P<function>\w+)\(\) missing (?P<detail>[^\n]+)",
+            confidence=0.9, related_task="python_functions",
+            message=["TypeError: {function}() missing {detail}"],
+            solution="Call the function with every required argument."),
+    _TYPE_ERROR,
+    {
+        "name": "IndexError",
+        "keywords": ["indexerror"],
+        "pattern": r"IndexError: (?P<detail>[^\n]+)",
+        "confidence": 0.9,
+        "related_task": "python_loops",
+        "title": "🔴 IndexError",
+        "message": ["IndexError: {detail}", "IndexError"],
+        "solution": "The index is past the end of the sequence. Loop with range(len(items)) or over the items directly.",
+        "example": "for item in items:\n    print(item)",
+        "steps": [
+            "Step 1: Print the length of the list and the index being used.",
+            "Step 2: Remember the last valid index is len(items) - 1.",
+        ],
+    },
+    {
+        "name": "RecursionError",
+        "keywords": ["recursionerror", "maximum recursion depth"],
+        "pattern": r"RecursionError: (?P<detail>[^\n]+)",
+        "confidence": 0.95,
+        "related_task": "python_functions",
+        "title": "🔴 RecursionError",
+        "message": ["RecursionError: {detail}", "RecursionError"],
+        "solution": "Make sure the recursive function has a base case that is always reached.",
+        "example": "def countdown(n):\n    if n == 0:\n        return  # base case\n    countdown(n - 1)",
+        "steps": [
+            "Step 1: Check the base case of the recursive function.",
+            "Step 2: Make sure each call moves closer to the base case.",
+        ],
+    },
+    _extend(_ATTRIBUTE_ERROR, name="NoneTypeAttribute",
+            pattern=r"AttributeError: 'NoneType' object has no attribute '(?P<attribute>[^']+)'",
+            keywords=["'nonetype' object has no attribute"], confidence=0.75, related_task="python_web_scraping",
+            message=["AttributeError: 'NoneType' object missing attribute '{attribute}'"],
+            solution="A lookup (for example soup.find) returned None. Check it found something before using it."),
+    _ATTRIBUTE_ERROR,
+    {
+        "name": "ZeroDivisionError",
+        "keywords": ["zerodivisionerror"],
+        "pattern": r"ZeroDivisionError: (?P<detail>[^\n]+)",
+        "confidence": 0.95,
+        "related_task": "python_exception_handling",
+        "title": "🔴 Zero Division Error",
+        "message": ["ZeroDivisionError: {detail}", "ZeroDivisionError"],
+        "solution": "You cannot divide a number by zero.",
+        "example": 'num = int(input("Enter a number: "))\nif num != 0:\n    print(10 / num)\nelse:\n    print("Cannot divide by zero")',
+        "steps": [
+            "Step 1: Check the divisor before dividing.",
+            "Step 2: Handle the case with an if statement or try/except ZeroDivisionError.",
+        ],
+    },
+    {
+        "name": "FileNotFoundError",
+        "keywords": ["filenotfounderror"],
+        "pattern": r"FileNotFoundError: (?:\[Errno 2\] )?(?P<detail>[^\n]+)",
+        "confidence": 0.95,
+        "related_task": "python_file_handling",
+        "title": "🔴 File Not Found",
+        "message": ["FileNotFoundError"],
+        "solution": "Ensure the file exists in the correct location.",
+        "example": 'with open("sample.txt", "r") as file:\n    content = file.read()  # Ensure \'sample.txt\' exists',
+        "steps": [
+            "Step 1: Verify the file path is correct.",
+            "Step 2: Ensure the file exists at the specified location.",
+            "Step 3: Check read permissions for the file.",
+        ],
+    },
+    {
+        "name": "PermissionError",
+        "keywords": ["permissionerror"],
+        "pattern": r"PermissionError: (?:\[Errno 13\] )?(?P<detail>[^\n]+)",
+        "confidence": 0.95,
+        "related_task": "python_file_handling",
+        "title": "🔴 Permission Denied",
+        "message": ["PermissionError: {detail}", "PermissionError"],
+        "solution": "Check file access permissions and run your code as an admin if needed.",
+        "example": "# Try running your script with administrative privileges",
+        "steps": [
+            "Step 1: Close any program that has the file open.",
+            "Step 2: Check the file permissions or write to a folder you own.",
+        ],
+    },
+    _extend(_VALUE_ERROR, name="ClosedFile", keywords=["i/o operation on closed file"],
+            pattern=r"ValueError: I/O operation on closed file", confidence=0.95,
+            related_task="python_file_handling", message=["ValueError: I/O operation on closed file"],
+            solution="Read or write the file inside the `with` block that opened it."),
+    _extend(_VALUE_ERROR, name="InvalidLiteral", keywords=["invalid literal for int()"],
+            pattern=r"ValueError: invalid literal for int\(\) with base 10: '(?P<value>[^']*)'",
+            confidence=0.95, related_task="python_exception_handling",
+            message=["ValueError: Invalid input '{value}'"]),
+    _VALUE_ERROR,
+    {
+        "name": "KeyError",
+        "keywords": ["keyerror"],
+        "pattern": r"KeyError: '(?P<key>[^']*)'",
+        "confidence": 0.95,
+        "related_task": "python_exception_handling",
+        "title": "🔴 KeyError",
+        "message": ["KeyError: Missing key '{key}'", "KeyError"],
+        "solution": "Check if the specified key exists in the dictionary.",
+        "example": "value = data.get('username')  # returns None instead of raising",
+        "steps": [
+            "Step 1: Check if the specified key exists in the dictionary.",
+            "Step 2: Handle missing keys using `dict.get('<key>')` or exception handling.",
+        ],
+    },
+    {
+        "name": "ConnectionError",
+        "keywords": ["connectionerror", "failed to establish a new connection"],
+        "pattern": r"ConnectionError: (?P<detail>[^\n]+)",
+        "confidence": 0.9,
+        "related_task": "python_web_scraping",
+        "title": "🔴 Connection Error",
+        "message": ["ConnectionError: {detail}", "ConnectionError"],
+        "solution": "Check your internet connection and the URL you are requesting.",
+        "example": "response = requests.get(url, timeout=10)",
+        "steps": [
+            "Step 1: Check the URL and your internet connection.",
+            "Step 2: Wrap the request in try/except requests.exceptions.ConnectionError.",
+        ],
+    },
+]
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton: finds every occurrence of many keywords in one pass.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(index)
+
+        # Breadth-first pass to set the failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self._goto[state].items():
+                queue.append(target)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[target] = self._goto[fallback].get(char, 0)
+                self._output[target] = self._output[target] + self._output[self._fail[target]]
+
+    def search(self, text):
+        """
+        Yield (end position, keyword index) for every keyword occurrence.
+        """
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._output[state]:
+                yield position, index
+
+
+class RuleEngine:
+    """
+    Compiles a rule table into one Aho-Corasick keyword automaton and one
+    combined regex, so matching costs a single scan of the text for each no
+    matter how many rules there are.
+    """
+
+    def __init__(self, rules=RULES):
+        self.rules = rules
+
+        keywords = []
+        self._keyword_rules = []
+        for index, rule in enumerate(rules):
+            for keyword in rule["keywords"]:
+                keywords.append(keyword.lower())
+                self._keyword_rules.append(index)
+        self._automaton = AhoCorasick(keywords)
+
+        # Rename each rule's named groups so they stay unique inside the combined regex
+        alternatives = []
+        for index, rule in enumerate(rules):
+            pattern = re.sub(r"\(\?P<(\w+)>", lambda m, i=index: f"(?P<r{i}_{m.group(1)}>", rule["pattern"])
+            alternatives.append(f"(?P<r{index}>{pattern})")
+        self._regex = re.compile("|".join(alternatives))
+
+    def match_all(self, text):
+        """
+        Return a RuleMatch for every rule found in the text.
+        """
+        if not text:
+            return []
+
+        # Keyword pass first: clean text (no keyword at all) never reaches the regex
+        keyword_hits = {}
+        for position, keyword_index in self._automaton.search(text.lower()):
+            keyword_hits[self._keyword_rules[keyword_index]] = position
+        if not keyword_hits:
+            return []
+
+        matches = {}
+        for found in self._regex.finditer(text):
+            index = int(found.lastgroup[1:])
+            prefix = f"r{index}_"
+            captures = {name[len(prefix):]: value for name, value in found.groupdict().items()
+                        if name.startswith(prefix) and value is not None}
+            matches[index] = RuleMatch(self.rules[index], captures, self.rules[index]["confidence"],
+                                       found.group(0), found.start())
+
+        for index, position in keyword_hits.items():
+            if index not in matches:
+                rule = self.rules[index]
+                matches[index] = RuleMatch(rule, {}, rule["confidence"] * KEYWORD_ONLY_FACTOR, "", position)
+        return list(matches.values())
+
+    def match(self, text):
+        """
+        Return the best RuleMatch for the text, or None. The most confident rule
+        wins; on a tie the one found last wins, since the final exception line
+        of a traceback is the error being reported.
+        """
+        matches = self.match_all(text)
+        if not matches:
+            return None
+        return max(matches, key=lambda match: (match.confidence, match.position))
+
+
+def render_message(match):
+    """
+    Fill in the first message template of the rule whose fields were all captured.
+    """
+    for template in match.rule["message"]:
+        try:
+            return template.format(**match.captures)
+        except KeyError:
+            continue
+    return match.rule["name"]
+
+
+_engine = None
+
+
+def get_rule_engine():
+    """
+    The shared compiled rule table, built on first use.
+    """
+    global _engine
+    if _engine is None:
+        _engine = RuleEngine()
+    return _engine
+
+
+def match_rules(text):
+    """
+    Match the text against the shared compiled rule table.
+    """
+    return get_rule_engine().match(text)
+
+
+def match_all_rules(text):
+    """
+    Every rule of the shared table found in the text, not only the best one.
+    """
+    return get_rule_engine().match_all(text)
+
+
+def is_confident(match, threshold=RULE_CONFIDENCE_THRESHOLD):
+    """
+    True when a rule match is trusted enough to skip the neural classifier.
+    """
+    return match is not None and match.rule["related_task"] is not None and match.confidence >= threshold
+
+
+if __name__ == "__main__":
+    samples = [
+        "SyntaxError: invalid syntax",
+        'File "app.py", line 10, in <module>\n    print(x)\nNameError: name \'x\' is not defined',
+        "TypeError: greet() missing 1 required positional argument: 'name'",
+        "ValueError: invalid literal for int() with base 10: 'abc'",
+        "Everything ran fine.",
+    ]
+    for sample in samples:
+        result = match_rules(sample)
+        if result is None:
+            print(f"{sample!r}: no rule matched")
+        else:
+            print(f"{sample!r}: {result.rule['name']} ({result.confidence:.2f}) -> {render_message(result)}")
@@ -0,0 +1,33 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageGrab
+
+# A single background thread keeps archive writes in order and off the caller's thread
+_archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot-archive")
+
+
+def capture_screen(bbox=None):
+    """
+    Grab the screen (or the given (left, top, right, bottom) box) as an RGB NumPy array.
+
+    The pixels stay in memory; nothing is written to disk.
+    """
+    return np.asarray(ImageGrab.grab(bbox=bbox).convert("RGB"))
+
+
+def _save_screenshot(image, path):
+    try:
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        image.save(path)
+    except Exception as e:
+        logging.error(f"Failed to archive screenshot to {path}: {e}")
+
+
+def archive_screenshot_async(image, path):
+    """
+    Save a screenshot in the background and return the Future of the write.
+    """
+    return _archive_executor.submit(_save_screenshot, image, path)
@@ -0,0 +1,69 @@
+import re
+
+# Frames kept from the end of the traceback (the innermost calls)
+MAX_FRAMES = 3
+
+TRACEBACK_HEADER_PATTERN = re.compile(r"Traceback \(most recent call last\)")
+FRAME_PATTERN = re.compile(r'^\s*File\s+["\'].*?["\'],\s*line\s+\d+.*$')
+EXCEPTION_PATTERN = re.compile(r"^\s*([A-Za-z_][\w.]*(?:Error|Exception|Warning|Interrupt|Exit))\b(:.*)?$")
+CARET_PATTERN = re.compile(r"^\s*[\^~]+\s*$")
+
+
+def condense_traceback(text, max_frames=MAX_FRAMES):
+    """
+    Reduce OCR'd screen text to the part of the traceback the classifier needs:
+    the last `max_frames` frames, each with its source line, followed by the
+    exception line. Editor chrome, menus and earlier output are dropped.
+
+    Text without an exception line is returned unchanged (whitespace trimmed).
+    """
+    lines = [line.rstrip() for line in (text or "").splitlines()]
+    exception_index = None
+    for index in range(len(lines) - 1, -1, -1):
+        if EXCEPTION_PATTERN.match(lines[index]):
+            exception_index = index
+            break
+    if exception_index is None:
+        return (text or "").strip()
+
+    # Only look at the traceback that ends in this exception
+    start = 0
+    for index in range(exception_index, -1, -1):
+        if TRACEBACK_HEADER_PATTERN.search(lines[index]):
+            start = index + 1
+            break
+
+    frames = []
+    index = start
+    while index < exception_index:
+        if FRAME_PATTERN.match(lines[index]):
+            frame = [lines[index].strip()]
+            # The source line follows the frame, unless OCR lost it
+            following = index + 1
+            if (following < exception_index and lines[following].strip()
+                    and not FRAME_PATTERN.match(lines[following]) and not CARET_PATTERN.match(lines[following])):
+                frame.append("    " + lines[following].strip())
+                index = following
+            frames.append(frame)
+        index += 1
+
+    condensed = [line for frame in frames[-max_frames:] for line in frame]
+    condensed.append(lines[exception_index].strip())
+    return "\n".join(condensed)
+
+
+if __name__ == "__main__":
+    sample = "\n".join([
+        "File  Edit  View  Run  Help",
+        "main.py  utils.py",
+        "Traceback (most recent call last):",
+        '  File "main.py", line 12, in <module>',
+        "    run()",
+        '  File "main.py", line 8, in run',
+        "    total = add(1, '2')",
+        '  File "utils.py", line 2, in add',
+        "    return a + b",
+        "TypeError: unsupported operand type(s) for +: 'int' and 'str'",
+        "Ln 12, Col 4   Spaces: 4   UTF-8   Python 3.11",
+    ])
+    print(condense_traceback(sample))
@@ -0,0 +1,198 @@
+import glob
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ocr_engine import get_ocr_engine
+
+# Detection runs on a downscaled copy; boxes are mapped back to full resolution
+DETECTION_SCALE = 0.5
+# Pixels of context kept around each detected block
+CROP_MARGIN = 12
+# Blocks smaller than this (full-resolution pixels) are icons or stray glyphs
+MIN_BLOCK_WIDTH = 120
+MIN_BLOCK_HEIGHT = 18
+MAX_REGIONS = 3
+
+EXCEPTION_LINE_PATTERN = re.compile(
+    r"^.*(Traceback \(most recent call last\)|\b[A-Za-z_][\w.]*(Error|Exception)\b).*$",
+    re.MULTILINE,
+)
+EXCEPTION_NAME_PATTERN = re.compile(r"\b[A-Za-z_]\w*(?:Error|Exception)\b")
+
+
+def to_gray_array(image):
+    """
+    Convert a PIL image or OpenCV/NumPy array into a single-channel uint8 array.
+    """
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert("L"))
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def exception_lines(text):
+    """
+    Return the lines of the text that look like a traceback header or an exception.
+    """
+    return [match.group(0).strip() for match in EXCEPTION_LINE_PATTERN.finditer(text or "")]
+
+
+def _score_block(line_mask, x, y, w, h):
+    """
+    Score a text block by how much it looks like a traceback: several lines,
+    left-aligned, with a couple of indentation levels ("File ..." / code / exception).
+    """
+    contours, _ = cv2.findContours(line_mask[y:y + h, x:x + w], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    line_boxes = [cv2.boundingRect(c) for c in contours]
+    line_boxes = [box for box in line_boxes if box[3] >= 3]
+    if not line_boxes:
+        return 0.0
+
+    # Quantise left edges so jitter of a pixel or two lands in the same indentation level
+    indents = {box[0] // 4 for box in line_boxes}
+    indentation_bonus = 2.0 if 2 <= len(indents) <= 4 else 1.0
+    return len(line_boxes) * indentation_bonus
+
+
+def find_text_blocks(image, scale=DETECTION_SCALE):
+    """
+    Find blocks of text with OpenCV morphology.
+
+    :param image: PIL image or NumPy array (grayscale, BGR or BGRA)
+    :param scale: Downscale factor used for detection
+    :return: List of (x, y, w, h, score) tuples in full-resolution coordinates, best first
+    """
+    gray = to_gray_array(image)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # The morphological gradient picks up glyph edges on both light and dark editor themes
+    gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Join characters into lines, then lines into paragraph-sized blocks
+    lines = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    blocks = cv2.dilate(lines, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 7)))
+
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    height, width = gray.shape
+    found = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w / scale < MIN_BLOCK_WIDTH or h / scale < MIN_BLOCK_HEIGHT:
+            continue
+        score = _score_block(lines, x, y, w, h)
+        if score <= 0:
+            continue
+
+        x0 = max(0, int(x / scale) - CROP_MARGIN)
+        y0 = max(0, int(y / scale) - CROP_MARGIN)
+        x1 = min(width, int((x + w) / scale) + CROP_MARGIN)
+        y1 = min(height, int((y + h) / scale) + CROP_MARGIN)
+        found.append((x0, y0, x1 - x0, y1 - y0, score))
+
+    found.sort(key=lambda block: block[4], reverse=True)
+    return found
+
+
+def find_traceback_regions(image, max_regions=MAX_REGIONS):
+    """
+    Return the crop boxes (x, y, w, h) most likely to contain a traceback.
+    """
+    return [block[:4] for block in find_text_blocks(image)[:max_regions]]
+
+
+def crop_regions(image, boxes):
+    """
+    Cut the given (x, y, w, h) boxes out of the image as grayscale arrays.
+    """
+    gray = to_gray_array(image)
+    return [gray[y:y + h, x:x + w] for x, y, w, h in boxes]
+
+
+def ocr_regions(image, boxes, engine=None):
+    """
+    OCR only the given boxes and join their text top to bottom.
+    """
+    engine = engine or get_ocr_engine()
+    ordered = sorted(boxes, key=lambda box: (box[1], box[0]))
+    texts = engine.image_to_string_batch(crop_regions(image, ordered))
+    return "\n".join(text.strip() for text in texts if text.strip())
+
+
+class TracebackLocator:
+    """
+    Find and OCR the traceback region of a screenshot.
+
+    The boxes that produced exception lines last time are kept in `regions`, so
+    the next capture of the same window layout skips detection altogether.
+    """
+
+    def __init__(self, engine=None, max_regions=MAX_REGIONS):
+        self.engine = engine
+        self.max_regions = max_regions
+        self.regions = []
+
+    def extract(self, image):
+        """
+        Extract traceback text from the image.
+
+        :return: (text, regions) where regions are the (x, y, w, h) boxes that were OCR'd;
+                 an empty list means the whole image was OCR'd
+        """
+        engine = self.engine or get_ocr_engine()
+
+        if self.regions:
+            text = ocr_regions(image, self.regions, engine)
+            if exception_lines(text):
+                return text, list(self.regions)
+
+        regions = find_traceback_regions(image, self.max_regions)
+        if regions:
+            text = ocr_regions(image, regions, engine)
+            if exception_lines(text):
+                self.regions = regions
+                return text, list(regions)
+
+        # No block held an exception line, so fall back to the full screen rather than lose it
+        self.regions = []
+        return engine.image_to_string(to_gray_array(image)), []
+
+
+if __name__ == "__main__":
+    # Compare full-screen OCR with region-of-interest OCR on the sample screenshots
+    pune_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "PUNE")
+    paths = glob.glob(os.path.join(pune_dir, "*.png")) + glob.glob(os.path.join(pune_dir, "submitted task", "*.png"))
+    engine = get_ocr_engine()
+
+    full_total, roi_total, lost = 0.0, 0.0, 0
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+
+        start = time.perf_counter()
+        full_text = engine.image_to_string(to_gray_array(image))
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        roi_text, regions = TracebackLocator(engine).extract(image)
+        roi_time = time.perf_counter() - start
+
+        # Compare exception names, the exact OCR of a line can differ between crop and full screen
+        missing = set(EXCEPTION_NAME_PATTERN.findall(full_text)) - set(EXCEPTION_NAME_PATTERN.findall(roi_text))
+        lost += len(missing)
+        full_total += full_time
+        roi_total += roi_time
+        print(f"{os.path.basename(path)}: full {full_time * 1000:.0f} ms, roi {roi_time * 1000:.0f} ms, "
+              f"{len(regions)} regions, {len(missing)} exception lines lost")
+
+    if paths:
+        print(f"\nTotal: full {full_total:.2f} s, roi {roi_total:.2f} s, exception lines lost: {lost}")
@@ -1,45 +1,89 @@
 import json
+import os
 import numpy as np
-import joblib
-from transformers import BertModel, BertTokenizer
-from xgboost import XGBClassifier
-import torch
+from model_registry import get_bert_encoder, get_tokenizer, get_xgboost
+from batch_inference import embed_texts
+from embedding_cache import EmbeddingCache
+from inference_client import get_client
+from label_vocabulary import VOCAB_FILE, label_vocabulary, load_vocabulary, task_names
 
-# Error sample loader
-with open("error_samples.json", "r") as f:
-    error_data = json.load(f)
-
-# Initialize BERT
-tokenizer = BertTokenizer.from_pretrained("bert_fine_tuned")
-model = BertModel.from_pretrained("bert_fine_tuned")
+# Fine-tuned BERT used as the feature extractor, loaded on first use
+BERT_MODEL_PATH = "bert_fine_tuned"
+SAMPLES_FILE = "error_samples.json"
+XGB_MODEL_FILE = "xgboost_model.pkl"
 
 
 def get_bert_embeddings(text):
     """Extract numerical embeddings using fine-tuned BERT."""
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-    return outputs.last_hidden_state[:, 0, :].squeeze().numpy()
+    tokenizer = get_tokenizer(BERT_MODEL_PATH)
+    model = get_bert_encoder(BERT_MODEL_PATH)
+    # Condensed to the traceback, long leftovers encoded as pooled sliding windows
+    return embed_texts([text], model, tokenizer)[0]
+
+
+def get_bert_embeddings_batch(texts, batch_size=None):
+    """Extract [CLS] embeddings for many texts with batched, length-bucketed BERT passes."""
+    tokenizer = get_tokenizer(BERT_MODEL_PATH)
+    model = get_bert_encoder(BERT_MODEL_PATH)
+    return embed_texts(texts, model, tokenizer, batch_size)
+
+
+def train_xgboost(samples_file=SAMPLES_FILE, output_file=XGB_MODEL_FILE):
+    """
+    Embed every error sample with BERT and fit the XGBoost task classifier.
+    Samples with a "weight" (cluster sizes written by near_dedup.py) count that many times.
+    Class ids come from the persisted label vocabulary, as for BERT; XGBoost
+    needs every id to have samples, so a vocabulary task missing from the
+    samples file is an error.
+    """
+    # Error sample loader
+    with open(samples_file, "r") as f:
+        error_data = json.load(f)
+    task_mapping = label_vocabulary(entry["related_task"] for entry in error_data)
+
+    # Prepare training data
+    texts, y, weights = [], [], []
+    for entry in error_data:
+        texts.append(entry["error_message"])
+        y.append(task_mapping[entry["related_task"]])
+        weights.append(entry.get("weight", 1))
+
+    missing = sorted(set(task_mapping) - {entry["related_task"] for entry in error_data})
+    if missing:
+        raise ValueError(f"No samples in {samples_file} for tasks of the label vocabulary: {', '.join(missing)}")
+
+    # Only samples that are new since the last run (for this BERT model) are embedded
+    embedding_cache = EmbeddingCache(BERT_MODEL_PATH)
+    X, y = embedding_cache.get(texts, get_bert_embeddings_batch), np.array(y)
+    print(f"Embedding cache: {embedding_cache.stats()}")
 
+    # Train XGBoost with histogram tree construction on all cores
+    import joblib
+    from xgboost import XGBClassifier
+    xgb = XGBClassifier(n_estimators=100, learning_rate=0.1, max_depth=5, tree_method="hist", n_jobs=-1)
+    xgb.fit(X, y, sample_weight=np.array(weights, dtype=np.float32))
 
-# Prepare training data
-X, y = [], []
-task_mapping = {}
-for idx, entry in enumerate(error_data):
-    text = entry["error_message"]
-    task_name = entry["related_task"]
+    joblib.dump(xgb, output_file)
+    print("XGBoost model trained and saved!")
+    return xgb
 
-    if task_name not in task_mapping:
-        task_mapping[task_name] = len(task_mapping)
 
-    X.append(get_bert_embeddings(text))
-    y.append(task_mapping[task_name])
+def predict_tasks(texts, model_dir=""):
+    """
+    (task, probability) for every text from the deployed XGBoost model, the file
+    online_update.py swaps in place, so a long-running caller follows its updates.
+    Paths are relative to model_dir, for callers running from another directory.
+    """
+    bert_path = os.path.join(model_dir, BERT_MODEL_PATH)
 
-X, y = np.array(X), np.array(y)
+    def local(batch):
+        return embed_texts(batch, get_bert_encoder(bert_path), get_tokenizer(bert_path))
+    # Same fine-tuned embeddings the model was fitted on, from the inference daemon when one is running
+    X = get_client().embed(texts, bert_path, fallback=local)
+    probabilities = get_xgboost(os.path.join(model_dir, XGB_MODEL_FILE)).predict_proba(X)
+    labels = task_names(load_vocabulary(os.path.join(model_dir, VOCAB_FILE)))
+    return [(labels[int(row.argmax())], float(row.max())) for row in probabilities]
 
-# Train XGBoost
-xgb = XGBClassifier(n_estimators=100, learning_rate=0.1, max_depth=5)
-xgb.fit(X, y)
 
-joblib.dump(xgb, "xgboost_model.pkl")
-print("XGBoost model trained and saved!")
+if __name__ == "__main__":
+    train_xgboost()
@@ -1,10 +1,20 @@
 import os
+import sys
 import json
-import pytesseract
 import cv2
-import torch
-from transformers import BertTokenizer, BertForSequenceClassification
-from xgboost import XGBClassifier
+
+# Shared OCR/model helpers live next to the classifier scripts
+MODEL_CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "error_classifier_model")
+sys.path.append(MODEL_CODE_DIR)
+from ocr_engine import get_ocr_engine
+from model_registry import get_bert_classifier, get_tokenizer
+from batch_inference import classify_texts
+from early_exit import classify_logits_early_exit, get_early_exit_classifier, heads_path
+from train_xgboost import predict_tasks
+
+# Model artifacts, loaded on first use through the shared model registry
+BERT_TOKENIZER_PATH = "bert-base-uncased"
+BERT_MODEL_PATH = "model/error_classifier_model"
 
 # Load `tasks.json` file
 TASKS_FILE = "tasks.json"
@@ -17,22 +27,6 @@ else:
     tasks = {}
     task_categories = {}
 
-# Load fine-tuned BERT model and tokenizer
-try:
-    tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
-    model = BertForSequenceClassification.from_pretrained("model/error_classifier_model")
-    model.eval()
-except Exception as e:
-    print(f"Error loading BERT model: {e}")
-    model = None
-
-# Load trained XGBoost model
-xgb = XGBClassifier()
-try:
-    xgb.load_model("model/error_categorization.model")
-except Exception as e:
-    print(f"Error loading XGBoost model: {e}")
-
 
 def extract_text_from_image(image_path):
     """Extract text from an image using OCR."""
@@ -42,7 +36,7 @@ def extract_text_from_image(image_path):
     try:
         image = cv2.imread(image_path)
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        text = pytesseract.image_to_string(gray)
+        text = get_ocr_engine().image_to_string(gray)
         return text.strip()
     except Exception as e:
         print(f"Error processing image: {e}")
@@ -51,24 +45,42 @@ def extract_text_from_image(image_path):
 
 def classify_error(text):
     """Classify the extracted error text using BERT."""
-    if model is None:
-        print("Error: BERT model not loaded.")
+    if os.path.exists(heads_path(BERT_MODEL_PATH)):
+        return classify_errors([text])[0]
+    try:
+        tokenizer = get_tokenizer(BERT_TOKENIZER_PATH)
+        model = get_bert_classifier(BERT_MODEL_PATH)
+    except Exception as e:
+        print(f"Error loading BERT model: {e}")
         return -1
     try:
-        tokens = tokenizer(text, padding=True, truncation=True, return_tensors="pt")
-        with torch.no_grad():
-            outputs = model(**tokens)
-        predicted_label = torch.argmax(outputs.logits, dim=1).item()
-        return predicted_label
+        # Condensed to the traceback, long leftovers encoded as pooled sliding windows
+        return classify_texts([text], model, tokenizer)[0]
     except Exception as e:
         print(f"Error classifying text: {e}")
         return -1
 
 
-def predict_task_category(label):
-    """Predict task category based on the BERT classification output using XGBoost."""
+def classify_errors(texts, batch_size=None):
+    """Classify many error texts with batched, length-bucketed BERT passes; -1 for every text on failure."""
+    try:
+        tokenizer = get_tokenizer(BERT_TOKENIZER_PATH)
+        if os.path.exists(heads_path(BERT_MODEL_PATH)):
+            # Easy errors leave the encoder at the first confident intermediate layer
+            logits, _ = classify_logits_early_exit(texts, get_early_exit_classifier(BERT_MODEL_PATH), tokenizer,
+                                                   batch_size=batch_size)
+            return logits.argmax(axis=1).tolist() if len(logits) else []
+        model = get_bert_classifier(BERT_MODEL_PATH)
+        return classify_texts(texts, model, tokenizer, batch_size)
+    except Exception as e:
+        print(f"Error classifying texts: {e}")
+        return [-1] * len(texts)
+
+
+def predict_task_category(text):
+    """Predict the task category of the error text with the deployed XGBoost model (xgboost_model.pkl)."""
     try:
-        return xgb.predict([[label]])[0]
+        return predict_tasks([text], MODEL_CODE_DIR)[0][0]
     except Exception as e:
         print(f"Error predicting task category: {e}")
         return "Unknown"
@@ -83,7 +95,7 @@ if __name__ == "__main__":
     if extracted_text:
         error_label = classify_error(extracted_text)
         if error_label != -1:
-            task_category = predict_task_category(error_label)
+            task_category = predict_task_category(extracted_text)
             print(f"Predicted Error Category: {error_label}")
             print(f"Predicted Task Module: {task_category}")
         else: